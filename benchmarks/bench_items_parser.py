@@ -0,0 +1,167 @@
+"""
+Benchmark del parser determinístico de ítems sobre texto OCR de varios MB.
+
+Compara el recorrido anterior (regex recompiladas por llamada, búsqueda de
+encabezados con any(), doble regex de ID por línea y json.loads sobre todo el
+texto) con el clasificador de línea precompilado de ItemsLicitacionStatefulParser,
+y verifica que ambos extraigan los mismos ítems.
+
+Uso:
+    python -m benchmarks.bench_items_parser [--mb 5] [--repeticiones 3]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.semantic_extraction.extractors.items_licitacion.items_licitacion_stateful_parser import ItemsLicitacionStatefulParser
+
+
+class _ParserLineaBase(ItemsLicitacionStatefulParser):
+    """
+    Implementación original del recorrido por línea, conservada solo como línea base.
+    """
+
+    def _aplanar_json_texto(self, texto: str) -> str:
+        try:
+            data = json.loads(texto)
+            if isinstance(data, list):
+                lineas = []
+                for row in data:
+                    if isinstance(row, list):
+                        for cell in row:
+                            lineas.extend(str(cell).split('\n'))
+                    else:
+                        lineas.extend(str(row).split('\n'))
+                return "\n".join(lineas)
+        except Exception:
+            pass
+        return texto.replace('\\n', '\n')
+
+    def parsear_texto(self, texto: str, documento_nombre: str = "Documento", pagina_num: int = 1, redis_key: str = "N/A"):
+        lineas = self._aplanar_json_texto(texto).split('\n')
+        regex_id = re.compile(r"^ID:\s*(\d+)")
+        regex_cantidad = re.compile(r"^(\d+(?:[.,]\d+)?)\s+([A-Za-z]+.*)$", re.IGNORECASE)
+
+        for linea_raw in lineas:
+            linea = self._limpiar_linea(linea_raw)
+            if not linea:
+                continue
+            headers_items = ["Listado de productos solicitados", "Productos Solicitados", "Descripción de los bienes", "Ítems de la licitación"]
+            if any(h in linea for h in headers_items):
+                self.en_seccion_relevante = True
+                continue
+            match_id = regex_id.search(linea)
+            if not self.en_seccion_relevante:
+                if match_id:
+                    self.en_seccion_relevante = True
+                else:
+                    continue
+            if self.item_actual is None:
+                self.item_actual = self._crear_item_vacio()
+            match_id = regex_id.search(linea)
+            if match_id:
+                self.item_actual["item_key"] = f"item_{match_id.group(1)}"
+                continue
+            match_cant = regex_cantidad.search(linea)
+            if match_cant and len(linea) < 30 and self.item_actual["item_key"] is not None:
+                self.item_actual["cantidad"] = float(match_cant.group(1).replace(',', '.'))
+                self.item_actual["unidad"] = match_cant.group(2).strip()
+                self.item_actual["fuentes"].append({
+                    "documento": documento_nombre,
+                    "documento_id": None,
+                    "pagina": pagina_num,
+                    "parrafo": f"ID={self.item_actual['item_key']} | Desc={self.item_actual['nombre_item']} | Cant={linea}",
+                    "redis_key": redis_key
+                })
+                self.items.append(self.item_actual)
+                self.item_actual = None
+                continue
+            if self.item_actual.get("item_key") is None:
+                if not self.item_actual.get("notas"):
+                    self.item_actual["notas"] = f"Categoría: {linea}"
+                continue
+            if self.item_actual.get("item_key") is not None and self.item_actual.get("cantidad") is None:
+                if self.item_actual.get("nombre_item") is None:
+                    self.item_actual["nombre_item"] = linea
+                else:
+                    if self.item_actual["descripcion"] is None:
+                        self.item_actual["descripcion"] = linea
+                    else:
+                        self.item_actual["descripcion"] += f" {linea}"
+                continue
+        return self.items
+
+
+_PRODUCTOS = ["Guantes de nitrilo", "Mascarilla N95", "Alcohol gel 70%", "Jeringa desechable 5 ml", "Papel higiénico doble hoja"]
+_UNIDADES = ["Unidad", "Caja", "Litro", "Paquete", "Kilogramo"]
+_RELLENO = [
+    "Las bases administrativas establecen que el proveedor deberá cumplir con la normativa vigente.",
+    "El plazo de entrega no podrá exceder de 10 días hábiles desde la emisión de la orden de compra.",
+    "Se evaluará la oferta económica, el plazo de entrega y el cumplimiento de requisitos formales.",
+]
+
+
+def generar_texto_ocr(megabytes: float, semilla: int = 7) -> str:
+    """
+    Texto sintético con el layout de Compra Ágil: párrafos de bases intercalados
+    con bloques Categoría / ID / nombre / descripción / cantidad.
+    """
+    rnd = random.Random(semilla)
+    partes = ["Listado de productos solicitados"]
+    tamano, item_id = 0, 1000
+    objetivo = int(megabytes * 1024 * 1024)
+    while tamano < objetivo:
+        bloque = [
+            "Insumos clínicos",
+            f"ID: {item_id}",
+            rnd.choice(_PRODUCTOS),
+            f"Especificación técnica del producto {item_id}, presentación estándar.",
+            f"{rnd.randint(1, 500)} {rnd.choice(_UNIDADES)}",
+        ] + rnd.sample(_RELLENO, 2)
+        texto = "\n".join(bloque)
+        partes.append(texto)
+        tamano += len(texto)
+        item_id += 1
+    return "\n".join(partes)
+
+
+def _medir(cls, texto: str, repeticiones: int):
+    tiempos, items = [], None
+    for _ in range(repeticiones):
+        parser = cls()
+        t0 = time.perf_counter()
+        items = parser.parsear_texto(texto)
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser determinístico de ítems")
+    parser.add_argument("--mb", type=float, default=5.0)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    texto = generar_texto_ocr(args.mb)
+    lineas = texto.count("\n") + 1
+    print(f"Texto sintético: {len(texto) / 1024 / 1024:.1f} MB, {lineas} líneas")
+
+    t_base, items_base = _medir(_ParserLineaBase, texto, args.repeticiones)
+    t_nuevo, items_nuevo = _medir(ItemsLicitacionStatefulParser, texto, args.repeticiones)
+
+    if items_base != items_nuevo:
+        print("⚠️ Los ítems extraídos difieren entre implementaciones")
+
+    print(f"{'implementacion':<18} {'tiempo_s':>9} {'lineas/s':>12} {'items':>7}")
+    print(f"{'anterior':<18} {t_base:>9.3f} {lineas / t_base:>12,.0f} {len(items_base):>7}")
+    print(f"{'clasificador':<18} {t_nuevo:>9.3f} {lineas / t_nuevo:>12,.0f} {len(items_nuevo):>7}")
+    print(f"speedup: {t_base / t_nuevo:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
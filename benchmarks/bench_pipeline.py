@@ -0,0 +1,228 @@
+"""
+Benchmark end-to-end offline del pipeline: embeddings -> grafo semántico -> homologación.
+
+Genera licitaciones sintéticas (páginas JSON en archivos_texto/ y un catálogo Excel),
+y las procesa con Redis, Postgres, LLM y embeddings simulados (ver pipeline_harness).
+Reporta por etapa tiempo de pared, CPU, throughput y pico de memoria (tracemalloc), el
+tiempo acumulado por nodo del grafo / subgrafo de ítems / búsqueda semántica, las
+llamadas al LLM por tipo de prompt y las sentencias SQL por tabla.
+
+Etapas:
+- embedding_batch: run_embedding_batch por documento (sin la extracción legacy que
+  dispara al final, que se mide en el grafo)
+- grafo_semantico: build_semantic_graph().invoke por licitación, incluye homologación
+
+Uso:
+    python -m benchmarks.bench_pipeline [--licitaciones 4] [--paginas 12] [--items 30]
+        [--productos 2000] [--formato mixto|libre|licitacion_publica]
+        [--latencia-llm 0.0] [--latencia-embedding 0.0] [--sin-memoria] [--json salida.json]
+
+Con --latencia-llm se simula el tiempo de respuesta del proveedor para medir el efecto
+de la concurrencia (shards de ítems, batches de homologación, fan-out del grafo).
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import functools
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks import pipeline_harness as harness
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--licitaciones", type=int, default=4)
+    parser.add_argument("--paginas", type=int, default=12, help="páginas por licitación (bases + anexo)")
+    parser.add_argument("--items", type=int, default=30, help="ítems por licitación")
+    parser.add_argument("--productos", type=int, default=2000, help="productos del catálogo")
+    parser.add_argument("--formato", choices=["mixto", "libre", "licitacion_publica"], default="mixto")
+    parser.add_argument("--latencia-llm", type=float, default=0.0, help="segundos por llamada al LLM simulado")
+    parser.add_argument("--latencia-embedding", type=float, default=0.0, help="segundos por llamada de embeddings")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--sin-memoria", action="store_true", help="no usar tracemalloc (tiempos más limpios)")
+    parser.add_argument("--directorio", default=None, help="directorio de trabajo (default: temporal, se elimina)")
+    parser.add_argument("--verbose", action="store_true", help="mostrar los prints del pipeline")
+    parser.add_argument("--json", default=None, help="guardar el reporte en este archivo")
+    return parser.parse_args()
+
+
+def _instrumentar(medidor):
+    from src.services.semantic_extraction import runner
+    from src.graph import items_subgraph
+    from src.nodes.finances.node import ExtractFinancesNode
+    from src.nodes.items.node import ExtractItemsNode
+    from src.nodes.basic_data.node import ExtractBasicDataNode
+    from src.nodes.entregas.node import ExtractEntregasNode
+    from src.nodes.homologation.node import HomologationNode
+
+    for nombre, clase in (
+        ("nodo.extract_finances", ExtractFinancesNode),
+        ("nodo.extract_items", ExtractItemsNode),
+        ("nodo.extract_basic_data", ExtractBasicDataNode),
+        ("nodo.extract_entregas", ExtractEntregasNode),
+        ("nodo.homologation", HomologationNode),
+    ):
+        medidor.instrumentar(clase, "execute", nombre, es_classmethod=True)
+
+    # build_items_subgraph toma las funciones del módulo al construirse (una vez por licitación)
+    for nombre in dir(items_subgraph):
+        if nombre.startswith("node_"):
+            medidor.instrumentar(items_subgraph, nombre, f"items.{nombre[5:]}")
+
+    medidor.instrumentar(runner, "load_documents_to_memory", "busqueda.load_documents_to_memory")
+    medidor.instrumentar(runner, "semantic_search_in_memory", "busqueda.semantic_search_in_memory")
+
+
+def _tabla(filas, encabezados):
+    anchos = [max(len(str(x)) for x in col) for col in zip(encabezados, *filas)]
+    lineas = ["  ".join(str(x).ljust(a) for x, a in zip(encabezados, anchos))]
+    lineas.append("  ".join("-" * a for a in anchos))
+    lineas += ["  ".join(str(x).ljust(a) for x, a in zip(fila, anchos)) for fila in filas]
+    return "\n".join(lineas)
+
+
+def main():
+    args = _parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    temporal = args.directorio is None
+    directorio = os.path.abspath(args.directorio or tempfile.mkdtemp(prefix="bench_pipeline_"))
+
+    entorno = harness.preparar_entorno(directorio, args.latencia_llm, args.latencia_embedding)
+    medidor = harness.Medidor(memoria=not args.sin_memoria)
+
+    from src.services import embedding_service
+    from src.services.semantic_extraction import runner
+    from src.services.homologacion import homologacion_service
+    from src.services.homologacion.product_loader import cargar_productos_catalogo
+    from src.graph.semantic_graph import build_semantic_graph
+    from src.graph.state import GraphState
+
+    formatos = ["libre", "licitacion_publica"] if args.formato == "mixto" else [args.formato]
+    licitaciones = []
+    try:
+        with medidor.etapa("generacion", args.licitaciones, "licitaciones"):
+            catalogo = harness.generar_catalogo(args.productos, args.semilla)
+            ruta_catalogo = harness.escribir_catalogo_excel(catalogo, os.path.join(directorio, "productos", "productos.xlsx"))
+            for i in range(args.licitaciones):
+                lic = harness.generar_licitacion(
+                    directorio, i, catalogo, args.paginas, args.items, formatos[i % len(formatos)], args.semilla
+                )
+                entorno.db.registrar_licitacion(lic["licitacion_id"], lic["id_interno"], lic["nombre"], lic["archivos"])
+                licitaciones.append(lic)
+
+        homologacion_service.cargar_productos_catalogo = functools.partial(cargar_productos_catalogo, ruta_catalogo)
+        _instrumentar(medidor)
+
+        documentos = [doc for lic in licitaciones for doc in lic["documento_ids"]]
+        paginas = sum(lic["paginas"] for lic in licitaciones)
+        extraccion_legacy = runner.run_semantic_extraction
+        runner.run_semantic_extraction = lambda **kwargs: None
+        try:
+            with harness.silenciar(not args.verbose), medidor.etapa("embedding_batch", paginas, "páginas"):
+                for doc_id in documentos:
+                    embedding_service.run_embedding_batch(doc_id)
+        finally:
+            runner.run_semantic_extraction = extraccion_legacy
+        llamadas_embedding_batch = entorno.embeddings.llamadas
+
+        resultados = []
+        with harness.silenciar(not args.verbose), medidor.etapa("grafo_semantico", len(licitaciones), "licitaciones"):
+            app = build_semantic_graph()
+            for lic in licitaciones:
+                estado = app.invoke(GraphState(
+                    licitacion_id=lic["licitacion_id"],
+                    documento_ids=lic["documento_ids"],
+                    document_text=None,
+                    extraction_finances=None,
+                    extraction_items=None,
+                    extraction_basic_data=None,
+                    extraction_entregas=None,
+                    homologation_result=None,
+                    status="init",
+                    errors=[],
+                    current_step="init",
+                    checkpoint_key=None,
+                    force=True,
+                ))
+                resultados.append((lic, estado))
+    finally:
+        if temporal:
+            os.chdir(os.path.dirname(directorio))
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    # --- Reporte ---
+    reporte = {
+        "parametros": vars(args),
+        "etapas": medidor.etapas,
+        "nodos": dict(medidor.nodos),
+        "llm": {
+            "llamadas": dict(entorno.llm.llamadas),
+            "tokens_input": entorno.llm.tokens_input,
+            "tokens_output": entorno.llm.tokens_output,
+        },
+        "embeddings": {
+            "llamadas_embedding_batch": llamadas_embedding_batch,
+            "llamadas_totales": entorno.embeddings.llamadas,
+            "textos": entorno.embeddings.textos,
+        },
+        "sql": {"conexiones": entorno.db.conexiones, "sentencias": dict(entorno.db.sentencias)},
+        "licitaciones": [],
+    }
+    for lic, estado in resultados:
+        items = (estado.get("extraction_items") or {}).get("items") or []
+        homologacion = (estado.get("homologation_result") or {}).get("resumen") or {}
+        reporte["licitaciones"].append({
+            "nombre": lic["nombre"],
+            "formato": lic["formato"],
+            "items_generados": len(lic["items"]),
+            "items_extraidos": len(items),
+            "items_con_match": homologacion.get("total_items_con_match"),
+            "errores": estado.get("errors") or [],
+        })
+
+    print("\n=== Etapas ===")
+    print(_tabla([
+        (
+            nombre, f"{e['segundos']:.3f}", f"{e['cpu_segundos']:.3f}",
+            f"{e['unidades'] / e['segundos']:.1f} {e['unidad']}/s" if e["unidades"] and e["segundos"] else "-",
+            f"{e['pico_memoria_mb']:.1f}" if "pico_memoria_mb" in e else "-",
+        )
+        for nombre, e in medidor.etapas.items()
+    ], ["etapa", "pared_s", "cpu_s", "throughput", "pico_mem_mb"]))
+
+    print("\n=== Tiempo acumulado por nodo (se solapa en la fan-out) ===")
+    print(_tabla([
+        (nombre, n["llamadas"], f"{n['segundos']:.3f}")
+        for nombre, n in sorted(medidor.nodos.items(), key=lambda kv: -kv[1]["segundos"])
+    ], ["nodo", "llamadas", "segundos"]))
+
+    print("\n=== LLM simulado ===")
+    print(_tabla(sorted(entorno.llm.llamadas.items()), ["prompt", "llamadas"]))
+    print(f"tokens_input={entorno.llm.tokens_input} tokens_output={entorno.llm.tokens_output}")
+    print(f"embeddings: {entorno.embeddings.llamadas} llamadas ({llamadas_embedding_batch} en embedding_batch), {entorno.embeddings.textos} textos")
+
+    print("\n=== SQL (sentencias por verbo y tabla) ===")
+    print(_tabla(entorno.db.sentencias.most_common(), ["sentencia", "cantidad"]))
+
+    print("\n=== Licitaciones ===")
+    print(_tabla([
+        (l["nombre"], l["formato"], l["items_generados"], l["items_extraidos"], l["items_con_match"], len(l["errores"]))
+        for l in reporte["licitaciones"]
+    ], ["licitacion", "formato", "items_gen", "items_ext", "con_match", "errores"]))
+    for l in reporte["licitaciones"]:
+        for error in l["errores"]:
+            print(f"  ⚠️ {l['nombre']}: {error}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\nReporte guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
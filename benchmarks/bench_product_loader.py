@@ -0,0 +1,114 @@
+"""
+Benchmark de carga del catalogo de productos (productos/*.xls, *.xlsx).
+
+Compara la conversion DataFrame -> registros de la implementacion anterior
+(iterrows + conversiones por celda) con la implementacion columnar actual de
+`cargar_productos_catalogo`, y verifica que ambas produzcan el mismo resultado.
+
+Uso:
+    python -m benchmarks.bench_product_loader [--repeticiones 5]
+"""
+import os
+import sys
+import time
+import argparse
+import unicodedata
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.homologacion.product_loader import _leer_excel, _productos_desde_dataframe
+
+CARPETA_PRODUCTOS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "productos"))
+
+
+def _productos_desde_dataframe_iterrows(raw_df: pd.DataFrame) -> list:
+    """
+    Implementacion original (iterrows), conservada solo como linea base.
+    """
+    header_idx = 0
+    for idx, row in raw_df.iterrows():
+        row_str = " ".join(row.astype(str).str.lower())
+        if "cod_prod" in row_str and "producto" in row_str:
+            header_idx = idx
+            break
+
+    df = raw_df.copy()
+    df.columns = df.iloc[header_idx].astype(str).str.strip().str.lower()
+    df = df.iloc[header_idx+1:].reset_index(drop=True)
+
+    def clean_col(c):
+        c = str(c).strip().lower()
+        return unicodedata.normalize('NFD', c).encode('ascii', 'ignore').decode('utf-8')
+
+    df.columns = [clean_col(c) for c in df.columns]
+    df = df.dropna(subset=["cod_prod"])
+
+    productos = []
+    for _, row in df.iterrows():
+        cod_prod_str = str(row["cod_prod"]).strip()
+        if cod_prod_str.lower() == "nan" or not cod_prod_str:
+            continue
+        cantidad = row.get("cantidad", 0)
+        if pd.isna(cantidad):
+            cantidad = 0
+        productos.append({
+            "codigo": cod_prod_str,
+            "nombre": str(row["producto"]).strip(),
+            "descripcion": str(row["descripcion"]).strip(),
+            "stock_disponible": int(float(cantidad)),
+            "ubicacion_stock": str(row["ubicacion"]).strip(),
+            "codigo_tienda": str(row["cod_tienda"]).strip()
+        })
+    return productos
+
+
+def _medir(fn, raw_df, repeticiones: int):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = fn(raw_df)
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga del catalogo de productos")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    archivos = sorted(
+        f for f in os.listdir(CARPETA_PRODUCTOS)
+        if f.endswith((".xls", ".xlsx")) and not f.startswith("~$")
+    )
+    if not archivos:
+        print(f"No hay archivos Excel en {CARPETA_PRODUCTOS}")
+        return
+
+    print(f"{'archivo':<60} {'filas':>7} {'lectura_s':>10} {'iterrows_s':>11} {'columnar_s':>11} {'speedup':>8}")
+    for archivo in archivos:
+        ruta = os.path.join(CARPETA_PRODUCTOS, archivo)
+        t0 = time.perf_counter()
+        try:
+            raw_df = _leer_excel(ruta)
+        except Exception as e:
+            print(f"{archivo[:60]:<60} error de lectura: {e}")
+            continue
+        t_lectura = time.perf_counter() - t0
+
+        t_legacy, legacy = _medir(_productos_desde_dataframe_iterrows, raw_df, args.repeticiones)
+        t_nuevo, nuevo = _medir(_productos_desde_dataframe, raw_df, args.repeticiones)
+
+        if legacy != nuevo:
+            print(f"{archivo[:60]:<60} ⚠️ resultados distintos entre implementaciones")
+
+        print(
+            f"{archivo[:60]:<60} {len(nuevo):>7} {t_lectura:>10.3f} {t_legacy:>11.4f} "
+            f"{t_nuevo:>11.4f} {t_legacy / t_nuevo if t_nuevo else float('inf'):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de arranque en frío: tiempo de importación del worker (`-X importtime`).
+
+Cada medición corre en un proceso nuevo (sin módulos ya cargados). Por módulo
+reporta el tiempo total de importación (mediana y mínimo) y el costo propio
+agrupado por paquete de primer nivel. Además verifica que los paquetes pesados
+(SDKs de IA, pandas, langgraph, numpy) no se importen al arrancar el worker: se
+cargan al procesar el primer mensaje (o en la precarga en segundo plano).
+
+Termina con código 1 si la mediana de `src.worker` supera --presupuesto-ms o si
+algún paquete pesado se importa al arrancar.
+
+Uso:
+    python -m benchmarks.bench_startup [--repeticiones 5] [--presupuesto-ms 400] [--top 10]
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MODULOS = ("src.worker", "src.graph.semantic_graph")
+# No deben importarse al arrancar el worker
+PAQUETES_DIFERIDOS = ("openai", "google.generativeai", "pandas", "langgraph", "langchain_core", "numpy", "tqdm")
+
+_LINEA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def _medir_importacion(modulo: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Importa `modulo` en un proceso nuevo. Retorna (ms totales, {módulo: µs propios}).
+    """
+    entorno = dict(os.environ, PYTHONPATH=RAIZ, PYTHONDONTWRITEBYTECODE="1")
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    propios: Dict[str, int] = {}
+    total_us = 0
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if not coincidencia:
+            continue
+        propio, acumulado, _, nombre = coincidencia.groups()
+        propios[nombre] = int(propio)
+        if nombre == modulo:
+            total_us = int(acumulado)
+    return total_us / 1000.0, propios
+
+
+def _por_paquete(propios: Dict[str, int]) -> List[Tuple[str, float]]:
+    paquetes: Dict[str, int] = defaultdict(int)
+    for nombre, us in propios.items():
+        paquetes[nombre.split(".")[0]] += us
+    return sorted(((p, us / 1000.0) for p, us in paquetes.items()), key=lambda x: -x[1])
+
+
+def _importados(propios: Dict[str, int], paquete: str) -> bool:
+    return any(n == paquete or n.startswith(paquete + ".") for n in propios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío del worker")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto-ms", type=float, default=400.0,
+                        help="Máximo aceptable (mediana) para importar src.worker")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    fallas: List[str] = []
+    for modulo in MODULOS:
+        tiempos = []
+        propios: Dict[str, int] = {}
+        for _ in range(args.repeticiones):
+            ms, propios = _medir_importacion(modulo)
+            tiempos.append(ms)
+        mediana = statistics.median(tiempos)
+
+        print(f"\n=== import {modulo} ===")
+        print(f"mediana {mediana:8.1f} ms | mínimo {min(tiempos):8.1f} ms | {len(propios)} módulos")
+        print(f"{'paquete':<30} {'propio_ms':>10}")
+        for paquete, ms in _por_paquete(propios)[:args.top]:
+            print(f"{paquete:<30} {ms:>10.1f}")
+
+        if modulo == "src.worker":
+            if mediana > args.presupuesto_ms:
+                fallas.append(f"src.worker tarda {mediana:.1f} ms (presupuesto {args.presupuesto_ms:.0f} ms)")
+            for paquete in PAQUETES_DIFERIDOS:
+                if _importados(propios, paquete):
+                    fallas.append(f"src.worker importa {paquete} al arrancar")
+
+    if fallas:
+        print("\n⚠️ Presupuesto de arranque excedido:")
+        for falla in fallas:
+            print(f"  - {falla}")
+        sys.exit(1)
+    print(f"\n✅ Arranque dentro del presupuesto ({args.presupuesto_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ from src.services.embedding_service import run_embedding_batch
 from src.main import main as run_graph
 
 def main():
+    from src.utils.logging_config import configurar_logging
+    configurar_logging()
     parser = argparse.ArgumentParser(description="Ejecutar Pipeline de Extracción Semántica")
     parser.add_argument("doc_id", help="ID del documento principal (nombre carpeta en archivos_texto)")
     parser.add_argument("--lic_id", help="ID de la licitación (opcional, default=doc_id)", default=None)
@@ -0,0 +1,7 @@
+-- Re-extracción incremental: fingerprint de la evidencia usada por cada semantic_run
+-- (hash de chunks recuperados + versión/plantillas de prompt + versión de extractor + modelo).
+ALTER TABLE public.semantic_runs ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_semantic_runs_fingerprint
+    ON public.semantic_runs (licitacion_id, concepto, fingerprint)
+    WHERE is_current = true;
@@ -1,8 +1,30 @@
-from openai import OpenAI
+import logging
+import threading
 from src import config
+from src.utils.tracing import trazar
 
-client = OpenAI(api_key=config.API_KEY)
+logger = logging.getLogger(__name__)
 
+# Cliente OpenAI de embeddings: se construye en el primer uso (importar `openai` toma
+# cientos de ms y el worker no lo necesita hasta el primer mensaje). Asignar `client`
+# directamente reemplaza el cliente (benchmarks).
+client = None
+_client_lock = threading.Lock()
+
+
+def _obtener_cliente():
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
+                from src.services.ai_engine.replay_provider import envolver_cliente_embeddings
+                # Con AI_REPLAY_MODE=record/replay las llamadas se graban o se sirven desde AI_REPLAY_PATH
+                client = envolver_cliente_embeddings(OpenAI(api_key=config.API_KEY))
+    return client
+
+
+@trazar("embeddings.generar_embedding")
 def generar_embedding(texto, model="text-embedding-3-small"):
     """
     Genera un embedding para el texto utilizando el modelo especificado.
@@ -15,16 +37,17 @@ def generar_embedding(texto, model="text-embedding-3-small"):
         list: Vector de embedding generado.
     """
     try:
-        respuesta = client.embeddings.create(
+        respuesta = _obtener_cliente().embeddings.create(
             model=model,
             input=texto
         )
         vector = respuesta.data[0].embedding
         return vector
     except Exception as e:
-        print(f"[❌ ERROR] Al generar embedding: {e}")
+        logger.error("[❌ ERROR] Al generar embedding: %s", e)
         return []
 
+@trazar("embeddings.get_embeddings")
 def get_embeddings(textos, model="text-embedding-3-small"):
     """
     Genera embeddings para una lista de textos.
@@ -37,11 +60,11 @@ def get_embeddings(textos, model="text-embedding-3-small"):
         list[list[float]]: Lista de vectores de embeddings.
     """
     try:
-        respuesta = client.embeddings.create(
+        respuesta = _obtener_cliente().embeddings.create(
             model=model,
             input=textos
         )
         return [r.embedding for r in respuesta.data]
     except Exception as e:
-        print(f"[❌ ERROR] Al generar embeddings múltiples: {e}")
+        logger.error("[❌ ERROR] Al generar embeddings múltiples: %s", e)
         return []
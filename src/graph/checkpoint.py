@@ -0,0 +1,246 @@
+"""
+Checkpoints por nodo del grafo semántico.
+
+Cada salida exitosa de un nodo se guarda bajo (checkpoint_key, nodo), donde
+checkpoint_key = licitacion_id + hash de la entrada (documentos del mensaje y su
+versión vigente, `doc_version:{doc_id}` en Redis; si algún documento no tiene versión
+la ejecución corre sin checkpoints). Si el job falla o el worker se cae, al re-encolar
+la licitación los nodos ya completados devuelven su salida guardada y solo se ejecuta
+lo pendiente (sin repetir llamadas LLM).
+
+Backends (GRAPH_CHECKPOINT_BACKEND):
+- "sqlite" (default): archivo local GRAPH_CHECKPOINT_SQLITE_PATH
+- "redis": hash `graph_checkpoint:{checkpoint_key}` con expiración
+- "none": sin checkpoints
+
+Las salidas con errores, vacías o que el nodo declara incompletas no se guardan, y
+al terminar el grafo sin errores se eliminan los checkpoints de la ejecución.
+
+Por qué no un checkpointer de LangGraph (`compile(checkpointer=...)`):
+- Los savers persistentes viven en paquetes aparte (langgraph-checkpoint-sqlite,
+  -postgres, -redis) que no están en requirements.txt, y el de Redis requiere los
+  módulos RedisJSON/RediSearch (Redis Stack); la cola y los chunks usan Redis plano.
+- Un checkpointer guarda el GraphState completo en cada superstep con historial por
+  thread; aquí basta la última salida de cada nodo, con TTL y borrado al terminar.
+- Reanudar con un checkpointer exige invocar con `None` sobre el mismo thread_id y
+  distinguir en el worker un reintento de una ejecución nueva. Con la memoización por
+  nodo el worker siempre invoca el grafo con un estado inicial nuevo y la llave
+  (documentos + versiones) decide qué se reutiliza.
+La interfaz del store (obtener / guardar / limpiar) es la que habría que implementar
+para un backend Postgres.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "graph_checkpoint"
+
+
+def _json_serial(obj):
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
+
+
+def versiones_documentos(licitacion_id: str, documento_ids: List[str]) -> Optional[Dict[str, str]]:
+    """
+    {prefijo: versión vigente} de los documentos del mensaje. Los documento_ids (UUID o
+    sufijos de Redis) se traducen al mismo prefijo "{lic}_{archivo}" que usan los nodos.
+
+    Retorna None si algún documento no tiene versión registrada: sin versión no se
+    puede saber si un checkpoint quedó obsoleto tras re-procesar los documentos, y
+    el llamador debe ejecutar sin checkpoints.
+    """
+    from src.utils.redis_client import get_redis_client
+    from src.services.licitacion_service import resolver_prefijos_documentos
+    from src.services.semantic_extraction.indice_chunks import version_documento
+
+    _, prefijos = resolver_prefijos_documentos(licitacion_id, documento_ids)
+    if not prefijos:
+        return None
+    cliente = get_redis_client()
+    versiones: Dict[str, str] = {}
+    for prefijo in prefijos:
+        version = version_documento(cliente, prefijo)
+        if version is None:
+            logger.info("[CHECKPOINT] Documento %s sin versión registrada.", prefijo)
+            return None
+        versiones[prefijo] = version
+    return versiones
+
+
+def calcular_checkpoint_key(
+    licitacion_id: str, documento_ids: List[str], versiones: Optional[Dict[str, Optional[str]]] = None
+) -> str:
+    """
+    Llave de la ejecución: la misma licitación con otros documentos, o con documentos
+    re-procesados desde el último intento (otra versión), es otra ejecución.
+    """
+    entrada = json.dumps({
+        "documento_ids": sorted(str(d) for d in documento_ids or []),
+        "versiones": versiones or {},
+    }, sort_keys=True)
+    return f"{licitacion_id}:{hashlib.sha1(entrada.encode('utf-8')).hexdigest()[:16]}"
+
+
+class SQLiteCheckpointStore:
+    """
+    Checkpoints en SQLite (una fila por checkpoint_key + nodo).
+    """
+
+    def __init__(self, ruta: str, ttl: int):
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self.ruta = ruta
+        self.ttl = ttl
+        # Los nodos de la fan-out corren en hilos distintos: una conexión protegida por lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS graph_checkpoints (
+                    checkpoint_key TEXT NOT NULL,
+                    nodo TEXT NOT NULL,
+                    salida TEXT NOT NULL,
+                    creado_en REAL NOT NULL,
+                    PRIMARY KEY (checkpoint_key, nodo)
+                )
+            """)
+            self._conn.execute("DELETE FROM graph_checkpoints WHERE creado_en < ?", (time.time() - ttl,))
+
+    def obtener(self, checkpoint_key: str, nodo: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT salida FROM graph_checkpoints WHERE checkpoint_key = ? AND nodo = ? AND creado_en >= ?",
+                (checkpoint_key, nodo, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def guardar(self, checkpoint_key: str, nodo: str, salida: Dict[str, Any]) -> None:
+        valor = json.dumps(salida, ensure_ascii=False, default=_json_serial)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO graph_checkpoints (checkpoint_key, nodo, salida, creado_en) VALUES (?, ?, ?, ?)",
+                (checkpoint_key, nodo, valor, time.time())
+            )
+
+    def limpiar(self, checkpoint_key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM graph_checkpoints WHERE checkpoint_key = ?", (checkpoint_key,))
+
+
+class RedisCheckpointStore:
+    """
+    Checkpoints en Redis: un hash por ejecución (campo = nodo) con expiración.
+    """
+
+    def __init__(self, redis_client, ttl: int):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def _clave(self, checkpoint_key: str) -> str:
+        return f"{REDIS_PREFIX}:{checkpoint_key}"
+
+    def obtener(self, checkpoint_key: str, nodo: str) -> Optional[Dict[str, Any]]:
+        valor = self.redis.hget(self._clave(checkpoint_key), nodo)
+        return json.loads(valor) if valor else None
+
+    def guardar(self, checkpoint_key: str, nodo: str, salida: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hset(self._clave(checkpoint_key), nodo, json.dumps(salida, ensure_ascii=False, default=_json_serial))
+        pipe.expire(self._clave(checkpoint_key), self.ttl)
+        pipe.execute()
+
+    def limpiar(self, checkpoint_key: str) -> None:
+        self.redis.delete(self._clave(checkpoint_key))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def obtener_checkpoint_store():
+    """
+    Store configurado (singleton por proceso) o None si los checkpoints están
+    deshabilitados o el backend no está disponible.
+    """
+    global _store
+    backend = str(config.GRAPH_CHECKPOINT_BACKEND).lower()
+    if backend == "none":
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                if backend == "redis":
+                    from src.utils.redis_client import get_redis_client
+                    _store = RedisCheckpointStore(get_redis_client(), config.GRAPH_CHECKPOINT_TTL)
+                else:
+                    _store = SQLiteCheckpointStore(config.GRAPH_CHECKPOINT_SQLITE_PATH, config.GRAPH_CHECKPOINT_TTL)
+            except Exception as e:
+                logger.warning("[CHECKPOINT] Backend %s no disponible, se continua sin checkpoints: %s", backend, e)
+                return None
+        return _store
+
+
+def _salida_guardable(salida: Any) -> bool:
+    """
+    Solo se guardan salidas sin errores y con al menos un valor no vacío.
+    """
+    if not isinstance(salida, dict) or salida.get("errors"):
+        return False
+    return any(valor not in (None, "", [], {}) for valor in salida.values())
+
+
+def con_checkpoint(
+    nodo: str,
+    fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+    es_completa: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Envuelve un nodo del grafo: si hay una salida guardada para (checkpoint_key, nodo)
+    la retorna sin ejecutar; si no, ejecuta y guarda la salida cuando no trae errores,
+    no está vacía y (si se indica) `es_completa(salida)` es verdadero.
+    """
+    def _nodo(state: Dict[str, Any]) -> Dict[str, Any]:
+        checkpoint_key = state.get("checkpoint_key")
+        store = obtener_checkpoint_store() if checkpoint_key else None
+        if store is None:
+            return fn(state)
+
+        try:
+            guardada = store.obtener(checkpoint_key, nodo)
+        except Exception as e:
+            logger.warning("[CHECKPOINT] Error leyendo checkpoint %s/%s: %s", checkpoint_key, nodo, e)
+            guardada = None
+        if guardada is not None:
+            logger.info("⏩ [Checkpoint] Nodo '%s' ya completado para %s. Se reutiliza su salida.", nodo, checkpoint_key)
+            return guardada
+
+        salida = fn(state)
+        if _salida_guardable(salida) and (es_completa is None or es_completa(salida)):
+            try:
+                store.guardar(checkpoint_key, nodo, salida)
+            except Exception as e:
+                logger.warning("[CHECKPOINT] Error guardando checkpoint %s/%s: %s", checkpoint_key, nodo, e)
+        return salida
+
+    _nodo.__name__ = getattr(fn, "__name__", nodo)
+    return _nodo
+
+
+def limpiar_checkpoints(checkpoint_key: Optional[str]) -> None:
+    store = obtener_checkpoint_store() if checkpoint_key else None
+    if store is None:
+        return
+    try:
+        store.limpiar(checkpoint_key)
+    except Exception as e:
+        logger.warning("[CHECKPOINT] Error limpiando checkpoints de %s: %s", checkpoint_key, e)
@@ -1,21 +1,28 @@
+import logging
 import operator
 from typing import TypedDict, List, Dict, Any, Optional, Annotated
 from langgraph.graph import StateGraph, END
 
+logger = logging.getLogger(__name__)
+
 # --- SubGraph State ---
 class ItemsSubGraphState(TypedDict):
     licitacion_id: str
     documento_ids: List[str]
     semantic_chunks: List[Dict[str, Any]]
     pre_extracted_items: List[Dict[str, Any]]
+    chunks_resueltos: List[str]
+    formato_detectado: Optional[str]
+    confianza_formato: float
+    politica_verificacion: str
     final_items_result: Dict[str, Any]
+    fingerprint: Optional[str]
+    force: bool
     errors: Annotated[List[str], operator.add]
 
-from src.utils.normalizer import normalizar_unidad
-
 # --- Nodes ---
 def node_semantic_locator(state: ItemsSubGraphState) -> ItemsSubGraphState:
-    print(f" [ItemsSubGraph] Ejecutando SemanticLocatorNode...")
+    logger.info(" [ItemsSubGraph] Ejecutando SemanticLocatorNode...")
     from src.services.semantic_extraction.runner import (
         load_documents_to_memory,
         semantic_search_in_memory
@@ -67,152 +74,457 @@ def node_semantic_locator(state: ItemsSubGraphState) -> ItemsSubGraphState:
         return (file_int, page_num)
         
     all_chunks.sort(key=get_sort_key)
-    print(f"   -- Total chunks unicos ordenados logicamente: {len(all_chunks)}")
+    logger.info("   -- Total chunks unicos ordenados logicamente: %s", len(all_chunks))
     
     return {"semantic_chunks": all_chunks}
 
+def node_fingerprint_check(state: ItemsSubGraphState) -> ItemsSubGraphState:
+    """
+    Calcula el fingerprint de ITEMS_LICITACION (chunks recuperados, prompts, modelo y
+    umbrales de la política). Si coincide con el del run vigente se reutiliza su
+    resultado y el subgrafo termina sin parser ni LLM.
+    """
+    logger.info(" [ItemsSubGraph] Ejecutando FingerprintCheckNode...")
+    from src import config
+    from src.services.llm_service import configuracion_llm_por_defecto
+    from src.services.semantic_extraction.runner import _get_pg_conn, MODO_DEBUG
+    from src.services.semantic_extraction.fingerprint import calcular_fingerprint, buscar_resultado_vigente
+    from src.services.semantic_extraction.extractors.items_licitacion.items_licitacion_extractor import PROMPT_VERSION
+    
+    if MODO_DEBUG:
+        return {"fingerprint": None}
+    
+    licitacion_id = state.get("licitacion_id")
+    config_llm = configuracion_llm_por_defecto()
+    fingerprint = calcular_fingerprint(
+        "ITEMS_LICITACION",
+        state.get("semantic_chunks", []),
+        PROMPT_VERSION,
+        f"subgrafo:{config.ITEMS_UMBRAL_OMITIR_LLM}/{config.ITEMS_UMBRAL_VALIDACION_LLM}/{config.ITEMS_SHARD_MAX_CHARS}",
+        f"{config_llm['engine']}:{config_llm['model']}",
+    )
+    if state.get("force"):
+        return {"fingerprint": fingerprint}
+    
+    try:
+        conn = _get_pg_conn()
+        try:
+            vigente = buscar_resultado_vigente(conn, licitacion_id, "ITEMS_LICITACION", fingerprint)
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning("   -- No se pudo consultar el fingerprint vigente: %s", e)
+        vigente = None
+    
+    if not vigente:
+        return {"fingerprint": fingerprint}
+    
+    semantic_run_id, result = vigente
+    result["semantic_run_id"] = semantic_run_id
+    result["reutilizado"] = True
+    logger.info("   -- Evidencia sin cambios (fingerprint %s). Se reutiliza semantic_run %s.", fingerprint[:12], semantic_run_id)
+    return {"fingerprint": fingerprint, "final_items_result": result}
+
+def _ruta_fingerprint(state: ItemsSubGraphState) -> str:
+    return "reutilizar" if (state.get("final_items_result") or {}).get("reutilizado") else "extraer"
+
 def node_format_parser(state: ItemsSubGraphState) -> ItemsSubGraphState:
-    print(f" [ItemsSubGraph] Ejecutando FormatParserRouterNode...")
+    logger.info(" [ItemsSubGraph] Ejecutando FormatParserRouterNode...")
     semantic_chunks = state.get("semantic_chunks", [])
     
     if not semantic_chunks:
-        print(f"   -- No hay chunks semanticos. Saltando parser.")
+        logger.info("   -- No hay chunks semanticos. Saltando parser.")
         return {"pre_extracted_items": []}
         
-    import json
+    # Formatos conocidos (Ficha JSON, Compra Ágil, Licitación Pública, Convenio Marco): se queda el de mayor confianza
+    from src.services.semantic_extraction.extractors.items_licitacion.format_registry import detectar_y_extraer
+    
+    deteccion = detectar_y_extraer(semantic_chunks)
+    if not deteccion:
+        logger.info("   -- Ningun formato conocido reconocio items.")
+        return {"pre_extracted_items": [], "formato_detectado": None, "confianza_formato": 0.0}
     
-    # 1. Intentar extracción prioritaria desde JSON (Ficha Compra Agil)
-    items_json = []
-    json_found = False
+    logger.info("   -- Formato %s: %s items base (confianza=%s, %s paginas resueltas).", deteccion['formato'], len(deteccion['items']), deteccion['confianza'], len(deteccion['chunks_resueltos']))
     
-    for chunk in semantic_chunks:
-        redis_key = chunk.get("redis_key", "")
-        if ".json" in redis_key.lower():
+    return {
+        "pre_extracted_items": deteccion["items"],
+        "chunks_resueltos": deteccion["chunks_resueltos"],
+        "formato_detectado": deteccion["formato"],
+        "confianza_formato": deteccion["confianza"],
+    }
+
+def _resultado_deterministico(licitacion_id: str, items: List[Dict[str, Any]], formato: str, confianza: float) -> Dict[str, Any]:
+    return {
+        "concepto": "ITEMS_LICITACION",
+        "licitacion_id": licitacion_id,
+        "codigo_licitacion": None,
+        "resumen": {
+            "total_items_detectados": len(items),
+            "observaciones": f"Extracción determinística por formato {formato} (confianza={confianza}); verificación LLM omitida."
+        },
+        "items": items,
+        "especificaciones": [],
+        "warnings": [],
+    }
+
+def _persistir_resultado_items(licitacion_id: str, semantic_chunks: List[Dict[str, Any]], result: Dict[str, Any], fingerprint: Optional[str] = None) -> None:
+    """
+    Guarda el resultado en disco y, fuera de modo debug, crea el semantic_run con sus
+    resultados, evidencias, ítems y especificaciones. Agrega `semantic_run_id` al resultado.
+    """
+    from src.utils.tracing import span
+    with span("db.persistir_resultado_items", licitacion_id=licitacion_id, evidencias=len(semantic_chunks)):
+        _persistir_resultado_items_db(licitacion_id, semantic_chunks, result, fingerprint)
+
+def _persistir_resultado_items_db(licitacion_id: str, semantic_chunks: List[Dict[str, Any]], result: Dict[str, Any], fingerprint: Optional[str]) -> None:
+    import json
+    from src.services.semantic_extraction.runner import _guardar_json_en_disco, _get_pg_conn, MODO_DEBUG
+    from src.services.licitacion_service import guardar_items_licitacion, guardar_especificaciones_tecnicas
+    from src.services.semantic_extraction.fingerprint import registrar_fingerprint
+    
+    try:
+        nombre_licitacion = f"lic_{licitacion_id}"
+        _guardar_json_en_disco(nombre_licitacion, "ITEMS_LICITACION", result)
+        
+        if not MODO_DEBUG:
+            conn = _get_pg_conn()
+            cur = conn.cursor()
             try:
-                print(f"   -- Encontrado chunk de JSON: {redis_key}")
-                data = json.loads(chunk["texto"])
+                cur.execute("UPDATE semantic_runs SET is_current = false WHERE licitacion_id = %s AND concepto = %s AND is_current = true", (licitacion_id, "ITEMS_LICITACION"))
+                cur.execute("INSERT INTO semantic_runs (licitacion_id, concepto, is_current) VALUES (%s, %s, true) RETURNING id", (licitacion_id, "ITEMS_LICITACION"))
+                run_id = cur.fetchone()[0]
+                registrar_fingerprint(cur, run_id, fingerprint)
                 
-                payload = data.get("payload") if isinstance(data, dict) else None
-                productos = []
-                if payload and isinstance(payload, dict):
-                    productos = payload.get("productos_solicitados", [])
-                elif isinstance(data, list):
-                    productos = data 
-                elif isinstance(data, dict) and "productos_solicitados" in data:
-                    productos = data["productos_solicitados"]
+                cur.execute("INSERT INTO semantic_results (semantic_run_id, concepto, resultado_json) VALUES (%s, %s, %s)", (run_id, "ITEMS_LICITACION", json.dumps(result)))
                 
-                if productos:
-                    json_found = True
-                    for i, p in enumerate(productos):
-                        u_code = p.get("unidad_medida") or p.get("unidad") or "N/A"
-                        u_text = normalizar_unidad(u_code)
-
-                        item_base = {
-                            "item_key": f"json_{i+1}",
-                            "nombre_item": p.get("nombre") or p.get("nombre_producto"),
-                            "cantidad": p.get("cantidad"),
-                            "unidad": u_text,
-                            "descripcion": p.get("descripcion"),
-                            "codigo_producto": p.get("codigo_producto"),
-                            "fuente_resumen": "JSON Oficial (Mercado Público)"
-                        }
-                        items_json.append(item_base)
-                    
-                    print(f"   -- ✅ Extraídos {len(items_json)} ítems literales del JSON.")
-                    break
+                for c in semantic_chunks:
+                    cur.execute("INSERT INTO semantic_evidences (semantic_run_id, redis_key, texto_fragmento, score_similitud) VALUES (%s, %s, %s, %s)", (run_id, c["redis_key"], c["texto"], c.get("distancia")))
+                
+                if "items" in result and result["items"]:
+                    guardar_items_licitacion(conn, licitacion_id, str(run_id), result["items"])
+                    guardar_especificaciones_tecnicas(conn, str(run_id), result.get("especificaciones_tecnicas", []))
+
+                conn.commit()
+                result["semantic_run_id"] = str(run_id)
             except Exception as e:
-                print(f"   -- ⚠️ Error parseando JSON de chunk {redis_key}: {e}")
+                conn.rollback()
+                logger.error(" Error DB Persistencia: %s", e)
+            finally:
+                cur.close()
+                conn.close()
+    except Exception as file_e:
+        logger.error(" Error guardando JSON: %s", file_e)
+
+def node_verification_policy(state: ItemsSubGraphState) -> ItemsSubGraphState:
+    """
+    Decide cómo se verifica la pre-extracción:
+    - "persistir": ítems completos, schema válido y confianza >= ITEMS_UMBRAL_OMITIR_LLM (sin LLM)
+    - "enriquecer": ítems completos y schema válido; solo se piden especificaciones al LLM
+    - "verificar": verificación LLM (validación o extracción completa según la confianza)
+    """
+    logger.info(" [ItemsSubGraph] Ejecutando VerificationPolicyNode...")
+    from src import config
+    from src.services.semantic_extraction.extractors.items_licitacion.format_registry import item_completo
+    from src.services.semantic_extraction.extractors.items_licitacion.schema import (
+        validate_items_licitacion_schema,
+        ItemsLicitacionSchemaError,
+    )
+    
+    pre_extracted_items = state.get("pre_extracted_items") or []
+    confianza = state.get("confianza_formato") or 0.0
+    politica = "verificar"
+    
+    if pre_extracted_items and all(item_completo(item) for item in pre_extracted_items):
+        resultado = _resultado_deterministico(
+            state.get("licitacion_id"), pre_extracted_items, state.get("formato_detectado"), confianza
+        )
+        try:
+            validate_items_licitacion_schema(resultado)
+            politica = "persistir" if confianza >= config.ITEMS_UMBRAL_OMITIR_LLM else "enriquecer"
+        except ItemsLicitacionSchemaError as e:
+            logger.info("   -- Pre-extraccion completa pero no cumple schema: %s", e)
+    
+    logger.info("   -- Politica de verificacion: %s (formato=%s, confianza=%s)", politica, state.get('formato_detectado'), confianza)
+    return {"politica_verificacion": politica}
+
+def _ruta_verificacion(state: ItemsSubGraphState) -> str:
+    return state.get("politica_verificacion") or "verificar"
+
+def node_persist_deterministic(state: ItemsSubGraphState) -> ItemsSubGraphState:
+    logger.info(" [ItemsSubGraph] Ejecutando PersistDeterministicNode...")
+    licitacion_id = state.get("licitacion_id")
+    result = _resultado_deterministico(
+        licitacion_id, state.get("pre_extracted_items", []), state.get("formato_detectado"), state.get("confianza_formato") or 0.0
+    )
+    _persistir_resultado_items(licitacion_id, state.get("semantic_chunks", []), result, state.get("fingerprint"))
+    logger.info("   -- %s items persistidos sin verificacion LLM.", len(result['items']))
+    return {"final_items_result": result}
 
-    if json_found and items_json:
-        return {"pre_extracted_items": items_json}
+def _seleccionar_chunks_enriquecimiento(items: List[Dict[str, Any]], semantic_chunks: List[Dict[str, Any]], max_chunks: int) -> List[Dict[str, Any]]:
+    """
+    Páginas citadas por los ítems más las que mencionan sus nombres (por cobertura de
+    palabras), hasta `max_chunks`. Los chunks ya resueltos por el parser de formato
+    (ej. la ficha JSON) no aportan especificaciones nuevas y quedan fuera.
+    """
+    from src.services.homologacion.homologacion_cache import normalizar_descripcion
+    
+    citadas = {f.get("redis_key") for item in items for f in item.get("fuentes", [])}
+    palabras_items = [
+        {p for p in normalizar_descripcion(item.get("nombre_item")).split() if len(p) > 3}
+        for item in items
+    ]
+    
+    puntajes = []
+    for orden, c in enumerate(semantic_chunks):
+        if ".json" in c["redis_key"].lower():
+            continue
+        palabras_chunk = set(normalizar_descripcion(c["texto"]).split())
+        menciones = sum(
+            1 for palabras in palabras_items
+            if palabras and len(palabras & palabras_chunk) >= max(1, len(palabras) // 2)
+        )
+        if c["redis_key"] in citadas or menciones:
+            puntajes.append((c["redis_key"] in citadas, menciones, -orden, c))
+    
+    puntajes.sort(key=lambda x: x[:3], reverse=True)
+    seleccion = [x[3] for x in puntajes[:max_chunks]]
+    # Mantener el orden lógico (archivo -> página) del locator
+    orden_original = {id(c): i for i, c in enumerate(semantic_chunks)}
+    return sorted(seleccion, key=lambda c: orden_original[id(c)])
+
+def node_spec_enrichment(state: ItemsSubGraphState) -> ItemsSubGraphState:
+    """
+    Ítems completos bajo el umbral de omisión: un prompt acotado a esos ítems solo pide
+    especificaciones, criterios y exclusiones; nombre, cantidad y unidad no se tocan.
+    Si el LLM falla, se persisten los ítems sin enriquecer.
+    """
+    logger.info(" [ItemsSubGraph] Ejecutando SpecEnrichmentNode...")
+    from src import config
+    from src.services.llm_service import run_llm_raw
+    from src.services.semantic_extraction.runner import build_context
+    from src.services.semantic_extraction.registry import get_extractor
+    from src.services.semantic_extraction.extractors.items_licitacion.items_licitacion_extractor import clean_json_output
+    import copy
+    import json
+    
+    licitacion_id = state.get("licitacion_id")
+    semantic_chunks = state.get("semantic_chunks", [])
+    items = copy.deepcopy(state.get("pre_extracted_items", []))
+    fingerprint = state.get("fingerprint")
+    result = _resultado_deterministico(licitacion_id, items, state.get("formato_detectado"), state.get("confianza_formato") or 0.0)
+    
+    chunks_contexto = _seleccionar_chunks_enriquecimiento(items, semantic_chunks, config.ITEMS_ENRIQUECIMIENTO_MAX_CHUNKS)
+    if chunks_contexto:
+        items_prompt = [
+            {k: item.get(k) for k in ("item_key", "nombre_item", "cantidad", "unidad", "descripcion")}
+            for item in items
+        ]
+        extractor = get_extractor("ITEMS_LICITACION")(licitacion_id=licitacion_id)
+        template = extractor.load_prompt("items_licitacion/prompt_items_licitacion_enriquecimiento_v1.txt")
+        prompt = (
+            template
+            .replace("{items}", json.dumps(items_prompt, indent=2, ensure_ascii=False))
+            .replace("{contexto}", build_context(chunks_contexto))
+        )
+        logger.info("   -- Enriqueciendo %s items con %s/%s paginas.", len(items), len(chunks_contexto), len(semantic_chunks))
         
-    # 3. Fallback a parser determinístico
-    from src.services.semantic_extraction.extractors.items_licitacion.items_licitacion_stateful_parser import ItemsLicitacionStatefulParser
+        try:
+            raw_output = run_llm_raw(prompt, licitacion_id=licitacion_id, action="ENRIQUECIMIENTO_ITEMS")
+            data = json.loads(clean_json_output(raw_output))
+            enriquecidos = {e.get("item_key"): e for e in data.get("items", []) if isinstance(e, dict)}
+            for item in items:
+                extra = enriquecidos.get(item.get("item_key")) or {}
+                for campo in ("especificaciones", "criterios_cumplimiento", "exclusiones_o_prohibiciones"):
+                    valores = [str(v) for v in (extra.get(campo) or []) if v]
+                    item[campo] = list(dict.fromkeys((item.get(campo) or []) + valores))
+            result["resumen"]["observaciones"] = result["resumen"]["observaciones"].replace(
+                "verificación LLM omitida", "especificaciones enriquecidas por LLM"
+            )
+        except Exception as e:
+            logger.warning("   -- ⚠️ Error en enriquecimiento LLM, se persisten items sin enriquecer: %s", e)
+            result["warnings"].append(f"Enriquecimiento de especificaciones fallido: {e}")
+            # Resultado parcial: sin fingerprint para que la próxima corrida vuelva a enriquecer
+            fingerprint = None
+    else:
+        logger.info("   -- Sin paginas relevantes para enriquecer. Se persisten items sin enriquecer.")
+    
+    _persistir_resultado_items(licitacion_id, semantic_chunks, result, fingerprint)
+    return {"final_items_result": result}
+
+def _construir_shards(chunks: List[Dict[str, Any]], items: List[Dict[str, Any]], max_chars: int) -> List[Dict[str, Any]]:
+    """
+    Divide el contexto en shards por documento y rango de páginas (sin separar los
+    chunks de una misma página) de a lo más `max_chars`. Cada ítem pre-extraído se
+    asigna al shard que cubre la página de su fuente o, si esa página no está en el
+    contexto, al shard más cercano del mismo documento (o al primero).
+    """
+    from src.services.semantic_extraction.extractors.items_licitacion.items_licitacion_stateful_parser import documento_y_pagina_desde_redis_key
+    
+    shards: List[Dict[str, Any]] = []
+    por_documento: Dict[str, List[tuple]] = {}
+    for c in chunks:
+        documento, pagina = documento_y_pagina_desde_redis_key(c["redis_key"])
+        por_documento.setdefault(documento, []).append((pagina, c))
     
-    parser = ItemsLicitacionStatefulParser()
-    texto_completo = "\n".join([c["texto"] for c in semantic_chunks])
+    for documento, paginas in por_documento.items():
+        actual = None
+        for pagina, c in paginas:
+            largo = len(c["texto"])
+            if actual is None or (actual["chars"] + largo > max_chars and pagina != actual["pagina_fin"]):
+                actual = {"documento": documento, "pagina_inicio": pagina, "pagina_fin": pagina, "chunks": [], "items": [], "chars": 0}
+                shards.append(actual)
+            actual["chunks"].append(c)
+            actual["pagina_fin"] = pagina
+            actual["chars"] += largo
     
-    items_extraidos = parser.parsear_texto(texto_completo)
-    print(f"   -- Parser deterministico encontro {len(items_extraidos)} items base.")
+    if not shards:
+        shards.append({"documento": None, "pagina_inicio": 0, "pagina_fin": 0, "chunks": [], "items": [], "chars": 0})
     
-    return {"pre_extracted_items": items_extraidos}
+    for item in items:
+        fuentes = item.get("fuentes") or []
+        documento, pagina = documento_y_pagina_desde_redis_key(fuentes[0].get("redis_key")) if fuentes else (None, 0)
+        candidatos = [sh for sh in shards if sh["documento"] == documento] or shards[:1]
+        destino = min(
+            candidatos,
+            key=lambda sh: 0 if sh["pagina_inicio"] <= pagina <= sh["pagina_fin"] else min(abs(pagina - sh["pagina_inicio"]), abs(pagina - sh["pagina_fin"]))
+        )
+        destino["items"].append(item)
+    
+    return shards
 
 def node_llm_verification(state: ItemsSubGraphState) -> ItemsSubGraphState:
-    print(f" [ItemsSubGraph] Ejecutando LLMVerificationNode...")
+    logger.info(" [ItemsSubGraph] Ejecutando LLMVerificationNode...")
+    from src import config
     from src.services.semantic_extraction.runner import build_context
     from src.services.semantic_extraction.registry import get_extractor
+    from src.services.semantic_extraction.extractors.items_licitacion.item_merger import fusionar_items
+    from concurrent.futures import ThreadPoolExecutor
+    import contextvars
     import json
     
     licitacion_id = state.get("licitacion_id")
     semantic_chunks = state.get("semantic_chunks", [])
     pre_extracted_items = state.get("pre_extracted_items", [])
+    formato = state.get("formato_detectado")
+    confianza = state.get("confianza_formato") or 0.0
     
     extractor_cls = get_extractor("ITEMS_LICITACION")
-    extractor = extractor_cls(licitacion_id=licitacion_id)
+    modo_prompt = "completo"
     
-    context = build_context(semantic_chunks)
+    if pre_extracted_items and confianza >= config.ITEMS_UMBRAL_VALIDACION_LLM:
+        # Confianza media: prompt de validación solo con las páginas citadas por los ítems
+        modo_prompt = "validacion"
+        paginas_citadas = {f.get("redis_key") for item in pre_extracted_items for f in item.get("fuentes", [])}
+        chunks_contexto = [c for c in semantic_chunks if c["redis_key"] in paginas_citadas]
+        logger.info("   -- Formato %s con confianza %s: validacion LLM sobre %s paginas.", formato, confianza, len(chunks_contexto))
+    else:
+        # Extracción completa. Las páginas cuyos ítems ya cerró el parser no se vuelven a enviar;
+        # sus ítems van en ITEMS_PRE_EXTRAIDOS
+        chunks_resueltos = set(state.get("chunks_resueltos") or [])
+        chunks_contexto = [c for c in semantic_chunks if c["redis_key"] not in chunks_resueltos]
+        if chunks_resueltos:
+            logger.info("   -- Omitiendo %s paginas ya resueltas por el parser.", len(semantic_chunks) - len(chunks_contexto))
     
-    if pre_extracted_items:
-        context += f"\n\n==============================\n<ITEMS_PRE_EXTRAIDOS>\n"
-        context += json.dumps(pre_extracted_items, indent=2, ensure_ascii=False)
-        context += f"\n</ITEMS_PRE_EXTRAIDOS>\n==============================\n"
-        
-    try:
-        result = extractor.run(context)
-        print(f"   -- LLM devolvio {len(result.get('items', []))} items consolidados.")
-        
-        from src.services.semantic_extraction.runner import _guardar_json_en_disco, _get_pg_conn, MODO_DEBUG
-        from src.services.licitacion_service import guardar_items_licitacion, guardar_especificaciones_tecnicas
+    # Shards por documento / rango de páginas; cada uno con su propia instancia de extractor
+    shards = _construir_shards(chunks_contexto, pre_extracted_items, config.ITEMS_SHARD_MAX_CHARS)
+    logger.info("   -- Verificacion en %s shard(s): %s", len(shards), ", ".join(
+        f"{sh['documento']} p{sh['pagina_inicio']}-{sh['pagina_fin']} ({len(sh['chunks'])} chunks, {len(sh['items'])} items)" for sh in shards
+    ))
+    
+    def _verificar_shard(shard: Dict[str, Any]) -> Dict[str, Any]:
+        extractor = extractor_cls(licitacion_id=licitacion_id)
+        extractor.modo_prompt = modo_prompt
         
-        try:
-            nombre_licitacion = f"lic_{licitacion_id}"
-            _guardar_json_en_disco(nombre_licitacion, "ITEMS_LICITACION", result)
-            
-            if not MODO_DEBUG:
-                conn = _get_pg_conn()
-                cur = conn.cursor()
-                try:
-                    cur.execute("UPDATE semantic_runs SET is_current = false WHERE licitacion_id = %s AND concepto = %s AND is_current = true", (licitacion_id, "ITEMS_LICITACION"))
-                    cur.execute("INSERT INTO semantic_runs (licitacion_id, concepto, is_current) VALUES (%s, %s, true) RETURNING id", (licitacion_id, "ITEMS_LICITACION"))
-                    run_id = cur.fetchone()[0]
-                    
-                    cur.execute("INSERT INTO semantic_results (semantic_run_id, concepto, resultado_json) VALUES (%s, %s, %s)", (run_id, "ITEMS_LICITACION", json.dumps(result)))
-                    
-                    for c in semantic_chunks:
-                        cur.execute("INSERT INTO semantic_evidences (semantic_run_id, redis_key, texto_fragmento, score_similitud) VALUES (%s, %s, %s, %s)", (run_id, c["redis_key"], c["texto"], c.get("distancia")))
-                    
-                    if "items" in result and result["items"]:
-                        guardar_items_licitacion(conn, licitacion_id, str(run_id), result["items"])
-                        guardar_especificaciones_tecnicas(conn, str(run_id), result.get("especificaciones_tecnicas", []))
-
-                    conn.commit()
-                    result["semantic_run_id"] = str(run_id)
-                except Exception as e:
-                    conn.rollback()
-                    print(f" Error DB Persistencia: {e}")
-                finally:
-                    cur.close()
-                    conn.close()
-        except Exception as file_e:
-            print(f" Error guardando JSON: {file_e}")
-            
-        return {"final_items_result": result}
-    except Exception as e:
-        print(f"   -- Error en LLM: {e}")
-        return {"errors": [f"LLM Error: {str(e)}"]}
+        context = build_context(shard["chunks"])
+        if shard["items"]:
+            context += f"\n\n==============================\n<ITEMS_PRE_EXTRAIDOS>\n"
+            context += json.dumps(shard["items"], indent=2, ensure_ascii=False)
+            context += f"\n</ITEMS_PRE_EXTRAIDOS>\n==============================\n"
+        return extractor.run(context)
+    
+    resultados, errores = [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(config.ITEMS_SHARD_MAX_CONCURRENCIA, len(shards)))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _verificar_shard, shard) for shard in shards]
+        for shard, future in zip(shards, futures):
+            try:
+                resultados.append(future.result())
+            except Exception as e:
+                logger.error("   -- Error en LLM (shard %s p%s-%s): %s", shard['documento'], shard['pagina_inicio'], shard['pagina_fin'], e)
+                errores.append(f"LLM Error (shard {shard['documento']} p{shard['pagina_inicio']}-{shard['pagina_fin']}): {str(e)}")
+                if shard["items"]:
+                    # Sin verificación LLM se conservan los ítems pre-extraídos del shard
+                    logger.warning("   -- Shard %s p%s-%s: se conservan %s items pre-extraidos sin verificar.",
+                                   shard['documento'], shard['pagina_inicio'], shard['pagina_fin'], len(shard["items"]))
+                    resultados.append({
+                        "concepto": "ITEMS_LICITACION",
+                        "resumen": {"total_items_detectados": len(shard["items"]), "observaciones": None},
+                        "items": shard["items"],
+                    })
+    
+    if not resultados:
+        return {"errors": errores}
+    
+    if len(resultados) == 1:
+        result = resultados[0]
+    else:
+        items = fusionar_items([r.get("items") or [] for r in resultados])
+        observaciones = [(r.get("resumen") or {}).get("observaciones") for r in resultados]
+        result = {
+            "concepto": "ITEMS_LICITACION",
+            "resumen": {
+                "total_items_detectados": len(items),
+                "observaciones": " | ".join(o for o in observaciones if o) or None,
+            },
+            "items": items,
+            "especificaciones": [e for r in resultados for e in (r.get("especificaciones") or [])],
+            "warnings": [w for r in resultados for w in (r.get("warnings") or [])],
+        }
+    if errores:
+        result.setdefault("warnings", []).extend(errores)
+    logger.info("   -- LLM devolvio %s items consolidados.", len(result.get('items', [])))
+    
+    # Con shards fallidos el resultado es parcial: sin fingerprint para no reutilizarlo
+    fingerprint = None if errores else state.get("fingerprint")
+    _persistir_resultado_items(licitacion_id, semantic_chunks, result, fingerprint)
+    
+    return {"final_items_result": result, "errors": errores}
 
 # --- Build SubGraph ---
 def build_items_subgraph():
+    from src.utils.tracing import trazar_nodo
     workflow = StateGraph(ItemsSubGraphState)
     
-    workflow.add_node("semantic_locator", node_semantic_locator)
-    workflow.add_node("format_parser", node_format_parser)
-    workflow.add_node("llm_verification", node_llm_verification)
+    workflow.add_node("semantic_locator", trazar_nodo("items.semantic_locator", node_semantic_locator, concepto="ITEMS_LICITACION"))
+    workflow.add_node("fingerprint_check", trazar_nodo("items.fingerprint_check", node_fingerprint_check, concepto="ITEMS_LICITACION"))
+    workflow.add_node("format_parser", trazar_nodo("items.format_parser", node_format_parser, concepto="ITEMS_LICITACION"))
+    workflow.add_node("verification_policy", trazar_nodo("items.verification_policy", node_verification_policy, concepto="ITEMS_LICITACION"))
+    workflow.add_node("persist_deterministic", trazar_nodo("items.persist_deterministic", node_persist_deterministic, concepto="ITEMS_LICITACION"))
+    workflow.add_node("spec_enrichment", trazar_nodo("items.spec_enrichment", node_spec_enrichment, concepto="ITEMS_LICITACION"))
+    workflow.add_node("llm_verification", trazar_nodo("items.llm_verification", node_llm_verification, concepto="ITEMS_LICITACION"))
     
     workflow.set_entry_point("semantic_locator")
     
-    workflow.add_edge("semantic_locator", "format_parser")
-    workflow.add_edge("format_parser", "llm_verification")
+    workflow.add_edge("semantic_locator", "fingerprint_check")
+    workflow.add_conditional_edges(
+        "fingerprint_check",
+        _ruta_fingerprint,
+        {
+            "reutilizar": END,
+            "extraer": "format_parser",
+        }
+    )
+    workflow.add_edge("format_parser", "verification_policy")
+    workflow.add_conditional_edges(
+        "verification_policy",
+        _ruta_verificacion,
+        {
+            "persistir": "persist_deterministic",
+            "enriquecer": "spec_enrichment",
+            "verificar": "llm_verification",
+        }
+    )
+    workflow.add_edge("persist_deterministic", END)
+    workflow.add_edge("spec_enrichment", END)
     workflow.add_edge("llm_verification", END)
     
     return workflow.compile()
@@ -1,6 +1,8 @@
 from typing import Literal
 from langgraph.graph import StateGraph, END
 from src.graph.state import GraphState
+from src.graph.checkpoint import con_checkpoint
+from src.utils.tracing import trazar_nodo
 
 # Importación de nodos
 from src.nodes.load_data.node import LoadDataNode
@@ -20,17 +22,22 @@ def node_extract_entregas(state: GraphState) -> GraphState: return ExtractEntreg
 def node_save(state: GraphState) -> GraphState: return SaveNode.execute(state)
 def node_homologation(state: GraphState) -> GraphState: return HomologationNode.execute(state)
 
+def _items_extraidos(salida: dict) -> bool:
+    # Un resultado sin ítems (subgrafo sin chunks o LLM fallido) se vuelve a extraer al reanudar
+    return bool((salida.get("extraction_items") or {}).get("items"))
+
 def build_semantic_graph():
     workflow = StateGraph(GraphState)
 
-    # Añadir nodos
-    workflow.add_node("load_data", node_load_data)
-    workflow.add_node("extract_finances", node_extract_finances)
-    workflow.add_node("extract_items", node_extract_items)
-    workflow.add_node("extract_basic_data", node_extract_basic_data)
-    workflow.add_node("extract_entregas", node_extract_entregas)
-    workflow.add_node("save", node_save)
-    workflow.add_node("homologation", node_homologation)
+    # Añadir nodos (los que llaman al LLM o escriben en BD se reanudan desde su checkpoint).
+    # El span envuelve al checkpoint para que los nodos reanudados también aparezcan en la traza
+    workflow.add_node("load_data", trazar_nodo("grafo.load_data", node_load_data))
+    workflow.add_node("extract_finances", trazar_nodo("grafo.extract_finances", con_checkpoint("extract_finances", node_extract_finances), concepto="FINANZAS_LICITACION"))
+    workflow.add_node("extract_items", trazar_nodo("grafo.extract_items", con_checkpoint("extract_items", node_extract_items, _items_extraidos), concepto="ITEMS_LICITACION"))
+    workflow.add_node("extract_basic_data", trazar_nodo("grafo.extract_basic_data", con_checkpoint("extract_basic_data", node_extract_basic_data), concepto="DATOS_BASICOS_LICITACION"))
+    workflow.add_node("extract_entregas", trazar_nodo("grafo.extract_entregas", con_checkpoint("extract_entregas", node_extract_entregas), concepto="ENTREGAS_LICITACION"))
+    workflow.add_node("save", trazar_nodo("grafo.save", con_checkpoint("save", node_save)))
+    workflow.add_node("homologation", trazar_nodo("grafo.homologation", con_checkpoint("homologation", node_homologation)))
 
     # Definir flujo
     workflow.set_entry_point("load_data")
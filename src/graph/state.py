@@ -16,3 +16,5 @@ class GraphState(TypedDict):
     status: str
     errors: Annotated[List[str], operator.add] # Accumulate errors from parallel branches
     current_step: str
+    checkpoint_key: Optional[str] # licitacion_id + hash de entrada; None deshabilita los checkpoints por nodo
+    force: bool # True ignora fingerprints y checkpoints y re-extrae todos los conceptos
@@ -1,9 +1,14 @@
+import logging
 import sys
 from src.graph.semantic_graph import build_semantic_graph
 from src.graph.state import GraphState
 
+logger = logging.getLogger(__name__)
+
 def main():
-    print("🚀 Iniciando extracción semántica (Local Test)...")
+    from src.utils.logging_config import configurar_logging
+    configurar_logging()
+    logger.info("🚀 Iniciando extracción semántica (Local Test)...")
     
     # Simple CLI argument parsing
     lic_id = "TEST_123"
@@ -18,7 +23,7 @@ def main():
         # Default fallback only if not provided
         doc_ids = ["doc_1"]
 
-    print(f"📋 Parametros: licitacion_id={lic_id}, doc_ids={doc_ids}")
+    logger.info("📋 Parametros: licitacion_id=%s, doc_ids=%s", lic_id, doc_ids)
     
     app = build_semantic_graph()
     
@@ -34,21 +39,21 @@ def main():
         current_step="init"
     )
     
-    print("▶️ Ejecutando grafo...")
+    logger.info("▶️ Ejecutando grafo...")
     result = app.invoke(initial_state)
     
-    print("\n✅ Proceso Finalizado.")
-    print(f"Estado Final: {result.get('status')}")
-    print(f"Errores: {result.get('errors')}")
+    logger.info("✅ Proceso Finalizado.")
+    logger.info("Estado Final: %s", result.get('status'))
+    logger.info("Errores: %s", result.get('errors'))
     
     if result.get("extraction_items"):
-        print(f"📦 Items extraidos: {len(result['extraction_items'].get('resultado_json', {}).get('items', []))}")
+        logger.info("📦 Items extraidos: %s", len(result['extraction_items'].get('resultado_json', {}).get('items', [])))
     
     if result.get("extraction_finances"):
-        print(f"💰 Finanzas extraidas: {result['extraction_finances'].get('resultado_json', {}).get('finanzas')}")
+        logger.info("💰 Finanzas extraidas: %s", result['extraction_finances'].get('resultado_json', {}).get('finanzas'))
 
     if result.get("extraction_basic_data"):
-        print(f"📋 Datos básicos extraidos: {result['extraction_basic_data'].get('resultado_json', {}).get('datos_basicos')}")
+        logger.info("📋 Datos básicos extraidos: %s", result['extraction_basic_data'].get('resultado_json', {}).get('datos_basicos'))
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,10 @@
+import logging
 from src.graph.state import GraphState
 from src.nodes.base_node import BaseNode
 from src.services.semantic_extraction.runner import run_semantic_extraction
 
+logger = logging.getLogger(__name__)
+
 class ExtractEntregasNode(BaseNode):
     @classmethod
     def execute(cls, state: GraphState) -> dict:
@@ -9,10 +12,10 @@ class ExtractEntregasNode(BaseNode):
         documento_ids = state.get("documento_ids", [])
         
         if not licitacion_id:
-            print(f"⚠️ [ExtractEntregasNode] No licitacion_id provided in state.")
+            logger.warning("⚠️ [ExtractEntregasNode] No licitacion_id provided in state.")
             return {}
 
-        print(f"🚚 [ExtractEntregasNode] Ejecutando extracción de Entregas para licitacion_id={licitacion_id}")
+        logger.info("🚚 [ExtractEntregasNode] Ejecutando extracción de Entregas para licitacion_id=%s", licitacion_id)
         
         import re
         internal_doc_prefixes = []
@@ -30,12 +33,13 @@ class ExtractEntregasNode(BaseNode):
                 documento_ids=internal_doc_prefixes if internal_doc_prefixes else documento_ids,
                 nombre_licitacion=f"lic_{licitacion_id}",
                 top_k=15, 
-                min_score=0.3
+                min_score=0.3,
+                force=state.get("force", False)
             )
             
-            print(f"✅ [ExtractEntregasNode] Extracción de entregas finalizada.")
+            logger.info("✅ [ExtractEntregasNode] Extracción de entregas finalizada.")
             return {"extraction_entregas": result}
 
         except Exception as e:
-            print(f"❌ [ExtractEntregasNode] Error en extracción: {e}")
+            logger.error("❌ [ExtractEntregasNode] Error en extracción: %s", e)
             return {"errors": [f"EntregasData: {str(e)}"]}
@@ -1,7 +1,10 @@
+import logging
 from src.graph.state import GraphState
 from src.nodes.base_node import BaseNode
 from src.services.semantic_extraction.runner import run_semantic_extraction
 
+logger = logging.getLogger(__name__)
+
 class ExtractFinancesNode(BaseNode):
     @classmethod
     def execute(cls, state: GraphState) -> dict:
@@ -9,10 +12,10 @@ class ExtractFinancesNode(BaseNode):
         documento_ids = state.get("documento_ids", [])
         
         if not licitacion_id:
-            print(f"⚠️ [ExtractFinancesNode] No licitacion_id provided in state.")
+            logger.warning("⚠️ [ExtractFinancesNode] No licitacion_id provided in state.")
             return {}
 
-        print(f"💰 [ExtractFinancesNode] Ejecutando extracción Financiera para licitacion_id={licitacion_id}")
+        logger.info("💰 [ExtractFinancesNode] Ejecutando extracción Financiera para licitacion_id=%s", licitacion_id)
         
         import re
         internal_doc_prefixes = []
@@ -30,12 +33,13 @@ class ExtractFinancesNode(BaseNode):
                 documento_ids=internal_doc_prefixes if internal_doc_prefixes else documento_ids,
                 nombre_licitacion=f"lic_{licitacion_id}",
                 top_k=20,
-                min_score=0.3
+                min_score=0.3,
+                force=state.get("force", False)
             )
             
-            print(f"✅ [ExtractFinancesNode] Extracción fianciera finalizada.")
+            logger.info("✅ [ExtractFinancesNode] Extracción fianciera finalizada.")
             return {"extraction_finances": result}
 
         except Exception as e:
-            print(f"❌ [ExtractFinancesNode] Error en extracción: {e}")
+            logger.error("❌ [ExtractFinancesNode] Error en extracción: %s", e)
             return {"errors": [f"Finances: {str(e)}"]}
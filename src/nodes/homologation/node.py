@@ -1,28 +1,31 @@
+import logging
 import os
 import psycopg2
 from src.graph.state import GraphState
 from src.nodes.base_node import BaseNode
 from src.services.homologacion.homologacion_service import ejecutar_homologacion_automatica
 
+logger = logging.getLogger(__name__)
+
 class HomologationNode(BaseNode):
     @classmethod
-    def execute(cls, state: GraphState) -> GraphState:
-        print(f"🔄 [HomologationNode] Iniciando homologación de la licitación {state['licitacion_id']}...")
+    def execute(cls, state: GraphState) -> dict: # Returns dict update
+        logger.info("🔄 [HomologationNode] Iniciando homologación de la licitación %s...", state['licitacion_id'])
         
         # Obtener conexion a base de datos
         db_url = os.getenv("DATABASE_URL")
         if not db_url:
-            print("⚠️ [HomologationNode] DATABASE_URL no está definido. Omitiendo homologación.")
-            state["errors"].append("DATABASE_URL no definida en el nodo de homologacion")
-            return state
+            logger.warning("⚠️ [HomologationNode] DATABASE_URL no está definido. Omitiendo homologación.")
+            return {"errors": ["DATABASE_URL no definida en el nodo de homologacion"]}
 
         try:
             conn = psycopg2.connect(db_url)
         except Exception as e:
-            print(f"⚠️ [HomologationNode] Error conectando a DB: {e}")
-            state["errors"].append(f"DB Error (Homologacion): {str(e)}")
-            return state
+            logger.warning("⚠️ [HomologationNode] Error conectando a DB: %s", e)
+            return {"errors": [f"DB Error (Homologacion): {str(e)}"]}
 
+        # Update step to represent completion of homologation
+        update = {"current_step": "homologation_completed"}
         try:
             import uuid
             licitacion_uuid = uuid.UUID(state["licitacion_id"])
@@ -34,16 +37,12 @@ class HomologationNode(BaseNode):
             )
             
             if resultado:
-                state["homologation_result"] = resultado
+                update["homologation_result"] = resultado
                 
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            print(f"⚠️ [HomologationNode] Error en proceso de homologación: {e}")
-            state["errors"].append(f"Error homologacion: {str(e)}")
+            logger.exception("⚠️ [HomologationNode] Error en proceso de homologación: %s", e)
+            update["errors"] = [f"Error homologacion: {str(e)}"]
         finally:
             conn.close()
 
-        # Update step to represent completion of homologation
-        state["current_step"] = "homologation_completed"
-        return state
+        return update
@@ -1,18 +1,20 @@
+import logging
 from src.graph.state import GraphState
 from src.nodes.base_node import BaseNode
 
+logger = logging.getLogger(__name__)
+
 class SaveNode(BaseNode):
     @classmethod
-    def execute(cls, state: GraphState) -> GraphState:
-        print(f"💾 [SaveNode] Guardando resultados...")
+    def execute(cls, state: GraphState) -> dict: # Returns dict update
+        logger.info("💾 [SaveNode] Guardando resultados...")
         
         # Simulación de guardado
-        print(f"   -> Finanzas guardadas: {state.get('extraction_finances')}")
+        logger.debug("   -> Finanzas guardadas: %s", state.get('extraction_finances'))
         
         items = state.get('extraction_items') or []
-        print(f"   -> Ítems guardados: {len(items)} items")
+        logger.info("   -> Ítems guardados: %s items", len(items))
 
-        print(f"   -> Entregas guardadas: {state.get('extraction_entregas')}")
+        logger.debug("   -> Entregas guardadas: %s", state.get('extraction_entregas'))
         
-        state["status"] = "completed"
-        return state
+        return {"status": "completed"}
@@ -1,8 +1,7 @@
 from typing import Dict, Any, Optional
 from src import config
 from .base import BaseAIProvider
-from .openai_provider import OpenAIProvider
-from .gemini_provider import GeminiProvider
+from .replay_provider import GrabadorProvider, ReplayProvider, modo_replay
 
 class AIProviderFactory:
     _instances: Dict[str, BaseAIProvider] = {}
@@ -11,31 +10,53 @@ class AIProviderFactory:
     def get_provider(config_dict: Dict[str, Any]) -> BaseAIProvider:
         """
         Retorna una instancia del proveedor adecuado según la configuración.
+        Con AI_REPLAY_MODE=replay (o engine "replay") todas las llamadas se sirven
+        desde el archivo de grabación; con AI_REPLAY_MODE=record el proveedor real
+        se envuelve para grabar sus respuestas.
         """
         engine = config_dict.get("engine", config.DEFAULT_AI_PROVIDER).lower()
+        modo = modo_replay()
+        if modo == "replay" and engine not in AIProviderFactory._instances:
+            engine = "replay"
 
         if engine in AIProviderFactory._instances:
             return AIProviderFactory._instances[engine]
 
         provider = None
-        if engine == "openai":
+        if engine == "replay":
+            provider = ReplayProvider()
+
+        elif engine == "openai":
             api_key = config.OPENAI_API_KEY
             if not api_key:
                 raise ValueError("OPENAI_API_KEY not found in config")
+            from .openai_provider import OpenAIProvider
             provider = OpenAIProvider(api_key)
         
         elif engine == "gemini":
             api_key = config.GEMINI_API_KEY
             if not api_key:
                 raise ValueError("GEMINI_API_KEY not found in config")
+            from .gemini_provider import GeminiProvider
             provider = GeminiProvider(api_key)
             
         else:
             raise ValueError(f"Unknown AI Engine: {engine}")
 
+        if modo == "record" and engine != "replay":
+            provider = GrabadorProvider(provider)
+
         AIProviderFactory._instances[engine] = provider
         return provider
 
+    @staticmethod
+    def register_provider(engine: str, provider: BaseAIProvider) -> None:
+        """
+        Registra (o reemplaza) la instancia que se retorna para un motor. Permite usar
+        proveedores sin API key (benchmarks, replay) sin tocar get_provider.
+        """
+        AIProviderFactory._instances[engine.lower()] = provider
+
     @staticmethod
     def create(provider_name: str) -> BaseAIProvider:
         """Helper rápido para crear por nombre"""
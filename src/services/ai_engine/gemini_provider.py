@@ -1,14 +1,19 @@
+import logging
 from .base import BaseAIProvider
 from typing import Dict, Any, Tuple
-import google.generativeai as genai
 import json
 import re
 import time
 import random
 
+logger = logging.getLogger(__name__)
+
 class GeminiProvider(BaseAIProvider):
     def __init__(self, api_key: str):
+        # El SDK se importa al crear el proveedor (la factory lo hace en la primera llamada)
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
+        self.genai = genai
 
     def generate_text(self, prompt: str, system_prompt: str, config: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
         model_name = config.get("model", "gemini-1.5-pro")
@@ -20,12 +25,12 @@ class GeminiProvider(BaseAIProvider):
 
         # Gemini maneja el system prompt al instanciar el modelo o en generate_content dependiendo de la versión
         # Usaremos la configuración de modelo system_instruction si está disponible, o lo concatenamos.
-        model = genai.GenerativeModel(
+        model = self.genai.GenerativeModel(
             model_name=model_name,
             system_instruction=system_prompt
         )
 
-        print(f"[GeminiProvider] 🚀 Enviando solicitud a {model_name}...")
+        logger.debug("[GeminiProvider] 🚀 Enviando solicitud a %s...", model_name)
         response = model.generate_content(
             prompt,
             generation_config=generation_config
@@ -55,12 +60,12 @@ class GeminiProvider(BaseAIProvider):
         # Gemini necesita la imagen decodificada como objeto blob o similar
         # "mime_type": "image/jpeg", "data": ...
         
-        model = genai.GenerativeModel(
+        model = self.genai.GenerativeModel(
             model_name=model_name,
             system_instruction=system_prompt
         )
         
-        print(f"[GeminiProvider] 🚀 Enviando imagen a {model_name}...")
+        logger.debug("[GeminiProvider] 🚀 Enviando imagen a %s...", model_name)
         
         # En Google GenAI SDK, pasamos un diccionario simple para blob
         # Asumimos PNG o JPEG.
@@ -86,11 +91,11 @@ class GeminiProvider(BaseAIProvider):
                 if "429" in error_str or "quota" in error_str.lower():
                     if attempt < max_retries:
                         delay = base_delay * (2 ** attempt) + 1 # Exponential: 5+1, 10+1, 20+1 ...
-                        print(f"[GeminiProvider] ⏳ Quota exceeded (429). Retrying in {delay}s... (Attempt {attempt+1}/{max_retries})")
+                        logger.warning("[GeminiProvider] ⏳ Quota exceeded (429). Retrying in %ss... (Attempt %s/%s)", delay, attempt+1, max_retries)
                         time.sleep(delay)
                         continue
                     else:
-                        print(f"[GeminiProvider] ❌ Max retries reached for 429 error.")
+                        logger.error("[GeminiProvider] ❌ Max retries reached for 429 error.")
                         raise e
                 else:
                     # Other errors, fail immediately
@@ -113,6 +118,6 @@ class GeminiProvider(BaseAIProvider):
             data = json.loads(raw)
             elementos = data.get('elementos', [])
         except json.JSONDecodeError:
-             print(f"[GeminiProvider] ⚠️ JSON inválido en respuesta.")
+             logger.warning("[GeminiProvider] ⚠️ JSON inválido en respuesta.")
 
         return elementos, raw, tokens_in, tokens_out
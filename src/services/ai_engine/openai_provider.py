@@ -1,13 +1,16 @@
+import logging
 from .base import BaseAIProvider
 from typing import Dict, Any, Tuple
-import openai
 import time
 import json
 import re
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 class OpenAIProvider(BaseAIProvider):
     def __init__(self, api_key: str):
+        import openai
         self.client = openai.OpenAI(api_key=api_key)
 
     def generate_text(self, prompt: str, system_prompt: str, config: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
@@ -19,7 +22,7 @@ class OpenAIProvider(BaseAIProvider):
             {"role": "user", "content": prompt}
         ]
 
-        print(f"[OpenAIProvider] 🚀 Enviando solicitud a {model}...")
+        logger.debug("[OpenAIProvider] 🚀 Enviando solicitud a %s...", model)
         resp = self.client.chat.completions.create(
             model=model,
             messages=messages,
@@ -53,7 +56,7 @@ class OpenAIProvider(BaseAIProvider):
 
         try:
             t0 = time.time()
-            print(f"[OpenAIProvider] 🚀 Enviando imagen a {model}...")
+            logger.debug("[OpenAIProvider] 🚀 Enviando imagen a %s...", model)
             resp = self.client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -61,7 +64,7 @@ class OpenAIProvider(BaseAIProvider):
                 timeout=timeout
             )
             dt = time.time() - t0
-            print(f"[OpenAIProvider] ⏱️ Tiempo respuesta: {dt:.2f}s")
+            logger.debug("[OpenAIProvider] ⏱️ Tiempo respuesta: %.2fs", dt)
             
             raw = resp.choices[0].message.content.strip()
             
@@ -79,10 +82,10 @@ class OpenAIProvider(BaseAIProvider):
                 data = json.loads(raw)
                 elementos = data.get('elementos', []) # Asumiendo estructura estándar del proyecto
             except json.JSONDecodeError:
-                print(f"[OpenAIProvider] ⚠️ JSON inválido en respuesta.")
+                logger.warning("[OpenAIProvider] ⚠️ JSON inválido en respuesta.")
 
             return elementos, raw, tokens_in, tokens_out
 
         except Exception as e:
-            print(f"[OpenAIProvider] ❌ Error: {e}")
+            logger.error("[OpenAIProvider] ❌ Error: %s", e)
             raise e
@@ -1,7 +1,10 @@
+import logging
 import yaml
 import os
 from typing import Dict, Any, Tuple
 
+logger = logging.getLogger(__name__)
+
 class PromptLoader:
     @staticmethod
     def load_prompt(file_path: str) -> Tuple[Dict[str, Any], str]:
@@ -33,8 +36,8 @@ class PromptLoader:
                     config = yaml.safe_load(yaml_content) or {}
                     return config, text_content
             except Exception as e:
-                print(f"[PromptLoader] ⚠️ Error parsing frontmatter for {file_path}: {e}")
+                logger.warning("[PromptLoader] ⚠️ Error parsing frontmatter for %s: %s", file_path, e)
         
         # Fallback para archivos sin frontmatter
-        print(f"[PromptLoader] ℹ️ File {file_path} has no valid frontmatter. Using default config.")
+        logger.debug("[PromptLoader] ℹ️ File %s has no valid frontmatter. Using default config.", file_path)
         return {}, content.strip()
@@ -0,0 +1,265 @@
+"""
+Grabación y reproducción de llamadas al LLM y a embeddings (AI_REPLAY_MODE).
+
+- "record": los proveedores reales se envuelven y cada par solicitud/respuesta se
+  agrega al archivo AI_REPLAY_PATH.
+- "replay": no se llama a ninguna API; las respuestas se sirven desde el archivo,
+  con latencia simulada opcional (AI_REPLAY_LATENCY_LLM / AI_REPLAY_LATENCY_EMBEDDING).
+
+El archivo es JSONL comprimido con gzip (un miembro gzip por registro, así una
+grabación cortada no pierde lo ya escrito). Registros:
+- {"tipo": "llm", "clave": sha256(modelo + system + prompt), "reply", "usage"}
+- {"tipo": "imagen", "clave": sha256(modelo + system + prompt + imagen), "elementos", "raw", "tokens_in", "tokens_out"}
+- {"tipo": "embedding", "clave": sha256(modelo + texto), "vector": float32 en base64}
+
+Permite medir regresiones de búsqueda, parsing y persistencia offline con datos
+reales de producción y resultados reproducibles.
+"""
+import os
+import gzip
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import config
+from .base import BaseAIProvider
+
+logger = logging.getLogger(__name__)
+
+MODOS_VALIDOS = ("off", "record", "replay")
+
+
+def modo_replay() -> str:
+    modo = str(getattr(config, "AI_REPLAY_MODE", "off") or "off").lower()
+    if modo not in MODOS_VALIDOS:
+        logger.warning("[REPLAY] AI_REPLAY_MODE=%s no reconocido, se usa 'off'", modo)
+        return "off"
+    return modo
+
+
+def _clave(*partes: Any) -> str:
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(str(parte if parte is not None else "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def clave_llm(modelo: str, system_prompt: str, prompt: str) -> str:
+    return _clave("llm", modelo, system_prompt, prompt)
+
+
+def clave_imagen(modelo: str, system_prompt: str, prompt: str, image_b64: str) -> str:
+    return _clave("imagen", modelo, system_prompt, prompt, hashlib.sha256(image_b64.encode("utf-8")).hexdigest())
+
+
+def clave_embedding(modelo: str, texto: str) -> str:
+    return _clave("embedding", modelo, texto)
+
+
+def codificar_vector(vector: List[float]) -> str:
+    import numpy as np
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decodificar_vector(valor: str) -> List[float]:
+    import numpy as np
+    return np.frombuffer(base64.b64decode(valor), dtype=np.float32).tolist()
+
+
+class ArchivoReplay:
+    """
+    Índice en memoria del archivo de grabación (clave -> registro) con escritura por append.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._registros: Dict[str, Dict[str, Any]] = {}
+        self._cargar()
+
+    def _cargar(self) -> None:
+        if not os.path.exists(self.ruta):
+            return
+        invalidos = 0
+        try:
+            with gzip.open(self.ruta, "rt", encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                        self._registros[registro["clave"]] = registro
+                    except (ValueError, KeyError):
+                        invalidos += 1
+        except (EOFError, OSError) as e:
+            # Último miembro truncado (grabación interrumpida): se conserva lo leído
+            logger.warning("[REPLAY] Archivo %s truncado: %s", self.ruta, e)
+        if invalidos:
+            logger.warning("[REPLAY] %s registros inválidos ignorados en %s", invalidos, self.ruta)
+        logger.info("[REPLAY] %s registros cargados desde %s", len(self._registros), self.ruta)
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        return self._registros.get(clave)
+
+    def guardar(self, registro: Dict[str, Any]) -> None:
+        linea = json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if registro["clave"] in self._registros:
+                return
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            with gzip.open(self.ruta, "at", encoding="utf-8") as f:
+                f.write(linea)
+            self._registros[registro["clave"]] = registro
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+
+_archivo: Optional[ArchivoReplay] = None
+_archivo_lock = threading.Lock()
+
+
+def obtener_archivo() -> ArchivoReplay:
+    """
+    Archivo de grabación configurado (singleton por proceso).
+    """
+    global _archivo
+    with _archivo_lock:
+        if _archivo is None:
+            _archivo = ArchivoReplay(config.AI_REPLAY_PATH)
+        return _archivo
+
+
+class GrabadorProvider(BaseAIProvider):
+    """
+    Envuelve un proveedor real y graba cada respuesta en el archivo.
+    """
+
+    def __init__(self, proveedor: BaseAIProvider, archivo: Optional[ArchivoReplay] = None):
+        self.proveedor = proveedor
+        self.archivo = archivo or obtener_archivo()
+
+    def generate_text(self, prompt: str, system_prompt: str, config: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+        reply, usage = self.proveedor.generate_text(prompt=prompt, system_prompt=system_prompt, config=config)
+        self.archivo.guardar({
+            "tipo": "llm",
+            "clave": clave_llm(config.get("model"), system_prompt, prompt),
+            "modelo": config.get("model"),
+            "reply": reply,
+            "usage": usage,
+        })
+        return reply, usage
+
+    def analyze_image(self, image_b64: str, prompt: str, system_prompt: str, config: Dict[str, Any]) -> Tuple[Any, str, int, int]:
+        elementos, raw, tokens_in, tokens_out = self.proveedor.analyze_image(image_b64, prompt, system_prompt, config)
+        self.archivo.guardar({
+            "tipo": "imagen",
+            "clave": clave_imagen(config.get("model"), system_prompt, prompt, image_b64),
+            "modelo": config.get("model"),
+            "elementos": elementos,
+            "raw": raw,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+        })
+        return elementos, raw, tokens_in, tokens_out
+
+
+class ReplayProvider(BaseAIProvider):
+    """
+    Sirve las respuestas grabadas. Una solicitud no grabada es un error (el replay
+    debe ser exacto para que el benchmark sea reproducible).
+    """
+
+    def __init__(self, archivo: Optional[ArchivoReplay] = None, latencia: Optional[float] = None):
+        self.archivo = archivo or obtener_archivo()
+        self.latencia = config.AI_REPLAY_LATENCY_LLM if latencia is None else latencia
+
+    def _buscar(self, clave: str) -> Dict[str, Any]:
+        registro = self.archivo.obtener(clave)
+        if registro is None:
+            raise KeyError(
+                f"Solicitud LLM no grabada en {self.archivo.ruta} (clave {clave[:12]}). "
+                "Volver a grabar con AI_REPLAY_MODE=record."
+            )
+        if self.latencia:
+            time.sleep(self.latencia)
+        return registro
+
+    def generate_text(self, prompt: str, system_prompt: str, config: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+        registro = self._buscar(clave_llm(config.get("model"), system_prompt, prompt))
+        return registro["reply"], dict(registro.get("usage") or {})
+
+    def analyze_image(self, image_b64: str, prompt: str, system_prompt: str, config: Dict[str, Any]) -> Tuple[Any, str, int, int]:
+        registro = self._buscar(clave_imagen(config.get("model"), system_prompt, prompt, image_b64))
+        return registro["elementos"], registro["raw"], registro["tokens_in"], registro["tokens_out"]
+
+
+class _EmbeddingsReplay:
+    """
+    Reemplazo de `client.embeddings` con la misma firma de create(model, input).
+    Graba (record) o sirve (replay) un vector por texto.
+    """
+
+    def __init__(self, embeddings_reales, modo: str, archivo: ArchivoReplay, latencia: float):
+        self._reales = embeddings_reales
+        self._modo = modo
+        self._archivo = archivo
+        self._latencia = latencia
+
+    def create(self, model: str, input, **kwargs):
+        textos = [input] if isinstance(input, str) else list(input)
+        claves = [clave_embedding(model, t) for t in textos]
+
+        if self._modo == "record":
+            respuesta = self._reales.create(model=model, input=input, **kwargs)
+            for clave, dato in zip(claves, respuesta.data):
+                self._archivo.guardar({"tipo": "embedding", "clave": clave, "modelo": model, "vector": codificar_vector(dato.embedding)})
+            return respuesta
+
+        faltantes = [c for c in claves if self._archivo.obtener(c) is None]
+        if faltantes:
+            raise KeyError(
+                f"{len(faltantes)} embeddings no grabados en {self._archivo.ruta}. "
+                "Volver a grabar con AI_REPLAY_MODE=record."
+            )
+        if self._latencia:
+            time.sleep(self._latencia)
+        data = [
+            SimpleNamespace(index=i, embedding=decodificar_vector(self._archivo.obtener(c)["vector"]))
+            for i, c in enumerate(claves)
+        ]
+        return SimpleNamespace(data=data, model=model)
+
+
+class ClienteEmbeddingsReplay:
+    """
+    Envuelve el cliente OpenAI de embeddings; solo intercepta `embeddings.create`.
+    """
+
+    def __init__(self, cliente, modo: str, archivo: Optional[ArchivoReplay] = None, latencia: Optional[float] = None):
+        self._cliente = cliente
+        self.embeddings = _EmbeddingsReplay(
+            getattr(cliente, "embeddings", None),
+            modo,
+            archivo or obtener_archivo(),
+            config.AI_REPLAY_LATENCY_EMBEDDING if latencia is None else latencia,
+        )
+
+    def __getattr__(self, nombre):
+        return getattr(self._cliente, nombre)
+
+
+def envolver_cliente_embeddings(cliente):
+    """
+    Retorna el cliente tal cual con AI_REPLAY_MODE=off, o envuelto para grabar/reproducir.
+    """
+    modo = modo_replay()
+    if modo == "off":
+        return cliente
+    logger.info("[REPLAY] Embeddings en modo %s (%s)", modo, config.AI_REPLAY_PATH)
+    return ClienteEmbeddingsReplay(cliente, modo)
@@ -1,35 +1,28 @@
+import logging
 import os
 import json
-import redis
-import traceback
-from urllib.parse import urlparse
-from tqdm import tqdm
 from src.embeddings import generar_embedding
 from src.utils.clean_text import limpiar_texto
 from src.utils.file_utils import normalizar_nombre
+from src.utils.logging_config import muestreo
 from datetime import datetime
 from src.services.licitacion_service import get_or_create_licitacion
-from src.config import REDIS_HOST, REDIS_PORT, REDIS_USERNAME, REDIS_PASSWORD, REDIS_DB
+from src.utils.redis_client import get_redis_client, pipeline_hset
+
+logger = logging.getLogger(__name__)
 
 # ==========================================================
 # ADAPTATION LAYER
 # ==========================================================
 
 MODEL_EMBEDDING = "text-embedding-3-small"
-REDIS_URL = f"redis://{REDIS_USERNAME}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 
 # ==========================================================
 # REDIS CLIENT
 # ==========================================================
-redis_url = urlparse(REDIS_URL)
-r = redis.Redis(
-    host=redis_url.hostname,
-    port=redis_url.port,
-    username=redis_url.username,
-    password=redis_url.password,
-    db=0,
-    ssl=False
-)
+# Cliente compartido en bytes (los hashes guardan JSON crudo), sobre REDIS_DB
+def _get_redis():
+    return get_redis_client(decode_responses=False)
 
 
 def _contenido_a_texto(valor):
@@ -40,14 +33,28 @@ def _contenido_a_texto(valor):
     return ""
 
 
+def _hash_chunk(embedding, texto):
+    return {
+        "embedding": json.dumps(embedding),
+        "texto": texto
+    }
+
+
 def guardar_hash(clave, embedding, texto):
     try:
-        r.hset(clave, mapping={
-            "embedding": json.dumps(embedding),
-            "texto": texto
-        })
+        _get_redis().hset(clave, mapping=_hash_chunk(embedding, texto))
     except Exception as e:
-        print(f"[❌ ERROR] No se pudo guardar en Redis ({clave}): {e}")
+        logger.error("[❌ ERROR] No se pudo guardar en Redis (%s): %s", clave, e, extra=muestreo())
+
+
+def guardar_hashes(registros):
+    """
+    Guarda los chunks de una página [(clave, embedding, texto)] en un solo pipeline.
+    """
+    try:
+        pipeline_hset(_get_redis(), [(clave, _hash_chunk(embedding, texto)) for clave, embedding, texto in registros])
+    except Exception as e:
+        logger.error("[❌ ERROR] No se pudieron guardar %s chunks en Redis: %s", len(registros), e)
 
 
 def run_embedding_batch(doc_id):
@@ -57,27 +64,28 @@ def run_embedding_batch(doc_id):
 
     ruta = os.path.join("archivos_texto", doc_id)
     if not os.path.exists(ruta):
-        print(f"[❌ ERROR] Carpeta no encontrada: {ruta}")
+        logger.error("[❌ ERROR] Carpeta no encontrada: %s", ruta)
         return
 
     archivos = [f for f in os.listdir(ruta) if f.endswith(".json") and "_pag_" in f]
     if not archivos:
-        print(f"[⚠️] No se encontraron archivos JSON de páginas en {ruta}")
+        logger.warning("[⚠️] No se encontraron archivos JSON de páginas en %s", ruta)
         return
 
     errores = []
     doc_id_normalizado = doc_id
 
     try:
-        print("[📌] Registrando / obteniendo licitación…")
+        logger.info("[📌] Registrando / obteniendo licitación…")
         licitacion_uuid = get_or_create_licitacion(doc_id)
-        print(f"[✅] Licitación activa → UUID: {licitacion_uuid}")
+        logger.info("[✅] Licitación activa → UUID: %s", licitacion_uuid)
     except Exception as e:
-        print("[❌ ERROR] No se pudo registrar la licitación")
-        traceback.print_exc()
+        logger.exception("[❌ ERROR] No se pudo registrar la licitación")
         return
 
-    for archivo in tqdm(archivos, desc=f"[🔍] Procesando {len(archivos)} páginas"):
+    # La barra de progreso solo en terminal interactiva (en contenedores es I/O por página)
+    from tqdm import tqdm
+    for archivo in tqdm(archivos, desc=f"[🔍] Procesando {len(archivos)} páginas", disable=None):
         try:
             path_archivo = os.path.join(ruta, archivo)
             with open(path_archivo, encoding="utf-8") as f:
@@ -93,11 +101,12 @@ def run_embedding_batch(doc_id):
             )
 
             contenido_total = limpiar_texto(contenido_total)
+            registros = []
 
             if contenido_total:
                 clave_pag = f"doc_raw_page:{doc_id_normalizado}:p{pagina}_full"
                 embedding = generar_embedding(contenido_total, model=MODEL_EMBEDDING)
-                guardar_hash(clave_pag, embedding, contenido_total)
+                registros.append((clave_pag, embedding, contenido_total))
 
             for i, elem in enumerate(elementos):
                 contenido = _contenido_a_texto(elem.get("contenido"))
@@ -108,11 +117,20 @@ def run_embedding_batch(doc_id):
                     continue
                 clave_elem = f"doc_raw_page:{doc_id_normalizado}:p{pagina}_e{i+1}"
                 embedding = generar_embedding(contenido, model=MODEL_EMBEDDING)
-                guardar_hash(clave_elem, embedding, contenido)
+                registros.append((clave_elem, embedding, contenido))
+
+            guardar_hashes(registros)
 
         except Exception as e:
             errores.append((archivo, f"❌ Error: {e}"))
-            traceback.print_exc()
+            logger.exception("[❌ ERROR] Procesando página %s", archivo)
+
+    # Nueva versión del documento: invalida las matrices cacheadas por los workers
+    try:
+        from src.services.semantic_extraction.indice_chunks import marcar_version_documento
+        marcar_version_documento(_get_redis(), doc_id_normalizado)
+    except Exception as e:
+        logger.error("[❌ ERROR] No se pudo registrar la versión del documento %s: %s", doc_id_normalizado, e)
 
     try:
         texto_completo = ""
@@ -132,7 +150,7 @@ def run_embedding_batch(doc_id):
         texto_completo = limpiar_texto(texto_completo.strip())
         if texto_completo:
             emb_doc = generar_embedding(texto_completo, model=MODEL_EMBEDDING)
-            r.hset(
+            _get_redis().hset(
                 f"doc_raw:{doc_id_normalizado}",
                 mapping={
                     "nombre_original": doc_id,
@@ -146,8 +164,7 @@ def run_embedding_batch(doc_id):
                 },
             )
     except Exception as e:
-        print(f"[❌ ERROR] Fallo embedding documento completo: {e}")
-        traceback.print_exc()
+        logger.exception("[❌ ERROR] Fallo embedding documento completo: %s", e)
 
     # ===============================
     # EXTRACCIÓN SEMÁNTICA
@@ -155,7 +172,7 @@ def run_embedding_batch(doc_id):
 
     # --- DATOS BÁSICOS ---
     try:
-        print("[SEMANTIC] Iniciando extraccion semantica: DATOS_BASICOS_LICITACION")
+        logger.info("[SEMANTIC] Iniciando extraccion semantica: DATOS_BASICOS_LICITACION")
         run_semantic_extraction(
             licitacion_id=licitacion_uuid,
             concepto="DATOS_BASICOS_LICITACION",
@@ -166,14 +183,13 @@ def run_embedding_batch(doc_id):
             prompt_version="prompt_datos_basicos_licitacion_v1.txt",
             extractor_version="semantic_extractor_v1",
         )
-        print("[SEMANTIC] Extraccion semantica DATOS_BASICOS_LICITACION ejecutada")
+        logger.info("[SEMANTIC] Extraccion semantica DATOS_BASICOS_LICITACION ejecutada")
     except Exception:
-        print("[ERROR] Fallo en extraccion semantica DATOS_BASICOS_LICITACION")
-        traceback.print_exc()
+        logger.exception("[ERROR] Fallo en extraccion semantica DATOS_BASICOS_LICITACION")
 
 
     try:
-        print("[SEMANTIC] Iniciando extraccion semantica: ITEMS_LICITACION")
+        logger.info("[SEMANTIC] Iniciando extraccion semantica: ITEMS_LICITACION")
         run_semantic_extraction(
             licitacion_id=licitacion_uuid,
             concepto="ITEMS_LICITACION",
@@ -184,14 +200,13 @@ def run_embedding_batch(doc_id):
             prompt_version="prompt_items_licitacion_v1.txt",
             extractor_version="semantic_extractor_v1",
         )
-        print("[SEMANTIC] Extraccion semantica ITEMS_LICITACION ejecutada")
+        logger.info("[SEMANTIC] Extraccion semantica ITEMS_LICITACION ejecutada")
 
     except Exception:
-        print("[ERROR] Fallo en extraccion semantica ITEMS_LICITACION")
-        traceback.print_exc()
+        logger.exception("[ERROR] Fallo en extraccion semantica ITEMS_LICITACION")
 
     try:
-        print("[SEMANTIC] Iniciando extraccion semantica: FINANZAS_LICITACION")
+        logger.info("[SEMANTIC] Iniciando extraccion semantica: FINANZAS_LICITACION")
         run_semantic_extraction(
             licitacion_id=licitacion_uuid,
             concepto="FINANZAS_LICITACION",
@@ -202,20 +217,19 @@ def run_embedding_batch(doc_id):
             prompt_version="prompt_finanzas_licitacion_v1.txt",
             extractor_version="semantic_extractor_v1",
         )
-        print("[SEMANTIC] Extraccion semantica FINANZAS_LICITACION ejecutada")
+        logger.info("[SEMANTIC] Extraccion semantica FINANZAS_LICITACION ejecutada")
 
     except Exception:
-        print("[ERROR] Fallo en extraccion semantica FINANZAS_LICITACION")
-        traceback.print_exc()
+        logger.exception("[ERROR] Fallo en extraccion semantica FINANZAS_LICITACION")
 
     if errores:
         log_path = os.path.join(ruta, "errores_embedding.log")
         with open(log_path, "w", encoding="utf-8") as f:
             for archivo, error in errores:
                 f.write(f"{archivo}: {error}\n")
-        print(f"[⚠️] Errores registrados en: {log_path}")
+        logger.warning("[⚠️] Errores registrados en: %s", log_path)
     else:
-        print("✅ Embeddings generados correctamente para todas las páginas")
+        logger.info("✅ Embeddings generados correctamente para todas las páginas")
 
 
 # ==========================================================
@@ -223,7 +237,7 @@ def run_embedding_batch(doc_id):
 # ==========================================================
 
 def list_raw_docs():
-    claves = r.keys("doc_raw:*")
+    claves = _get_redis().keys("doc_raw:*")
     nombres = [k.decode().replace("doc_raw:", "") for k in claves]
     return sorted(nombres)
 
@@ -242,10 +256,10 @@ def run_chat_embedding(user_id, mensaje, docs_normalizados, top_k=5):
     todos_resultados = []
     for doc_id in docs_normalizados:
         patron = f"doc_raw_page:{doc_id}:*"
-        claves = list(r.scan_iter(match=patron))
+        claves = list(_get_redis().scan_iter(match=patron))
 
         for k in claves:
-            datos = r.hgetall(k)
+            datos = _get_redis().hgetall(k)
             if not datos:
                 continue
 
@@ -278,7 +292,7 @@ def run_chat_embedding(user_id, mensaje, docs_normalizados, top_k=5):
 
 def get_doc_pdf_filename(doc_id):
     try:
-        doc_data = r.hgetall(f"doc_raw:{doc_id}")
+        doc_data = _get_redis().hgetall(f"doc_raw:{doc_id}")
         if doc_data:
             nombre_original = doc_data.get(b"nombre_original", b"").decode()
             filename = doc_data.get(b"filename", b"").decode()
@@ -288,5 +302,5 @@ def get_doc_pdf_filename(doc_id):
                 return f"{filename}.pdf" if not filename.lower().endswith(".pdf") else filename
         return None
     except Exception as e:
-        print(f"[chat_embedding] Error obteniendo filename para {doc_id}: {e}")
+        logger.error("[chat_embedding] Error obteniendo filename para %s: %s", doc_id, e)
         return None
@@ -0,0 +1,218 @@
+"""
+Indice vectorial del catalogo de productos para homologacion.
+
+El catalogo se embebe una sola vez (en lotes) y se persiste en disco como una
+matriz float32 (.npy) acompanada de un archivo de metadata con el codigo de
+producto y el hash del texto embebido de cada fila. En ejecuciones posteriores
+solo se recalculan los productos nuevos o cuyo texto cambio.
+"""
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from src import config
+from src.embeddings import get_embeddings
+from src.services.homologacion.catalog_filter import _normalize_text
+
+logger = logging.getLogger(__name__)
+
+MODEL_EMBEDDING = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 256
+
+
+def texto_producto(producto: dict) -> str:
+    """
+    Texto representativo de un producto del catalogo (nombre + descripcion).
+    """
+    partes = []
+    for campo in ("nombre", "descripcion"):
+        valor = str(producto.get(campo) or "").strip()
+        if valor and valor.lower() != "nan":
+            partes.append(valor)
+    return " | ".join(partes) or str(producto.get("codigo", ""))
+
+
+def _hash_texto(texto: str) -> str:
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+class CatalogVectorIndex:
+    """
+    Matriz de embeddings (float32, filas normalizadas L2) alineada 1:1 con la
+    lista de productos del catalogo usada para construirla.
+    """
+
+    def __init__(self, directorio: Optional[str] = None, modelo: str = MODEL_EMBEDDING):
+        self.directorio = Path(directorio or config.CATALOGO_EMBEDDINGS_DIR)
+        self.modelo = modelo
+        self.codigos: List[str] = []
+        self.keywords: List[Set[str]] = []
+        # palabra -> posiciones de los productos que la contienen (puntaje lexico sin recorrer el catalogo)
+        self.invertido: Dict[str, List[int]] = {}
+        self.matriz = None
+
+    @property
+    def _ruta_matriz(self) -> Path:
+        return self.directorio / f"catalogo_{self.modelo}.npy"
+
+    @property
+    def _ruta_metadata(self) -> Path:
+        return self.directorio / f"catalogo_{self.modelo}.json"
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def _cargar_cache(self) -> dict:
+        """
+        Retorna {(codigo, hash_texto): vector} con lo ya persistido en disco.
+        """
+        import numpy as np
+
+        if not self._ruta_matriz.exists() or not self._ruta_metadata.exists():
+            return {}
+        try:
+            metadata = json.loads(self._ruta_metadata.read_text(encoding="utf-8"))
+            matriz = np.load(self._ruta_matriz, mmap_mode="r")
+        except Exception as e:
+            logger.warning("[CATALOG_INDEX] Cache de embeddings ilegible, se reconstruye: %s", e)
+            return {}
+
+        filas = metadata.get("filas", [])
+        if len(filas) != matriz.shape[0]:
+            logger.warning("[CATALOG_INDEX] Metadata y matriz desalineadas, se reconstruye el cache")
+            return {}
+        return {(f["codigo"], f["hash"]): matriz[i] for i, f in enumerate(filas)}
+
+    def _guardar(self, filas: List[dict]) -> None:
+        import numpy as np
+
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        tmp_matriz = self._ruta_matriz.with_suffix(".tmp.npy")
+        tmp_metadata = self._ruta_metadata.with_suffix(".tmp.json")
+        np.save(tmp_matriz, self.matriz.astype(np.float32, copy=False))
+        tmp_metadata.write_text(
+            json.dumps({"modelo": self.modelo, "filas": filas}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+        os.replace(tmp_matriz, self._ruta_matriz)
+        os.replace(tmp_metadata, self._ruta_metadata)
+
+    def construir(self, productos: List[dict]) -> "CatalogVectorIndex":
+        """
+        Construye (o actualiza) el indice para la lista de productos dada.
+        Solo se generan embeddings para los productos sin entrada en cache.
+        """
+        import numpy as np
+
+        textos = [texto_producto(p) for p in productos]
+        filas = [
+            {"codigo": str(p.get("codigo", "")), "hash": _hash_texto(t)}
+            for p, t in zip(productos, textos)
+        ]
+
+        cache = self._cargar_cache()
+        vectores: List = [cache.get((f["codigo"], f["hash"])) for f in filas]
+        pendientes = [i for i, v in enumerate(vectores) if v is None]
+
+        logger.info(
+            "[CATALOG_INDEX] Productos=%d | en_cache=%d | por_embeber=%d",
+            len(productos), len(productos) - len(pendientes), len(pendientes)
+        )
+        from src.utils.prometheus_metrics import registrar_cache_embeddings
+        registrar_cache_embeddings(len(productos) - len(pendientes), len(pendientes))
+
+        for inicio in range(0, len(pendientes), EMBEDDING_BATCH_SIZE):
+            lote = pendientes[inicio:inicio + EMBEDDING_BATCH_SIZE]
+            embeddings = get_embeddings([textos[i] for i in lote], model=self.modelo)
+            if len(embeddings) != len(lote):
+                raise RuntimeError(
+                    f"No se pudieron generar embeddings del catalogo (lote {inicio // EMBEDDING_BATCH_SIZE + 1})"
+                )
+            for i, emb in zip(lote, embeddings):
+                vectores[i] = np.asarray(emb, dtype=np.float32)
+
+        if vectores:
+            matriz = np.vstack(vectores).astype(np.float32)
+            normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+            normas[normas == 0] = 1.0
+            matriz /= normas
+        else:
+            matriz = np.zeros((0, 0), dtype=np.float32)
+
+        self.matriz = matriz
+        self.codigos = [f["codigo"] for f in filas]
+        self.keywords = [_normalize_text(t) for t in textos]
+        self.invertido = {}
+        for idx, keywords in enumerate(self.keywords):
+            for palabra in keywords:
+                self.invertido.setdefault(palabra, []).append(idx)
+
+        if pendientes:
+            self._guardar(filas)
+
+        return self
+
+    def embeber_consultas(self, textos: List[str]):
+        """
+        Genera y normaliza embeddings para textos de consulta (items de la licitacion).
+        Retorna None si el proveedor de embeddings falla.
+        """
+        import numpy as np
+
+        embeddings = get_embeddings(textos, model=self.modelo) if textos else []
+        if len(embeddings) != len(textos):
+            return None
+        consultas = np.asarray(embeddings, dtype=np.float32)
+        normas = np.linalg.norm(consultas, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return consultas / normas
+
+    def buscar(self, consultas, top_k: int) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k por similitud coseno para cada fila de `consultas`.
+        Retorna, por consulta, una lista de (indice_producto, similitud) ordenada.
+        """
+        import numpy as np
+
+        if self.matriz is None or not len(self):
+            return [[] for _ in range(len(consultas))]
+
+        similitudes = consultas @ self.matriz.T
+        k = min(top_k, similitudes.shape[1])
+        resultados = []
+        for fila in similitudes:
+            idx = np.argpartition(-fila, k - 1)[:k]
+            idx = idx[np.argsort(-fila[idx])]
+            resultados.append([(int(i), float(fila[i])) for i in idx])
+        return resultados
+
+
+_indice_actual: Optional[CatalogVectorIndex] = None
+_firma_indice_actual: Optional[str] = None
+
+
+def obtener_indice_catalogo(productos: List[dict]) -> Optional[CatalogVectorIndex]:
+    """
+    Retorna el indice vectorial del catalogo, reutilizando el del proceso si el
+    catalogo no cambio. Retorna None si no es posible construirlo (se usara el
+    filtro lexico como respaldo).
+    """
+    global _indice_actual, _firma_indice_actual
+
+    firma = hashlib.sha1(
+        "\n".join(f"{p.get('codigo')}|{texto_producto(p)}" for p in productos).encode("utf-8")
+    ).hexdigest()
+    if _indice_actual is not None and _firma_indice_actual == firma:
+        return _indice_actual
+
+    try:
+        indice = CatalogVectorIndex().construir(productos)
+    except Exception as e:
+        logger.error("[CATALOG_INDEX] No se pudo construir el indice vectorial: %s", e)
+        return None
+
+    _indice_actual, _firma_indice_actual = indice, firma
+    return indice
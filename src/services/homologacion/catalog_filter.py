@@ -1,7 +1,7 @@
 import re
 import logging
 import unicodedata
-from typing import List, Set
+from typing import List, Optional, Set
 
 logger = logging.getLogger(__name__)
 
@@ -74,3 +74,117 @@ def filter_catalog(batch_items: List[dict], full_catalog: List[dict], top_n: int
     )
     
     return selected_products
+
+
+def _texto_item(item: dict) -> str:
+    return f"{item.get('item_key') or ''} {item.get('descripcion_detectada') or ''}".strip()
+
+
+def recuperar_candidatos_por_item(
+    batch_items: List[dict],
+    full_catalog: List[dict],
+    indice,
+    top_k: int = 20,
+    peso_vectorial: float = 0.7,
+) -> Optional[List[List[dict]]]:
+    """
+    Recuperador hibrido: para cada ítem combina el top-k por similitud vectorial
+    (indice del catalogo) con el puntaje lexico de palabras clave.
+
+    Retorna una lista de candidatos (ordenados por puntaje combinado) por ítem,
+    o None si no hay indice utilizable (el llamador debe usar filter_catalog).
+    """
+    if indice is None or len(indice) != len(full_catalog):
+        return None
+
+    consultas = indice.embeber_consultas([_texto_item(item) for item in batch_items])
+    if consultas is None:
+        logger.warning("[FILTER] No se pudieron embeber los ítems. Se usa filtro lexico.")
+        return None
+
+    vecinos_vectoriales = indice.buscar(consultas, top_k)
+
+    candidatos_por_item = []
+    for item, vecinos in zip(batch_items, vecinos_vectoriales):
+        item_keywords = _normalize_text(item.get("item_key", "")) | _normalize_text(item.get("descripcion_detectada", ""))
+
+        # Puntaje lexico normalizado (fraccion de palabras del ítem presentes en el producto).
+        # Via indice invertido: solo se puntuan los productos que comparten alguna palabra
+        comunes = {}
+        for palabra in item_keywords:
+            for idx in indice.invertido.get(palabra, ()):
+                comunes[idx] = comunes.get(idx, 0) + 1
+        # (en orden de catalogo, para desempatar igual que un recorrido completo)
+        puntajes = {idx: (1.0 - peso_vectorial) * comunes[idx] / len(item_keywords) for idx in sorted(comunes)}
+
+        for idx, similitud in vecinos:
+            puntajes[idx] = puntajes.get(idx, 0.0) + peso_vectorial * max(similitud, 0.0)
+
+        mejores = sorted(puntajes.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        candidatos_por_item.append([full_catalog[idx] for idx, _ in mejores])
+
+    return candidatos_por_item
+
+
+def hybrid_filter_catalog(
+    batch_items: List[dict],
+    full_catalog: List[dict],
+    indice,
+    top_n: int = 40,
+) -> List[dict]:
+    """
+    Variante hibrida de filter_catalog: une los candidatos por ítem (intercalados
+    por ranking) hasta completar top_n productos unicos para el lote.
+    Si el indice no esta disponible, recurre al filtro lexico.
+    """
+    por_item = recuperar_candidatos_por_item(
+        batch_items, full_catalog, indice,
+        top_k=max(1, -(-top_n // max(len(batch_items), 1))) * 2
+    )
+    if por_item is None:
+        return filter_catalog(batch_items, full_catalog, top_n=top_n)
+
+    seleccionados = []
+    vistos = set()
+    for ranking in range(max((len(c) for c in por_item), default=0)):
+        for candidatos in por_item:
+            if ranking >= len(candidatos) or len(seleccionados) >= top_n:
+                continue
+            producto = candidatos[ranking]
+            if id(producto) not in vistos:
+                vistos.add(id(producto))
+                seleccionados.append(producto)
+
+    logger.info(
+        "[FILTER] Filtrado hibrido completado. Catálogo reducido de %d a %d productos (Top %d)",
+        len(full_catalog), len(seleccionados), top_n
+    )
+    return seleccionados
+
+
+def filter_catalog_por_item(batch_items: List[dict], full_catalog: List[dict], top_k: int = 8) -> List[List[dict]]:
+    """
+    Variante lexica por ítem: retorna los top_k productos con mayor coincidencia
+    de palabras clave para CADA ítem (sin rellenar con productos base).
+    """
+    keywords_catalogo = [
+        _normalize_text(f"{p.get('nombre', '')} {p.get('descripcion', '')}")
+        for p in full_catalog
+    ]
+
+    candidatos_por_item = []
+    for item in batch_items:
+        item_keywords = _normalize_text(item.get("item_key", "")) | _normalize_text(item.get("descripcion_detectada", ""))
+        if not item_keywords:
+            candidatos_por_item.append([])
+            continue
+
+        scored = []
+        for idx, prod_keywords in enumerate(keywords_catalogo):
+            score = len(item_keywords & prod_keywords)
+            if score > 0:
+                scored.append((score, idx))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        candidatos_por_item.append([full_catalog[idx] for _, idx in scored[:top_k]])
+
+    return candidatos_por_item
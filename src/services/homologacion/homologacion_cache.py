@@ -0,0 +1,153 @@
+"""
+Cache de resultados de homologacion por descripcion normalizada de item.
+
+Las mismas descripciones de productos se repiten entre licitaciones; este modulo
+memoiza en Redis el resultado del LLM (razonamiento + candidatos rankeados) para
+que solo los items nuevos se envien al modelo.
+
+Llave: (descripcion normalizada, hash del catalogo, version de prompt, modelo).
+- Eviccion: cada entrada expira segun HOMOLOGACION_CACHE_TTL.
+- Invalidacion: al detectar un hash de catalogo distinto al registrado, se
+  eliminan todas las entradas del catalogo anterior.
+"""
+import re
+import json
+import hashlib
+import logging
+import unicodedata
+from typing import Dict, List, Optional
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "homologacion_cache"
+CLAVE_CATALOGO_ACTUAL = f"{CACHE_PREFIX}:catalogo_actual"
+
+
+def normalizar_descripcion(texto: str) -> str:
+    """
+    Minusculas, sin tildes, sin puntuacion y con espacios colapsados.
+    """
+    texto = "".join(
+        c for c in unicodedata.normalize("NFD", str(texto or ""))
+        if unicodedata.category(c) != "Mn"
+    )
+    texto = re.sub(r"[^a-z0-9]+", " ", texto.lower())
+    return texto.strip()
+
+
+def calcular_hash_catalogo(productos: List[dict]) -> str:
+    """
+    Hash del snapshot del catalogo (codigo, nombre, descripcion). El stock no
+    forma parte del hash: los candidatos se rehidratan desde el catalogo vigente.
+    """
+    h = hashlib.sha256()
+    for p in sorted(productos, key=lambda x: str(x.get("codigo"))):
+        h.update(f"{p.get('codigo')}|{p.get('nombre')}|{p.get('descripcion')}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class HomologacionCache:
+    """
+    Cache de homologaciones respaldado por Redis.
+    """
+
+    def __init__(self, redis_client, hash_catalogo: str, prompt_version: str, modelo: str, ttl: int):
+        self.redis = redis_client
+        self.hash_catalogo = hash_catalogo
+        self.prompt_version = prompt_version
+        self.modelo = modelo
+        self.ttl = ttl
+
+    @classmethod
+    def desde_config(cls, productos: List[dict], prompt_version: str, modelo: str) -> Optional["HomologacionCache"]:
+        """
+        Construye el cache si esta habilitado y Redis responde; si no, retorna None.
+        """
+        if not config.HOMOLOGACION_CACHE_ENABLED:
+            return None
+        try:
+            from src.utils.redis_client import get_redis_client
+            cache = cls(
+                get_redis_client(),
+                calcular_hash_catalogo(productos),
+                prompt_version,
+                modelo,
+                config.HOMOLOGACION_CACHE_TTL
+            )
+            cache.invalidar_si_catalogo_cambio()
+            return cache
+        except Exception as e:
+            logger.warning("[HOMOLOGACION_CACHE] Cache no disponible, se continua sin cache: %s", e)
+            return None
+
+    def _clave(self, item: dict) -> str:
+        texto = normalizar_descripcion(f"{item.get('item_key') or ''} {item.get('descripcion_detectada') or ''}")
+        digest = hashlib.sha1(texto.encode("utf-8")).hexdigest()
+        return f"{CACHE_PREFIX}:{self.hash_catalogo}:{self.prompt_version}:{self.modelo}:{digest}"
+
+    def invalidar_si_catalogo_cambio(self) -> int:
+        """
+        Si el catalogo cambio respecto del ultimo registrado, elimina las entradas
+        del catalogo anterior. Retorna la cantidad de llaves eliminadas.
+        """
+        anterior = self.redis.get(CLAVE_CATALOGO_ACTUAL)
+        if anterior == self.hash_catalogo:
+            return 0
+
+        eliminadas = 0
+        if anterior:
+            llaves = []
+            for llave in self.redis.scan_iter(match=f"{CACHE_PREFIX}:{anterior}:*", count=1000):
+                llaves.append(llave)
+                if len(llaves) >= 1000:
+                    eliminadas += self.redis.delete(*llaves)
+                    llaves = []
+            if llaves:
+                eliminadas += self.redis.delete(*llaves)
+            logger.info(
+                "[HOMOLOGACION_CACHE] Catalogo cambio (%s -> %s). Entradas invalidadas: %d",
+                anterior, self.hash_catalogo, eliminadas
+            )
+
+        self.redis.set(CLAVE_CATALOGO_ACTUAL, self.hash_catalogo)
+        return eliminadas
+
+    def obtener(self, items: List[dict]) -> Dict[int, dict]:
+        """
+        Retorna {posicion_item: homologacion_cacheada} para los items con hit.
+        """
+        if not items:
+            return {}
+        valores = self.redis.mget([self._clave(item) for item in items])
+        hits = {}
+        for idx, (item, valor) in enumerate(zip(items, valores)):
+            if not valor:
+                continue
+            try:
+                cacheado = json.loads(valor)
+            except (TypeError, ValueError):
+                continue
+            hits[idx] = {
+                "item_key": item.get("item_key"),
+                "descripcion_detectada": item.get("descripcion_detectada", ""),
+                "razonamiento_general": cacheado.get("razonamiento_general"),
+                "candidatos": cacheado.get("candidatos", []),
+            }
+        return hits
+
+    def guardar(self, pares: List[tuple]) -> None:
+        """
+        Guarda pares (item, homologacion) con expiracion TTL.
+        """
+        if not pares:
+            return
+        pipe = self.redis.pipeline()
+        for item, homologacion in pares:
+            valor = {
+                "razonamiento_general": homologacion.get("razonamiento_general"),
+                "candidatos": homologacion.get("candidatos", []),
+            }
+            pipe.set(self._clave(item), json.dumps(valor, ensure_ascii=False), ex=self.ttl)
+        pipe.execute()
@@ -11,98 +11,100 @@ Tablas utilizadas:
 - homologaciones_productos: Registro principal de homologacion por item
 - candidatos_homologacion: Candidatos de productos para cada homologacion
 """
+import logging
 import psycopg2
-from typing import Optional
+from psycopg2.extras import execute_values
+from typing import List
 from datetime import datetime
+from uuid import uuid4
 
+logger = logging.getLogger(__name__)
 
-def insertar_homologacion_producto(
+# Filas por sentencia INSERT multi-fila
+BULK_PAGE_SIZE = 1000
+
+
+def insertar_homologaciones_bulk(
     conn,
-    homologacion_id: str,
     licitacion_id: str,
-    item_key: str,
-    descripcion_detectada: str,
-    razonamiento_general: Optional[str],
+    homologaciones: List[dict],
     tokens_input: int,
     tokens_output: int,
-    tokens_total: int,
     modelo_usado: str,
     fecha_homologacion: datetime
-) -> None:
-    """
-    Inserta un registro de homologacion de producto en la tabla homologaciones_productos.
+) -> List[str]:
     """
-    print(f"[HOMOLOGACION_DB] Insertando homologacion | lid={licitacion_id} | item={item_key}")
+    Inserta todas las homologaciones de una licitacion y sus candidatos usando
+    INSERT multi-fila (execute_values), en vez de una sentencia por fila.
 
-    sql = """
-        INSERT INTO homologaciones_productos (
-            id,
-            licitacion_id,
-            item_key,
-            descripcion_detectada,
-            razonamiento_general,
-            input_tokens,
-            output_tokens,
-            modelo_usado,
-            fecha_homologacion
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    No hace commit: las inserciones quedan en la transaccion abierta de `conn`
+    para que el llamador confirme todo en un solo commit.
+
+    Returns:
+        Lista de ids de homologaciones_productos insertados (mismo orden que `homologaciones`)
     """
-    with conn.cursor() as cur:
-        # Note: mapping tokens_input to input_tokens, tokens_output to output_tokens based on db schema
-        cur.execute(sql, (
+    if not homologaciones:
+        return []
+
+    filas_homologacion = []
+    filas_candidatos = []
+    for homologacion in homologaciones:
+        homologacion_id = str(uuid4())
+        filas_homologacion.append((
             homologacion_id,
             licitacion_id,
-            item_key,
-            descripcion_detectada,
-            razonamiento_general,
+            homologacion.get("item_key"),
+            homologacion.get("descripcion_detectada", ""),
+            homologacion.get("razonamiento_general"),
             tokens_input,
             tokens_output,
             modelo_usado,
             fecha_homologacion
         ))
-    print(f"[HOMOLOGACION_DB] Homologacion insertada OK | item_key={item_key}")
+        for candidato in homologacion.get("candidatos") or []:
+            producto = candidato.get("producto") or {}
+            filas_candidatos.append((
+                homologacion_id,
+                candidato.get("ranking"),
+                producto.get("codigo"),
+                producto.get("nombre"),
+                producto.get("descripcion"),
+                producto.get("stock_disponible"),
+                producto.get("ubicacion_stock"),
+                candidato.get("score_similitud"),
+                candidato.get("razonamiento")
+            ))
 
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO homologaciones_productos (
+                id,
+                licitacion_id,
+                item_key,
+                descripcion_detectada,
+                razonamiento_general,
+                input_tokens,
+                output_tokens,
+                modelo_usado,
+                fecha_homologacion
+            ) VALUES %s
+        """, filas_homologacion, page_size=BULK_PAGE_SIZE)
 
-def insertar_candidato_homologacion(
-    conn,
-    homologacion_id: str,
-    ranking: int,
-    producto_codigo: str,
-    producto_nombre: str,
-    producto_descripcion: Optional[str],
-    stock_disponible: Optional[int],
-    ubicacion_stock: Optional[str],
-    score_similitud: float,
-    razonamiento: Optional[str]
-) -> None:
-    """
-    Inserta un candidato de homologacion en la tabla candidatos_homologacion.
-    """
-    print(f"[HOMOLOGACION_DB] Insertando candidato | hid={homologacion_id} | rank={ranking} | cod={producto_codigo}")
+        if filas_candidatos:
+            execute_values(cur, """
+                INSERT INTO candidatos_homologacion (
+                    homologacion_id,
+                    ranking,
+                    producto_codigo,
+                    producto_nombre,
+                    producto_descripcion,
+                    stock_disponible,
+                    ubicacion_stock,
+                    score_similitud,
+                    razonamiento
+                ) VALUES %s
+            """, filas_candidatos, page_size=BULK_PAGE_SIZE)
 
-    sql = """
-        INSERT INTO candidatos_homologacion (
-            homologacion_id,
-            ranking,
-            producto_codigo,
-            producto_nombre,
-            producto_descripcion,
-            stock_disponible,
-            ubicacion_stock,
-            score_similitud,
-            razonamiento
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    with conn.cursor() as cur:
-        cur.execute(sql, (
-            homologacion_id,
-            ranking,
-            producto_codigo,
-            producto_nombre,
-            producto_descripcion,
-            stock_disponible,
-            ubicacion_stock,
-            score_similitud,
-            razonamiento
-        ))
-    print(f"[HOMOLOGACION_DB] Candidato insertado OK | codigo={producto_codigo}")
+    logger.info("[HOMOLOGACION_DB] Insercion masiva OK | lid=%s | homologaciones=%s | candidatos=%s", licitacion_id, len(filas_homologacion), len(filas_candidatos))
+    # Los ids se generan en Python: no hace falta RETURNING
+    return [fila[0] for fila in filas_homologacion]
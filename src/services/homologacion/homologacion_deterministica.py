@@ -0,0 +1,207 @@
+"""
+Homologacion deterministica (sin LLM) para los casos triviales.
+
+Antes de llamar al LLM se intenta resolver cada item por:
+1. Codigo exacto: el codigo de proveedor con que empieza el nombre del producto
+   ("KERR174-LIMAS K 30MM") mencionado en el texto del item, ya sea rotulado
+   ("cód. 102152", "código KERR174") o como token alfanumerico ("KERR174").
+   Los numeros sueltos (años, volumenes, cantidades) nunca se toman como codigo,
+   y tampoco se usan `codigo` / `codigo_tienda` del catalogo (correlativos
+   internos) ni el `codigo_producto` de Mercado Publico (codigo ONU, no del catalogo).
+2. Igualdad de nombre normalizado.
+3. Coincidencia lexica de alta confianza (Jaccard de palabras clave sobre un
+   umbral y con margen claro respecto del segundo mejor producto).
+
+Los items resueltos se escriben directamente como homologacion; solo el resto
+ambiguo se envia al LLM.
+"""
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.services.homologacion.catalog_filter import _normalize_text
+from src.services.homologacion.homologacion_cache import normalizar_descripcion
+
+logger = logging.getLogger(__name__)
+
+# Margen minimo entre el mejor y el segundo mejor puntaje lexico
+MARGEN_LEXICO = 0.15
+
+_REGEX_PREFIJO_CODIGO = re.compile(r"^\s*([A-Za-z0-9]+)\s*-")
+_REGEX_TOKEN = re.compile(r"[A-Za-z0-9]+")
+# Codigo rotulado en el texto: "cód. 102152", "codigo: KERR174", "SKU 3MDS1981C", "ref. N° 0707"
+_REGEX_CODIGO_ROTULADO = re.compile(
+    r"\b(?:c[oó]d(?:igo)?|sku|ref(?:erencia)?)\b\.?\s*(?:n[°º]?\.?\s*)?[:#]?\s*([A-Za-z0-9]+)",
+    re.IGNORECASE
+)
+# Cantidades con unidad que no son codigos aunque mezclen letras y numeros ("500ML", "X100", "2UNI")
+_REGEX_CANTIDAD_UNIDAD = re.compile(
+    r"^(?:\d+(?:ML|MG|MCG|G|GR|GRS|KG|CC|L|LT|LTS|MM|CM|M|MT|MTS|U|UN|UND|UNI|UNID|UDS|X)|X\d+)$"
+)
+
+
+def _es_codigo_alfanumerico(token: str) -> bool:
+    """
+    Token sin rotulo aceptado como codigo: mezcla letras y digitos, largo >= 5 y no
+    es una cantidad con unidad. Un numero solo (año, volumen, cantidad) nunca califica.
+    """
+    return (
+        len(token) >= 5
+        and any(c.isdigit() for c in token)
+        and any(c.isalpha() for c in token)
+        and not _REGEX_CANTIDAD_UNIDAD.match(token)
+    )
+
+
+def codigos_en_texto(texto: str) -> Set[str]:
+    """
+    Codigos candidatos mencionados en el texto de un item (en mayusculas).
+    """
+    texto = texto or ""
+    codigos = {m.group(1).upper() for m in _REGEX_CODIGO_ROTULADO.finditer(texto)}
+    codigos.update(t.upper() for t in _REGEX_TOKEN.findall(texto) if _es_codigo_alfanumerico(t.upper()))
+    return codigos
+
+
+class IndiceDeterministico:
+    """
+    Indices en memoria del catalogo para resolver items sin LLM.
+    """
+
+    def __init__(self, productos: List[dict]):
+        self.productos = productos
+        self.por_codigo: Dict[str, List[int]] = {}
+        self.por_nombre: Dict[str, List[int]] = {}
+        self.keywords: List[Set[str]] = []
+        self.invertido: Dict[str, List[int]] = {}
+
+        for idx, p in enumerate(productos):
+            nombre = str(p.get("nombre") or "")
+            match = _REGEX_PREFIJO_CODIGO.match(nombre)
+            if match:
+                self.por_codigo.setdefault(match.group(1).upper(), []).append(idx)
+
+            nombre_sin_codigo = _REGEX_PREFIJO_CODIGO.sub("", nombre, count=1)
+            for variante in {normalizar_descripcion(nombre), normalizar_descripcion(nombre_sin_codigo)} - {""}:
+                self.por_nombre.setdefault(variante, []).append(idx)
+
+            descripcion = str(p.get("descripcion") or "")
+            if descripcion.strip().lower() == "nan":
+                # product_loader expone las descripciones vacias como "nan"
+                descripcion = ""
+            keywords = _normalize_text(f"{nombre_sin_codigo} {descripcion}")
+            self.keywords.append(keywords)
+            for palabra in keywords:
+                self.invertido.setdefault(palabra, []).append(idx)
+
+    def _unico(self, indices: Optional[List[int]]) -> Optional[int]:
+        if indices and len(set(indices)) == 1:
+            return indices[0]
+        return None
+
+    def por_codigo_exacto(self, texto: str) -> Optional[Tuple[int, str]]:
+        """
+        (posicion, codigo) si el texto menciona codigos que apuntan a un unico producto.
+        """
+        encontrados: Dict[int, str] = {}
+        for codigo in codigos_en_texto(texto):
+            for idx in self.por_codigo.get(codigo, ()):
+                encontrados[idx] = codigo
+        if len(encontrados) == 1:
+            return next(iter(encontrados.items()))
+        return None
+
+    def por_nombre_exacto(self, nombre: str) -> Optional[int]:
+        return self._unico(self.por_nombre.get(normalizar_descripcion(nombre)))
+
+    def por_lexico(self, texto: str, umbral: float) -> Optional[Tuple[int, float]]:
+        item_keywords = _normalize_text(texto)
+        if not item_keywords:
+            return None
+
+        comunes: Dict[int, int] = {}
+        for palabra in item_keywords:
+            for idx in self.invertido.get(palabra, ()):
+                comunes[idx] = comunes.get(idx, 0) + 1
+        if not comunes:
+            return None
+
+        puntajes = sorted(
+            ((n / len(item_keywords | self.keywords[idx]), idx) for idx, n in comunes.items()),
+            reverse=True
+        )
+        mejor, idx = puntajes[0]
+        segundo = puntajes[1][0] if len(puntajes) > 1 else 0.0
+        if mejor >= umbral and mejor - segundo >= MARGEN_LEXICO:
+            return idx, mejor
+        return None
+
+
+def _homologacion(item: dict, producto: dict, score: float, motivo: str) -> dict:
+    return {
+        "item_key": item.get("item_key"),
+        "descripcion_detectada": item.get("descripcion_detectada", ""),
+        "razonamiento_general": f"Homologación determinística: {motivo}.",
+        "candidatos": [{
+            "ranking": 1,
+            "producto": {
+                "codigo": producto.get("codigo"),
+                "nombre": producto.get("nombre"),
+                "descripcion": producto.get("descripcion"),
+                "stock_disponible": producto.get("stock_disponible"),
+                "ubicacion_stock": producto.get("ubicacion_stock"),
+            },
+            "score_similitud": round(score, 4),
+            "razonamiento": motivo,
+        }],
+    }
+
+
+def homologar_deterministico(
+    items_detectados: List[dict],
+    productos_catalogo: List[dict],
+    umbral_lexico: float,
+) -> Dict[int, dict]:
+    """
+    Intenta resolver cada item sin LLM.
+
+    Args:
+        items_detectados: Items con item_key y descripcion_detectada
+        productos_catalogo: Catalogo completo
+        umbral_lexico: Jaccard minimo para aceptar una coincidencia lexica
+
+    Returns:
+        {posicion_item: homologacion} para los items resueltos
+    """
+    indice = IndiceDeterministico(productos_catalogo)
+    resueltos = {}
+    conteo = {"codigo": 0, "nombre": 0, "lexico": 0}
+
+    for pos, item in enumerate(items_detectados):
+        nombre = item.get("item_key") or ""
+        texto = f"{nombre} {item.get('descripcion_detectada') or ''}"
+
+        match = indice.por_codigo_exacto(texto)
+        if match is not None:
+            idx, codigo = match
+            resueltos[pos] = _homologacion(item, productos_catalogo[idx], 1.0, f"coincidencia exacta de código {codigo}")
+            conteo["codigo"] += 1
+            continue
+
+        idx = indice.por_nombre_exacto(nombre)
+        if idx is not None:
+            resueltos[pos] = _homologacion(item, productos_catalogo[idx], 1.0, "coincidencia exacta de nombre normalizado")
+            conteo["nombre"] += 1
+            continue
+
+        match = indice.por_lexico(texto, umbral_lexico)
+        if match is not None:
+            idx, score = match
+            resueltos[pos] = _homologacion(item, productos_catalogo[idx], score, f"coincidencia léxica de alta confianza ({score:.2f})")
+            conteo["lexico"] += 1
+
+    logger.info(
+        "[HOMOLOGACION_DETERMINISTICA] Resueltos %d/%d items | por_codigo=%d | por_nombre=%d | por_lexico=%d",
+        len(resueltos), len(items_detectados), conteo["codigo"], conteo["nombre"], conteo["lexico"]
+    )
+    return resueltos
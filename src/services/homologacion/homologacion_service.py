@@ -12,7 +12,9 @@ import logging
 from uuid import UUID
 from typing import Optional
 
+from src import config
 from src.services.homologacion.homologador import homologar_productos_para_licitacion
+from src.services.homologacion.catalog_embeddings import obtener_indice_catalogo
 from src.services.homologacion.product_loader import cargar_productos_catalogo
 from src.services.licitacion_service import obtener_items_por_licitacion
 
@@ -77,12 +79,17 @@ def ejecutar_homologacion_automatica(
         len(productos_catalogo)
     )
 
+    indice_catalogo = None
+    if config.HOMOLOGACION_RETRIEVER == "hibrido":
+        indice_catalogo = obtener_indice_catalogo(productos_catalogo)
+
     resultado = homologar_productos_para_licitacion(
         licitacion_id=licitacion_id_str,
         items_licitacion=items_licitacion,
         productos_catalogo=productos_catalogo,
         modelo=modelo,
-        conn=conn
+        conn=conn,
+        indice_catalogo=indice_catalogo
     )
 
     logger.info(
@@ -7,23 +7,38 @@ contra un catalogo de productos usando LLM.
 IMPORTANTE: Este modulo NO crea conexiones a BD internamente.
 La conexion debe ser proporcionada como parametro.
 """
+import re
 import json
+import time
+import random
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from uuid import uuid4
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
+from src import config
 from src.services.llm_service import run_llm_raw_with_tokens
-from src.services.homologacion.homologacion_db import (
-    insertar_homologacion_producto,
-    insertar_candidato_homologacion,
+from src.services.homologacion.homologacion_db import insertar_homologaciones_bulk
+from src.services.homologacion.catalog_filter import (
+    filter_catalog,
+    filter_catalog_por_item,
+    hybrid_filter_catalog,
+    recuperar_candidatos_por_item,
 )
-from src.services.homologacion.catalog_filter import filter_catalog
+from src.services.homologacion.homologacion_cache import HomologacionCache
+from src.services.homologacion.homologacion_deterministica import homologar_deterministico
+from src.utils.tracing import span, trazar
 
 logger = logging.getLogger(__name__)
 
 PROMPT_PATH = Path(__file__).parent / "prompts" / "prompt_homologacion_v3.txt"
+PROMPT_PATH_POR_ITEM = Path(__file__).parent / "prompts" / "prompt_homologacion_v4.txt"
+
+# Campos del producto que se envian al LLM en el modo por item (compacto)
+_CAMPOS_PRODUCTO_PROMPT = ("codigo", "nombre", "descripcion")
+_REF_PRODUCTO = re.compile(r"^P\d+$")
 
 
 def build_prompt_homologacion(items_detectados: List[dict], productos_catalogo: List[dict]) -> str:
@@ -51,12 +66,234 @@ def build_prompt_homologacion(items_detectados: List[dict], productos_catalogo:
     return prompt
 
 
+def build_prompt_homologacion_por_item(
+    items_detectados: List[dict], candidatos_por_item: List[List[dict]]
+) -> Tuple[str, Dict[str, dict]]:
+    """
+    Construye el prompt compacto del modo por item: cada item lleva solo las
+    referencias a sus propios candidatos, y los productos compartidos entre
+    items aparecen una unica vez en la tabla de referencias. Los productos sin
+    codigo no se envian (no se pueden homologar ni persistir).
+
+    Args:
+        items_detectados: Lista de items del lote
+        candidatos_por_item: Candidatos del catalogo para cada item (misma posicion)
+
+    Returns:
+        (prompt formateado para el LLM, {ref: producto}) para hidratar la respuesta
+    """
+    referencias = {}
+    productos_por_ref = {}
+    productos_ref = []
+    items_con_candidatos = []
+
+    for item, candidatos in zip(items_detectados, candidatos_por_item):
+        refs_item = []
+        for producto in candidatos:
+            if _codigo_vacio(producto.get("codigo")):
+                continue
+            codigo = str(producto.get("codigo"))
+            if codigo not in referencias:
+                referencias[codigo] = f"P{len(referencias) + 1}"
+                productos_por_ref[referencias[codigo]] = producto
+                fila = {"ref": referencias[codigo]}
+                for campo in _CAMPOS_PRODUCTO_PROMPT:
+                    valor = producto.get(campo)
+                    if valor is not None and str(valor).strip().lower() not in ("", "nan"):
+                        fila[campo] = valor
+                productos_ref.append(fila)
+            refs_item.append(referencias[codigo])
+        items_con_candidatos.append({**item, "candidatos": refs_item})
+
+    prompt_base = PROMPT_PATH_POR_ITEM.read_text(encoding="utf-8")
+    prompt = prompt_base.replace(
+        "{{ productos_ref }}",
+        "\n".join(json.dumps(p, ensure_ascii=False, separators=(",", ":")) for p in productos_ref)
+    )
+    prompt = prompt.replace(
+        "{{ items_con_candidatos }}",
+        "\n".join(json.dumps(i, ensure_ascii=False, separators=(",", ":")) for i in items_con_candidatos)
+    )
+
+    return prompt, productos_por_ref
+
+
+def _codigo_vacio(codigo) -> bool:
+    return codigo is None or str(codigo).strip().lower() in ("", "nan", "none")
+
+
+def _hidratar_candidatos(
+    homologaciones: List[dict], productos_por_codigo: dict, productos_por_ref: Optional[Dict[str, dict]] = None
+) -> None:
+    """
+    Completa los datos de producto de cada candidato desde el catalogo
+    (el modo por item solo pide el codigo al LLM). El LLM puede responder con la
+    referencia de la tabla del prompt ("P3") o con el codigo real: las referencias
+    se traducen primero con `productos_por_ref`; una referencia que no esta en la
+    tabla se descarta.
+    """
+    productos_por_ref = productos_por_ref or {}
+    for homologacion in homologaciones:
+        candidatos = []
+        for candidato in homologacion.get("candidatos") or []:
+            producto = candidato.get("producto") or {}
+            codigo = str(producto.get("codigo")).strip()
+            catalogo = productos_por_ref.get(codigo) or productos_por_codigo.get(codigo)
+            if not catalogo:
+                if productos_por_ref and _REF_PRODUCTO.match(codigo):
+                    logger.warning("[HOMOLOGADOR] Referencia %s inexistente para item %s, se descarta", codigo, homologacion.get("item_key"))
+                else:
+                    candidatos.append(candidato)
+                continue
+            candidatos.append(candidato)
+            candidato["producto"] = {
+                "codigo": catalogo.get("codigo"),
+                "nombre": catalogo.get("nombre"),
+                "descripcion": catalogo.get("descripcion"),
+                "stock_disponible": catalogo.get("stock_disponible"),
+                "ubicacion_stock": catalogo.get("ubicacion_stock"),
+            }
+        if "candidatos" in homologacion:
+            homologacion["candidatos"] = candidatos
+
+
+def _ensamblar_homologaciones(items_detectados: List[dict], resueltos: dict, homologaciones_llm: List[dict]) -> List[dict]:
+    """
+    Ordena las homologaciones segun el orden original de los items, combinando
+    los items ya resueltos (fast-path deterministico y cache) con las respuestas del LLM. Las respuestas cuyo item_key
+    no corresponde a ningun item se agregan al final para no perderlas.
+    """
+    por_key = {}
+    for homologacion in homologaciones_llm:
+        por_key.setdefault(homologacion.get("item_key"), []).append(homologacion)
+
+    ordenadas = []
+    for idx, item in enumerate(items_detectados):
+        if idx in resueltos:
+            ordenadas.append(resueltos[idx])
+        elif por_key.get(item["item_key"]):
+            ordenadas.append(por_key[item["item_key"]].pop(0))
+
+    for restantes in por_key.values():
+        ordenadas.extend(restantes)
+    return ordenadas
+
+
+def _es_error_rate_limit(error: Exception) -> bool:
+    texto = str(error).lower()
+    return "429" in texto or "rate limit" in texto or "rate_limit" in texto or "quota" in texto
+
+
+def _llamar_llm_con_reintentos(prompt: str, modelo: str, licitacion_id: str, num_batch: int) -> dict:
+    """
+    Llama al LLM reintentando con backoff exponencial ante errores de rate limit (429).
+    """
+    max_reintentos = config.HOMOLOGACION_MAX_REINTENTOS
+    for intento in range(max_reintentos + 1):
+        try:
+            return run_llm_raw_with_tokens(prompt, overrides={"model": modelo}, licitacion_id=licitacion_id, action="HOMOLOGAR_ITEMS")
+        except Exception as e:
+            if not _es_error_rate_limit(e) or intento >= max_reintentos:
+                raise
+            espera = 2 ** intento + random.random()
+            logger.warning(
+                "[HOMOLOGADOR] Rate limit en Batch %d. Reintentando en %.1fs (intento %d/%d)",
+                num_batch, espera, intento + 1, max_reintentos
+            )
+            time.sleep(espera)
+
+
+@trazar("homologacion.batch")
+def _homologar_batch(num_batch: int, batch_items: List[dict], ctx: dict) -> dict:
+    """
+    Homologa un batch de items: filtra el catalogo, construye el prompt, llama al
+    LLM y parsea la respuesta. Nunca lanza excepciones: los errores se reportan
+    en la clave "error" para no afectar a los demas batches.
+
+    Returns:
+        dict con "homologaciones", "tokens_input", "tokens_output" y "error"
+    """
+    productos_catalogo = ctx["productos_catalogo"]
+    indice_catalogo = ctx["indice_catalogo"]
+    resultado = {"homologaciones": [], "tokens_input": 0, "tokens_output": 0, "error": None}
+
+    logger.info("[HOMOLOGADOR] Procesando Batch %d/%d (%d items)...", num_batch, ctx["total_batches"], len(batch_items))
+
+    respuesta_texto = ""
+    try:
+        # --- NUEVO: Filtrar catálogo para este batch para evitar exceso de tokens ---
+        if ctx["modo_por_item"]:
+            top_k = config.HOMOLOGACION_TOP_K_POR_ITEM
+            candidatos_por_item = None
+            if indice_catalogo is not None:
+                candidatos_por_item = recuperar_candidatos_por_item(
+                    batch_items, productos_catalogo, indice_catalogo, top_k=top_k
+                )
+            if candidatos_por_item is None:
+                candidatos_por_item = filter_catalog_por_item(batch_items, productos_catalogo, top_k=top_k)
+
+            prompt, productos_por_ref = build_prompt_homologacion_por_item(batch_items, candidatos_por_item)
+            productos_enviados = len(productos_por_ref)
+        else:
+            if indice_catalogo is not None:
+                productos_relevantes = hybrid_filter_catalog(
+                    batch_items, productos_catalogo, indice_catalogo,
+                    top_n=config.HOMOLOGACION_TOP_N_HIBRIDO
+                )
+            else:
+                productos_relevantes = filter_catalog(batch_items, productos_catalogo, top_n=120)
+
+            prompt = build_prompt_homologacion(batch_items, productos_relevantes)
+            productos_enviados = len(productos_relevantes)
+
+        logger.info("[HOMOLOGADOR] Enviando prompt al LLM | largo_prompt=%d | productos_enviados=%d", len(prompt), productos_enviados)
+
+        resultado_llm = _llamar_llm_con_reintentos(prompt, ctx["modelo"], ctx["licitacion_id"], num_batch)
+
+        respuesta_texto = resultado_llm.get("respuesta", "")
+        resultado["tokens_input"] = resultado_llm.get("tokens_input", 0)
+        resultado["tokens_output"] = resultado_llm.get("tokens_output", 0)
+
+        logger.info(
+            "[HOMOLOGADOR] Respuesta LLM recibida Batch %d | tokens_input=%d | tokens_output=%d",
+            num_batch, resultado["tokens_input"], resultado["tokens_output"]
+        )
+
+        if respuesta_texto.startswith("```json"):
+            respuesta_texto = respuesta_texto[7:]
+        if respuesta_texto.startswith("```"):
+            respuesta_texto = respuesta_texto[3:]
+        if respuesta_texto.endswith("```"):
+            respuesta_texto = respuesta_texto[:-3]
+        respuesta_texto = respuesta_texto.strip()
+
+        homologaciones_batch = json.loads(respuesta_texto)
+        if isinstance(homologaciones_batch, list):
+            if ctx["modo_por_item"]:
+                _hidratar_candidatos(homologaciones_batch, ctx["productos_por_codigo"], productos_por_ref)
+            resultado["homologaciones"] = homologaciones_batch
+        else:
+            logger.error("[HOMOLOGADOR] Respuesta LLM no es una lista en el Batch %d", num_batch)
+            resultado["error"] = "Respuesta LLM no es una lista"
+    except json.JSONDecodeError as e:
+        logger.error("[HOMOLOGADOR] Error parseando respuesta LLM en Batch %d: %s", num_batch, str(e))
+        logger.error("[HOMOLOGADOR] Respuesta raw Batch %d: %s", num_batch, respuesta_texto[:500])
+        resultado["error"] = str(e)
+    except Exception as e:
+        logger.error("[HOMOLOGADOR] Error inesperado en Batch %d: %s", num_batch, str(e))
+        resultado["error"] = str(e)
+
+    return resultado
+
+
+@trazar("homologacion.homologar_productos")
 def homologar_productos_para_licitacion(
     licitacion_id: str,
     items_licitacion: List[dict],
     productos_catalogo: List[dict],
     modelo: str,
-    conn
+    conn,
+    indice_catalogo=None
 ) -> dict:
     """
     Ejecuta el proceso de homologacion de productos para una licitacion.
@@ -70,6 +307,15 @@ def homologar_productos_para_licitacion(
         productos_catalogo: Lista de productos del catalogo
         modelo: Modelo LLM a utilizar (ej: "gpt-4o")
         conn: Conexion activa a PostgreSQL
+        indice_catalogo: Indice vectorial del catalogo (CatalogVectorIndex). Si se
+            entrega y HOMOLOGACION_RETRIEVER="hibrido", se usa recuperacion hibrida.
+
+    Con HOMOLOGACION_MODO="por_item" cada item recibe solo sus top-k candidatos
+    (prompt proporcional a items x k); con "lote" se envia una lista compartida.
+    Los batches se ejecutan en paralelo (HOMOLOGACION_MAX_CONCURRENCIA) y sus
+    resultados se ensamblan en orden; un batch fallido no descarta a los demas.
+    Los items resueltos por el fast-path deterministico (codigo, nombre o lexico)
+    o con resultado en cache (HomologacionCache) no se envian al LLM.
 
     Returns:
         dict con estructura:
@@ -102,114 +348,119 @@ def homologar_productos_para_licitacion(
     for idx, item in enumerate(items_detectados):
         logger.debug("  [%d] item_key=%s", idx+1, item['item_key'])
 
-    BATCH_SIZE = 10
-    total_homologaciones = []
-    total_tokens_input = 0
-    total_tokens_output = 0
+    modo_por_item = config.HOMOLOGACION_MODO == "por_item"
+    productos_por_codigo = {str(p.get("codigo")): p for p in productos_catalogo if not _codigo_vacio(p.get("codigo"))}
 
-    total_batches = (len(items_detectados) + BATCH_SIZE - 1) // BATCH_SIZE
+    # --- Fast-path deterministico: codigo exacto, nombre normalizado o lexico de alta confianza ---
+    resueltos_deterministico = {}
+    if config.HOMOLOGACION_FAST_PATH_ENABLED:
+        resueltos_deterministico = homologar_deterministico(
+            items_detectados,
+            productos_catalogo,
+            config.HOMOLOGACION_UMBRAL_LEXICO
+        )
 
-    for i in range(total_batches):
-        batch_items = items_detectados[i*BATCH_SIZE : (i+1)*BATCH_SIZE]
-        logger.info("[HOMOLOGADOR] Procesando Batch %d/%d (%d items)...", i+1, total_batches, len(batch_items))
+    # --- Cache: solo los items sin resultado memoizado se envian al LLM ---
+    prompt_version = (PROMPT_PATH_POR_ITEM if modo_por_item else PROMPT_PATH).stem
+    cache = HomologacionCache.desde_config(productos_catalogo, prompt_version, modelo)
+    hits_cache = {}
+    if cache is not None:
+        posiciones = [idx for idx in range(len(items_detectados)) if idx not in resueltos_deterministico]
+        try:
+            hits = cache.obtener([items_detectados[idx] for idx in posiciones])
+            hits_cache = {posiciones[i]: h for i, h in hits.items()}
+            _hidratar_candidatos(list(hits_cache.values()), productos_por_codigo)
+        except Exception as e:
+            logger.warning("[HOMOLOGADOR] Error leyendo cache de homologacion: %s", e)
+            cache, hits_cache = None, {}
+        logger.info(
+            "[HOMOLOGADOR] Cache de homologacion | hits=%d | pendientes=%d",
+            len(hits_cache), len(posiciones) - len(hits_cache)
+        )
 
-        # --- NUEVO: Filtrar catálogo para este batch para evitar exceso de tokens ---
-        productos_relevantes = filter_catalog(batch_items, productos_catalogo, top_n=120)
+    resueltos = {**resueltos_deterministico, **hits_cache}
+    items_pendientes = [item for idx, item in enumerate(items_detectados) if idx not in resueltos]
 
-        prompt = build_prompt_homologacion(batch_items, productos_relevantes)
-        logger.info("[HOMOLOGADOR] Enviando prompt al LLM | largo_prompt=%d | productos_enviados=%d", len(prompt), len(productos_relevantes))
+    BATCH_SIZE = 10
+    batches = [
+        items_pendientes[i:i + BATCH_SIZE]
+        for i in range(0, len(items_pendientes), BATCH_SIZE)
+    ]
+    total_batches = len(batches)
 
-        try:
-            resultado_llm = run_llm_raw_with_tokens(prompt, overrides={"model": modelo}, licitacion_id=licitacion_id, action="HOMOLOGAR_ITEMS")
-            
-            respuesta_texto = resultado_llm.get("respuesta", "")
-            tokens_in = resultado_llm.get("tokens_input", 0)
-            tokens_out = resultado_llm.get("tokens_output", 0)
-            
-            total_tokens_input += tokens_in
-            total_tokens_output += tokens_out
-
-            logger.info(
-                "[HOMOLOGADOR] Respuesta LLM recibida Batch %d | tokens_input=%d | tokens_output=%d",
-                i+1, tokens_in, tokens_out
-            )
+    contexto_batch = {
+        "licitacion_id": licitacion_id,
+        "modelo": modelo,
+        "productos_catalogo": productos_catalogo,
+        "productos_por_codigo": productos_por_codigo,
+        "indice_catalogo": indice_catalogo if config.HOMOLOGACION_RETRIEVER == "hibrido" else None,
+        "modo_por_item": modo_por_item,
+        "total_batches": total_batches,
+    }
 
-            if respuesta_texto.startswith("```json"):
-                respuesta_texto = respuesta_texto[7:]
-            if respuesta_texto.startswith("```"):
-                respuesta_texto = respuesta_texto[3:]
-            if respuesta_texto.endswith("```"):
-                respuesta_texto = respuesta_texto[:-3]
-            respuesta_texto = respuesta_texto.strip()
-
-            homologaciones_batch = json.loads(respuesta_texto)
-            if isinstance(homologaciones_batch, list):
-                total_homologaciones.extend(homologaciones_batch)
-            else:
-                logger.error("[HOMOLOGADOR] Respuesta LLM no es una lista en el Batch %d", i+1)
-        except json.JSONDecodeError as e:
-            logger.error("[HOMOLOGADOR] Error parseando respuesta LLM en Batch %d: %s", i+1, str(e))
-            logger.error("[HOMOLOGADOR] Respuesta raw Batch %d: %s", i+1, respuesta_texto[:500])
+    max_concurrencia = max(1, min(config.HOMOLOGACION_MAX_CONCURRENCIA, total_batches or 1))
+    logger.info(
+        "[HOMOLOGADOR] Ejecutando %d batches | concurrencia=%d",
+        total_batches, max_concurrencia
+    )
+
+    # Los resultados se ensamblan en el orden de los batches, independiente del
+    # orden en que terminen las llamadas al LLM.
+    with ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+        futuros = [
+            executor.submit(contextvars.copy_context().run, _homologar_batch, i + 1, batch_items, contexto_batch)
+            for i, batch_items in enumerate(batches)
+        ]
+        resultados_batches = []
+        for i, futuro in enumerate(futuros):
+            try:
+                resultados_batches.append(futuro.result())
+            except Exception as e:
+                logger.error("[HOMOLOGADOR] Error inesperado en Batch %d: %s", i+1, str(e))
+                resultados_batches.append({"homologaciones": [], "tokens_input": 0, "tokens_output": 0, "error": str(e)})
+
+    homologaciones_llm = [h for r in resultados_batches for h in r["homologaciones"]]
+    homologaciones = _ensamblar_homologaciones(items_detectados, resueltos, homologaciones_llm)
+
+    if cache is not None and homologaciones_llm:
+        try:
+            items_por_key = {item["item_key"]: item for item in items_pendientes}
+            cache.guardar([
+                (items_por_key[h.get("item_key")], h)
+                for h in homologaciones_llm
+                if h.get("item_key") in items_por_key
+            ])
         except Exception as e:
-            logger.error("[HOMOLOGADOR] Error inesperado en Batch %d: %s", i+1, str(e))
-            
-    # Asignamos a las variables originales para mantener la compatibilidad con el resto del codigo de guardado
-    homologaciones = total_homologaciones
-    tokens_input = total_tokens_input
-    tokens_output = total_tokens_output
+            logger.warning("[HOMOLOGADOR] Error guardando cache de homologacion: %s", e)
+
+    tokens_input = sum(r["tokens_input"] for r in resultados_batches)
+    tokens_output = sum(r["tokens_output"] for r in resultados_batches)
+    batches_fallidos = [i + 1 for i, r in enumerate(resultados_batches) if r.get("error")]
+
+    if batches_fallidos:
+        logger.warning(
+            "[HOMOLOGADOR] %d/%d batches fallaron: %s",
+            len(batches_fallidos), total_batches, batches_fallidos
+        )
 
     total_items_detectados = len(items_detectados)
     total_items_con_match = sum(1 for h in homologaciones if h.get("candidatos"))
 
     now = datetime.utcnow()
 
-    for homologacion in homologaciones:
-        item_key = homologacion.get("item_key")
-        descripcion_detectada = homologacion.get("descripcion_detectada", "")
-        razonamiento_general = homologacion.get("razonamiento_general")
-        candidatos = homologacion.get("candidatos", [])
-
-        homologacion_id = str(uuid4())
-
-        logger.info("[HOMOLOGADOR] Insertando homologacion | item_key=%s", item_key)
-
-        insertar_homologacion_producto(
+    with span("db.insertar_homologaciones", homologaciones=len(homologaciones)):
+        homologacion_ids = insertar_homologaciones_bulk(
             conn=conn,
-            homologacion_id=homologacion_id,
             licitacion_id=licitacion_id,
-            item_key=item_key,
-            descripcion_detectada=descripcion_detectada,
-            razonamiento_general=razonamiento_general,
+            homologaciones=homologaciones,
             tokens_input=tokens_input,
             tokens_output=tokens_output,
-            tokens_total=tokens_input + tokens_output,
             modelo_usado=modelo,
             fecha_homologacion=now,
         )
+        logger.info("[HOMOLOGADOR] Homologaciones insertadas en bloque: %d", len(homologacion_ids))
 
-        for candidato in candidatos:
-            producto = candidato.get("producto", {})
-
-            insertar_candidato_homologacion(
-                conn=conn,
-                homologacion_id=homologacion_id,
-                ranking=candidato.get("ranking"),
-                producto_codigo=producto.get("codigo"),
-                producto_nombre=producto.get("nombre"),
-                producto_descripcion=producto.get("descripcion"),
-                stock_disponible=producto.get("stock_disponible"),
-                ubicacion_stock=producto.get("ubicacion_stock"),
-                score_similitud=candidato.get("score_similitud"),
-                razonamiento=candidato.get("razonamiento"),
-            )
-
-            logger.debug(
-                "[HOMOLOGADOR] Candidato insertado | item_key=%s | producto=%s",
-                item_key,
-                producto.get("codigo")
-            )
-
-    conn.commit()
+        conn.commit()
 
     logger.info(
         "[HOMOLOGADOR] Homologacion completada | licitacion_id=%s | items_con_match=%d/%d",
@@ -227,7 +478,10 @@ def homologar_productos_para_licitacion(
             "tokens_input": tokens_input,
             "tokens_output": tokens_output,
             "tokens_total": tokens_input + tokens_output,
-            "modelo_usado": modelo
+            "modelo_usado": modelo,
+            "batches_fallidos": batches_fallidos,
+            "items_desde_cache": len(hits_cache),
+            "items_deterministicos": len(resueltos_deterministico)
         },
         "homologaciones": homologaciones
     }
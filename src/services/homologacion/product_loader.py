@@ -1,9 +1,14 @@
 import os
-import pandas as pd
 import unicodedata
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 from src.services.homologacion.models.schema import ProductoCatalogo
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# El encabezado suele estar en las primeras filas; solo si no aparece se recorre la hoja completa
+FILAS_BUSQUEDA_ENCABEZADO = 50
+
 
 def cargar_productos_catalogo(ruta_archivo: str = None) -> List[ProductoCatalogo]:
     """
@@ -27,6 +32,16 @@ def cargar_productos_catalogo(ruta_archivo: str = None) -> List[ProductoCatalogo
         else:
             ruta_archivo = os.path.join(carpeta, archivos[0])
 
+    raw_df = _leer_excel(ruta_archivo)
+    return _productos_desde_dataframe(raw_df)
+
+
+def _leer_excel(ruta_archivo: str) -> "pd.DataFrame":
+    """
+    Lee el archivo de catalogo sin encabezados (se detectan despues).
+    """
+    # pandas se importa al leer el catalogo, no al importar el worker
+    import pandas as pd
     try:
         raw_df = pd.read_excel(ruta_archivo, header=None)
     except ValueError as e:
@@ -41,26 +56,45 @@ def cargar_productos_catalogo(ruta_archivo: str = None) -> List[ProductoCatalogo
                     raw_df = pd.read_html(ruta_archivo)[0]
         else:
             raise e
+    return raw_df
 
-    # Buscar la fila que contiene los encabezados ("cod_prod", "producto")
-    header_idx = 0
-    for idx, row in raw_df.iterrows():
-        row_str = " ".join(row.astype(str).str.lower())
-        if "cod_prod" in row_str and "producto" in row_str:
-            header_idx = idx
-            break
-
-    # Asignar los nombres de las columnas y limpiar
-    df = raw_df.copy()
-    df.columns = df.iloc[header_idx].astype(str).str.strip().str.lower()
-    df = df.iloc[header_idx+1:].reset_index(drop=True)
-
-    # Normalizar columnas quitando tildes para evitar problemas
-    def clean_col(c):
-        c = str(c).strip().lower()
-        return unicodedata.normalize('NFD', c).encode('ascii', 'ignore').decode('utf-8')
-        
-    df.columns = [clean_col(c) for c in df.columns]
+
+def _clean_col(c) -> str:
+    c = str(c).strip().lower()
+    return unicodedata.normalize('NFD', c).encode('ascii', 'ignore').decode('utf-8')
+
+
+def _detectar_fila_encabezado(raw_df: "pd.DataFrame") -> Optional[int]:
+    """
+    Posicion de la primera fila que contiene los encabezados ("cod_prod", "producto").
+    """
+    texto = raw_df.apply(lambda col: col.map(str).str.lower())
+    tiene_cod = texto.apply(lambda col: col.str.contains("cod_prod", regex=False)).any(axis=1)
+    tiene_prod = texto.apply(lambda col: col.str.contains("producto", regex=False)).any(axis=1)
+    es_header = (tiene_cod & tiene_prod).to_numpy()
+    return int(es_header.argmax()) if es_header.any() else None
+
+
+def _texto(serie: "pd.Series") -> "pd.Series":
+    # map(str) y no astype(str): en pandas >= 3 astype(str) conserva los NaN
+    # y el catalogo historicamente expone los vacios como "nan"
+    return serie.map(str).str.strip()
+
+
+def _productos_desde_dataframe(raw_df: "pd.DataFrame") -> List[dict]:
+    """
+    Convierte la hoja cruda en registros de ProductoCatalogo usando operaciones
+    columnares (sin iterrows).
+    """
+    import pandas as pd
+    header_idx = _detectar_fila_encabezado(raw_df.head(FILAS_BUSQUEDA_ENCABEZADO))
+    if header_idx is None and len(raw_df) > FILAS_BUSQUEDA_ENCABEZADO:
+        header_idx = _detectar_fila_encabezado(raw_df)
+    header_idx = header_idx or 0
+
+    # Asignar los nombres de las columnas (normalizadas, sin tildes) y limpiar
+    df = raw_df.iloc[header_idx+1:].reset_index(drop=True)
+    df.columns = [_clean_col(c) for c in raw_df.iloc[header_idx]]
 
     columnas_requeridas = [
         "cod_prod", "producto", "descripcion",
@@ -70,27 +104,21 @@ def cargar_productos_catalogo(ruta_archivo: str = None) -> List[ProductoCatalogo
         if col not in df.columns:
             raise ValueError(f"Falta columna requerida en Excel: {col}. Columnas encontradas: {list(df.columns)}")
 
-    # Eliminar filas donde 'cod_prod' esté vacío (NaN) o donde no haya producto válido
+    # Eliminar filas donde 'cod_prod' esté vacío (NaN) o sea "nan" como string
     df = df.dropna(subset=["cod_prod"])
+    codigos = _texto(df["cod_prod"])
+    validos = (codigos != "") & (codigos.str.lower() != "nan")
+    df = df[validos]
+    codigos = codigos[validos]
 
-    productos: List[dict] = []
-    for _, row in df.iterrows():
-        # Validar si cod_prod es de verdad un codigo (saltar valores nulos o "nan" como string)
-        cod_prod_str = str(row["cod_prod"]).strip()
-        if cod_prod_str.lower() == "nan" or not cod_prod_str:
-            continue
-            
-        cantidad = row.get("cantidad", 0)
-        if pd.isna(cantidad):
-            cantidad = 0
-            
-        productos.append({
-            "codigo": cod_prod_str,
-            "nombre": str(row["producto"]).strip(),
-            "descripcion": str(row["descripcion"]).strip(),
-            "stock_disponible": int(float(cantidad)),
-            "ubicacion_stock": str(row["ubicacion"]).strip(),
-            "codigo_tienda": str(row["cod_tienda"]).strip()
-        })
-
-    return productos
+    cantidades = pd.to_numeric(df["cantidad"], errors="coerce").fillna(0)
+
+    productos = pd.DataFrame({
+        "codigo": codigos,
+        "nombre": _texto(df["producto"]),
+        "descripcion": _texto(df["descripcion"]),
+        "stock_disponible": cantidades.astype("float64").astype("int64"),
+        "ubicacion_stock": _texto(df["ubicacion"]),
+        "codigo_tienda": _texto(df["cod_tienda"]),
+    })
+    return productos.to_dict("records")
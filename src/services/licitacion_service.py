@@ -1,9 +1,13 @@
+import logging
 import psycopg2
 import os
 import uuid
 import json
 from datetime import datetime
-import traceback
+
+from src.utils.tracing import trazar
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -108,7 +112,7 @@ def obtener_items_homologados_con_candidatos(licitacion_id: str) -> list[dict]:
     conn = get_pg_conn()
     cur = conn.cursor()
     try:
-        print(f"[HOMOLOGACION_READ] Consultando items homologados | licitacion_id={licitacion_id}")
+        logger.info("[HOMOLOGACION_READ] Consultando items homologados | licitacion_id=%s", licitacion_id)
 
         cur.execute("""
             SELECT
@@ -139,7 +143,7 @@ def obtener_items_homologados_con_candidatos(licitacion_id: str) -> list[dict]:
         """, (str(licitacion_id),))
 
         rows = cur.fetchall()
-        print(f"[HOMOLOGACION_READ] Filas encontradas en query: {len(rows)}")
+        logger.debug("[HOMOLOGACION_READ] Filas encontradas en query: %s", len(rows))
 
         items_dict = {}
 
@@ -174,7 +178,7 @@ def obtener_items_homologados_con_candidatos(licitacion_id: str) -> list[dict]:
 
         resultados = list(items_dict.values())
 
-        print(f"[HOMOLOGACION_READ] Total items homologados: {len(resultados)}")
+        logger.info("[HOMOLOGACION_READ] Total items homologados: %s", len(resultados))
         return resultados
 
     finally:
@@ -228,6 +232,49 @@ def obtener_mapa_uuid_por_interno(licitacion_id: str) -> dict:
         cur.close()
         conn.close()
 
+def resolver_prefijos_documentos(licitacion_id: str, documento_ids: list) -> tuple:
+    """
+    Traduce los documento_ids del mensaje a los prefijos "{lic_int}_{file_int}" con que
+    Redis guarda los chunks (doc_raw_page:{lic_int}_{file_int}_...).
+    Los UUID de licitacion_archivos se buscan en la BD; los ids que ya vienen como
+    sufijo de Redis (ej. '84_126_3724-9.pdf', de la cola del Document Worker) se recortan
+    a "84_126". Sin documento_ids se usa el prefijo de la licitación.
+
+    Returns:
+        (uuid de la licitación, lista de prefijos)
+    """
+    import re
+    conn = get_pg_conn()
+    cur = conn.cursor()
+    try:
+        # Buscar el lic_int basado en licitacion_id (codigo_licitacion/uuid)
+        cur.execute("SELECT id, id_interno FROM licitaciones WHERE id::text = %s OR codigo_licitacion = %s", (licitacion_id, licitacion_id))
+        lic_row = cur.fetchone()
+        lic_uuid = str(lic_row[0]) if lic_row else licitacion_id
+        lic_int_id = lic_row[1] if lic_row else None
+        if not lic_int_id:
+            return lic_uuid, []
+        if not documento_ids:
+            return lic_uuid, [f"{lic_int_id}"]
+
+        prefijos = []
+        # Separar los que parecen UUIDs de los que ya son sufijos de Redis
+        valid_uuids = [d for d in documento_ids if len(str(d)) == 36 and '-' in str(d)]
+        raw_prefixes = [d for d in documento_ids if d not in valid_uuids]
+        if valid_uuids:
+            placeholders = ', '.join(['%s'] * len(valid_uuids))
+            cur.execute(f"SELECT id_interno FROM licitacion_archivos WHERE id::text IN ({placeholders})", tuple(valid_uuids))
+            for doc_row in cur.fetchall():
+                prefijos.append(f"{lic_int_id}_{doc_row[0]}")
+        for raw in raw_prefixes:
+            # Extraer patron "XX_YY" del inicio (ej: "84_126_3724-9-COT26.pdf" -> "84_126")
+            match = re.match(r"^(\d+_\d+)", str(raw))
+            prefijos.append(match.group(1) if match else raw)
+        return lic_uuid, prefijos
+    finally:
+        cur.close()
+        conn.close()
+
 def guardar_auditoria(conn, licitacion_id: str, semantic_run_id: str, concepto: str, campo: str, payload: dict):
     if not isinstance(payload, dict) or "valor" not in payload:
         return # Skip if not our rich schema
@@ -260,6 +307,7 @@ def guardar_auditoria(conn, licitacion_id: str, semantic_run_id: str, concepto:
             json.dumps(fuentes, ensure_ascii=False) if fuentes else None
         ))
 
+@trazar("db.guardar_items_licitacion")
 def guardar_items_licitacion(conn, licitacion_id, semantic_run_id, items: list[dict]):
     with conn.cursor() as cur:
         # Ojo: conn viene de fuera, NO cerrarla aquí
@@ -310,6 +358,7 @@ def guardar_items_licitacion(conn, licitacion_id, semantic_run_id, items: list[d
 
         conn.commit()
 
+@trazar("db.guardar_especificaciones_tecnicas")
 def guardar_especificaciones_tecnicas(conn, semantic_run_id: str, especificaciones: list[dict]):
     with conn.cursor() as cur:
         cur.execute("DELETE FROM item_licitacion_especificaciones WHERE semantic_run_id = %s", (semantic_run_id,))
@@ -349,7 +398,7 @@ def guardar_especificaciones_tecnicas(conn, semantic_run_id: str, especificacion
             ))
 
         if errores:
-            print(f"[⚠️] No se pudieron mapear specs para claves: {errores}")
+            logger.warning("[⚠️] No se pudieron mapear specs para claves: %s", errores)
 
         conn.commit()
 
@@ -358,8 +407,8 @@ def guardar_especificaciones_tecnicas(conn, semantic_run_id: str, especificacion
 # ✅ FINANZAS_LICITACION
 # --------------------------------------------------
 
+@trazar("db.guardar_finanzas_licitacion")
 def guardar_finanzas_licitacion(conn, licitacion_id, finanzas: dict, semantic_run_id: str = None):
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
     def _extract_val(payload):
         if not payload: return None
@@ -454,10 +503,9 @@ def guardar_finanzas_licitacion(conn, licitacion_id, finanzas: dict, semantic_ru
                     guardar_auditoria(conn, licitacion_id, semantic_run_id, "FINANZAS_LICITACION", campo, finanzas.get(campo, {}))
             
         conn.commit()
-        print(f"[{now}] ✅ Finanzas persistidas correctamente | licitacion_id={licitacion_id}")
+        logger.info("✅ Finanzas persistidas correctamente | licitacion_id=%s", licitacion_id)
     except Exception:
-        print(f"[{now}] ❌ Error persistiendo finanzas | licitacion_id={licitacion_id}")
-        traceback.print_exc()
+        logger.exception("❌ Error persistiendo finanzas | licitacion_id=%s", licitacion_id)
         conn.rollback()
         raise
 
@@ -488,8 +536,8 @@ def obtener_finanzas_por_licitacion(licitacion_id: str) -> dict | None:
 # ✅ ENTREGAS_LICITACION
 # --------------------------------------------------
 
+@trazar("db.guardar_entregas_licitacion")
 def guardar_entregas_licitacion(conn, licitacion_id, entregas: dict, semantic_run_id: str = None):
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
     def _extract_val(payload):
         if not payload: return None
@@ -556,13 +604,13 @@ def guardar_entregas_licitacion(conn, licitacion_id, entregas: dict, semantic_ru
                     guardar_auditoria(conn, licitacion_id, semantic_run_id, "ENTREGAS_LICITACION", campo, entregas.get(campo, {}))
             
         conn.commit()
-        print(f"[{now}] ✅ Entregas persistidas correctamente | licitacion_id={licitacion_id}")
+        logger.info("✅ Entregas persistidas correctamente | licitacion_id=%s", licitacion_id)
     except Exception:
-        print(f"[{now}] ❌ Error persistiendo entregas | licitacion_id={licitacion_id}")
-        traceback.print_exc()
+        logger.exception("❌ Error persistiendo entregas | licitacion_id=%s", licitacion_id)
         conn.rollback()
         raise
 
+@trazar("db.actualizar_datos_basicos_licitacion")
 def actualizar_datos_basicos_licitacion(licitacion_id: str, datos: dict, semantic_run_id: str = None) -> None:
     conn = get_pg_conn()
     cur = conn.cursor()
@@ -595,7 +643,7 @@ def actualizar_datos_basicos_licitacion(licitacion_id: str, datos: dict, semanti
             update_values.append(_extract_val(datos["estado"]))
 
         if not update_fields:
-            print(f"⚠️ No hay campos para actualizar en datos básicos de {licitacion_id} (Nombre ignorado)")
+            logger.warning("⚠️ No hay campos para actualizar en datos básicos de %s (Nombre ignorado)", licitacion_id)
             return
 
         update_values.append(str(licitacion_id))
@@ -614,9 +662,9 @@ def actualizar_datos_basicos_licitacion(licitacion_id: str, datos: dict, semanti
                 guardar_auditoria(conn, licitacion_id, semantic_run_id, "DATOS_BASICOS_LICITACION", "estado_publicacion", datos["estado"])
                 
         conn.commit()
-        print(f"✅ Datos básicos actualizados para {licitacion_id}")
+        logger.info("✅ Datos básicos actualizados para %s", licitacion_id)
     except Exception as e:
-        print(f"❌ Error actualizando datos básicos: {e}")
+        logger.error("❌ Error actualizando datos básicos: %s", e)
         conn.rollback()
     finally:
         cur.close()
@@ -629,9 +677,9 @@ def actualizar_estado_licitacion(licitacion_id: str, nuevo_estado: str) -> None:
     try:
         cur.execute("UPDATE licitaciones SET estado = %s WHERE id = %s", (nuevo_estado, str(licitacion_id)))
         conn.commit()
-        print(f"🔄 Estado de Licitación {licitacion_id} actualizado a: {nuevo_estado}")
+        logger.info("🔄 Estado de Licitación %s actualizado a: %s", licitacion_id, nuevo_estado)
     except Exception as e:
-        print(f"❌ Error actualizando estado de licitación: {e}")
+        logger.error("❌ Error actualizando estado de licitación: %s", e)
         conn.rollback()
     finally:
         cur.close()
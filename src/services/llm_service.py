@@ -1,10 +1,14 @@
+import logging
 from src.services.ai_engine.factory import AIProviderFactory
 from src.services.ai_engine.prompt_loader import PromptLoader
 from src import config
+from src.utils.tracing import span
 import json
 from datetime import datetime
 import os
 
+logger = logging.getLogger(__name__)
+
 def _guardar_llm_raw_json(raw_text: str, tag: str = "llm_response"):
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     filename = f"debug_llm_raw_{tag}_{ts}.json"
@@ -19,7 +23,19 @@ def _guardar_llm_raw_json(raw_text: str, tag: str = "llm_response"):
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(contenido, f, indent=2, ensure_ascii=False)
 
-    print(f"[🧪 DEBUG] Respuesta LLM cruda guardada en: {filename}")
+    logger.debug("[🧪 DEBUG] Respuesta LLM cruda guardada en: %s", filename)
+
+
+def configuracion_llm_por_defecto() -> dict:
+    """
+    Motor/modelo por defecto (antes de aplicar el frontmatter del prompt y overrides).
+    """
+    default_provider = getattr(config, "DEFAULT_AI_PROVIDER", "openai")
+    return {
+        "engine": default_provider,
+        "model": "gpt-4o" if default_provider == "openai" else "gemini-1.5-pro",
+        "temperature": 0.0
+    }
 
 
 def run_llm_raw(prompt_path_or_text: str, overrides: dict = None, licitacion_id: str = "default", action: str = "EXTRACCION_SEMANTICA") -> str:
@@ -31,21 +47,14 @@ def run_llm_raw(prompt_path_or_text: str, overrides: dict = None, licitacion_id:
     """
     
     # 1. Configuración por defecto
-    # Use config from src.config or default
-    default_provider = getattr(config, "DEFAULT_AI_PROVIDER", "openai")
-    
-    config_dict = {
-        "engine": default_provider,
-        "model": "gpt-4o" if default_provider == "openai" else "gemini-1.5-pro",
-        "temperature": 0.0
-    }
+    config_dict = configuracion_llm_por_defecto()
     
     prompt_text = prompt_path_or_text
     
     # 2. Intentar cargar desde archivo si parece una ruta y existe
     # Check if absolute or relative to project root
     if os.path.exists(prompt_path_or_text) and prompt_path_or_text.endswith(".txt"):
-        print(f"[llm_service] 📂 Cargando prompt desde archivo: {prompt_path_or_text}")
+        logger.debug("[llm_service] 📂 Cargando prompt desde archivo: %s", prompt_path_or_text)
         loaded_config, loaded_text = PromptLoader.load_prompt(prompt_path_or_text)
         config_dict.update(loaded_config)
         prompt_text = loaded_text
@@ -57,7 +66,7 @@ def run_llm_raw(prompt_path_or_text: str, overrides: dict = None, licitacion_id:
     if overrides:
         config_dict.update(overrides)
 
-    print(f"[llm_service] 🧠 Usando Motor: {config_dict.get('engine')} | Modelo: {config_dict.get('model')}")
+    logger.debug("[llm_service] 🧠 Usando Motor: %s | Modelo: %s", config_dict.get('engine'), config_dict.get('model'))
 
     # 4. Obtener Provider
     provider = AIProviderFactory.get_provider(config_dict)
@@ -69,13 +78,16 @@ def run_llm_raw(prompt_path_or_text: str, overrides: dict = None, licitacion_id:
         "de forma precisa, sin inventar datos."
     )
     
-    reply, usage = provider.generate_text(
-        prompt=prompt_text,
-        system_prompt=system_prompt,
-        config=config_dict
-    )
-
-    print(f"[llm_service] ✅ Respuesta recibida. Tokens: {usage}")
+    with span("llm.generate_text", licitacion_id=None if licitacion_id == "default" else licitacion_id, motor=config_dict.get("engine"), modelo=config_dict.get("model"), accion=action) as s:
+        reply, usage = provider.generate_text(
+            prompt=prompt_text,
+            system_prompt=system_prompt,
+            config=config_dict
+        )
+        s.set("tokens_input", usage.get("input", 0))
+        s.set("tokens_output", usage.get("output", 0))
+
+    logger.debug("[llm_service] ✅ Respuesta recibida. Tokens: %s", usage)
     _guardar_llm_raw_json(reply, tag="generic_response")
 
     # Registrar uso de tokens
@@ -97,18 +109,12 @@ def run_llm_raw_with_tokens(prompt_path_or_text: str, overrides: dict = None, li
     Versión que retorna también los tokens.
     """
     # Reutilizamos lógica (simplificada, duplicada por claridad para no romper compatibilidad firma)
-    default_provider = getattr(config, "DEFAULT_AI_PROVIDER", "openai")
-    
-    config_dict = {
-        "engine": default_provider,
-        "model": "gpt-4o" if default_provider == "openai" else "gemini-1.5-pro",
-        "temperature": 0.0
-    }
+    config_dict = configuracion_llm_por_defecto()
     
     prompt_text = prompt_path_or_text
 
     if os.path.exists(prompt_path_or_text) and prompt_path_or_text.endswith(".txt"):
-         print(f"[llm_service] 📂 Cargando prompt desde archivo: {prompt_path_or_text}")
+         logger.debug("[llm_service] 📂 Cargando prompt desde archivo: %s", prompt_path_or_text)
          loaded_config, loaded_text = PromptLoader.load_prompt(prompt_path_or_text)
          config_dict.update(loaded_config)
          prompt_text = loaded_text
@@ -116,7 +122,7 @@ def run_llm_raw_with_tokens(prompt_path_or_text: str, overrides: dict = None, li
     if overrides:
         config_dict.update(overrides)
         
-    print(f"[llm_service] 🧠 Init llamada LLM. Motor: {config_dict.get('engine')} Modelo: {config_dict.get('model')}")
+    logger.debug("[llm_service] 🧠 Init llamada LLM. Motor: %s Modelo: %s", config_dict.get('engine'), config_dict.get('model'))
 
     provider = AIProviderFactory.get_provider(config_dict)
     
@@ -126,11 +132,14 @@ def run_llm_raw_with_tokens(prompt_path_or_text: str, overrides: dict = None, li
         "de forma precisa, sin inventar datos."
     )
 
-    reply, usage = provider.generate_text(
-        prompt=prompt_text,
-        system_prompt=system_prompt,
-        config=config_dict
-    )
+    with span("llm.generate_text", licitacion_id=None if licitacion_id == "default" else licitacion_id, motor=config_dict.get("engine"), modelo=config_dict.get("model"), accion=action) as s:
+        reply, usage = provider.generate_text(
+            prompt=prompt_text,
+            system_prompt=system_prompt,
+            config=config_dict
+        )
+        s.set("tokens_input", usage.get("input", 0))
+        s.set("tokens_output", usage.get("output", 0))
     
     _guardar_llm_raw_json(reply, tag="generic_response")
 
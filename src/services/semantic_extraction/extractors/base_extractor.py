@@ -7,6 +7,7 @@ from datetime import datetime
 
 # TODO: Implement this import
 from src.services.llm_service import run_llm_raw
+from src.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -158,7 +159,8 @@ class BaseSemanticExtractor(ABC):
         )
 
         # Prompt (llamada flexible)
-        prompt = self._call_build_prompt(context)
+        with span("extractor.build_prompt", concepto=self.concepto, context_len=len(context or "")):
+            prompt = self._call_build_prompt(context)
 
         logger.debug(
             "[SEMANTIC][%s] Prompt construido | len=%s",
@@ -180,11 +182,10 @@ class BaseSemanticExtractor(ABC):
             raw_output
         )
 
-        # Parseo
-        parsed = self.parse_output(raw_output)
-
-        # Normalización
-        result = self.normalize(parsed)
+        # Parseo (incluye la validación de schema de cada extractor) y normalización
+        with span("extractor.parse_validate", concepto=self.concepto):
+            parsed = self.parse_output(raw_output)
+            result = self.normalize(parsed)
 
         self._finished_at = datetime.utcnow()
 
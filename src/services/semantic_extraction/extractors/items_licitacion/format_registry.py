@@ -0,0 +1,319 @@
+"""
+Registro de formatos conocidos de licitación para la extracción determinística de ítems.
+
+Cada formato registra:
+- sniff(chunks) -> bool: detección barata sobre las llaves y el texto de los chunks
+- extract(chunks) -> {"items": [...], "chunks_resueltos": [...]}: extractor determinístico
+- confianza_base: qué tan confiable es el extractor cuando sus ítems vienen completos
+
+La confianza final de un formato es `confianza_base * fracción de ítems completos`
+(nombre, cantidad y unidad). El subgrafo de ítems usa esa confianza para decidir si
+omite la verificación LLM, la reduce a un prompt de validación o la ejecuta completa.
+"""
+import re
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.normalizer import normalizar_unidad
+from src.services.semantic_extraction.extractors.items_licitacion.items_licitacion_stateful_parser import (
+    ItemsLicitacionStatefulParser,
+    documento_y_pagina_desde_redis_key,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Registro global de formatos (el orden de registro define la prioridad ante empates)
+_formatos: Dict[str, Dict[str, Any]] = {}
+
+
+def register_formato(
+    nombre: str,
+    sniff: Callable[[List[Dict[str, Any]]], bool],
+    extract: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+    confianza_base: float,
+):
+    nombre = nombre.upper()
+
+    if nombre in _formatos:
+        # 🔹 Mismo extractor → no es error
+        if _formatos[nombre]["extract"] is extract:
+            return
+
+        # 🔹 Otro extractor con mismo nombre → sí es error
+        raise ValueError(
+            f"Formato distinto ya registrado con el nombre: {nombre}"
+        )
+
+    _formatos[nombre] = {
+        "sniff": sniff,
+        "extract": extract,
+        "confianza_base": confianza_base,
+    }
+
+
+def get_formatos() -> List[str]:
+    return list(_formatos.keys())
+
+
+def item_completo(item: Dict[str, Any]) -> bool:
+    unidad = item.get("unidad")
+    return (
+        bool(str(item.get("nombre_item") or "").strip())
+        and isinstance(item.get("cantidad"), (int, float))
+        and bool(unidad) and str(unidad).strip().upper() != "N/A"
+    )
+
+
+def calcular_confianza(items: List[Dict[str, Any]], confianza_base: float) -> float:
+    if not items:
+        return 0.0
+    completos = sum(1 for item in items if item_completo(item))
+    return round(confianza_base * completos / len(items), 4)
+
+
+def detectar_y_extraer(chunks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Ejecuta los extractores de los formatos cuyo sniff reconoce los chunks y retorna
+    el de mayor confianza:
+        {"formato", "confianza", "items", "chunks_resueltos"}
+    Retorna None si ningún formato extrajo ítems.
+    """
+    mejor = None
+    for nombre, formato in _formatos.items():
+        try:
+            if not formato["sniff"](chunks):
+                continue
+            resultado = formato["extract"](chunks)
+        except Exception as e:
+            logger.warning("[ITEMS_FORMATO] Error en formato %s: %s", nombre, e)
+            continue
+
+        items = resultado.get("items") or []
+        if not items:
+            continue
+
+        confianza = calcular_confianza(items, formato["confianza_base"])
+        logger.info(
+            "[ITEMS_FORMATO] Formato %s | items=%s | confianza=%s",
+            nombre, len(items), confianza
+        )
+        if mejor is None or confianza > mejor["confianza"]:
+            mejor = {
+                "formato": nombre,
+                "confianza": confianza,
+                "items": items,
+                "chunks_resueltos": resultado.get("chunks_resueltos") or [],
+            }
+    return mejor
+
+
+def _fuente(redis_key: str, parrafo: str) -> Dict[str, Any]:
+    documento, pagina = documento_y_pagina_desde_redis_key(redis_key)
+    return {
+        "documento": documento,
+        "documento_id": None,
+        "pagina": pagina,
+        "parrafo": parrafo,
+        "redis_key": redis_key,
+    }
+
+
+# ==========================================================
+# Ficha JSON de Mercado Público
+# ==========================================================
+
+def _sniff_ficha_json(chunks: List[Dict[str, Any]]) -> bool:
+    return any(".json" in (c.get("redis_key") or "").lower() for c in chunks)
+
+
+def _extract_ficha_json(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    for chunk in chunks:
+        redis_key = chunk.get("redis_key", "")
+        if ".json" not in redis_key.lower():
+            continue
+        try:
+            data = json.loads(chunk["texto"])
+        except (TypeError, ValueError) as e:
+            logger.warning("[ITEMS_FORMATO] Error parseando JSON de chunk %s: %s", redis_key, e)
+            continue
+
+        payload = data.get("payload") if isinstance(data, dict) else None
+        productos = []
+        if payload and isinstance(payload, dict):
+            productos = payload.get("productos_solicitados", [])
+        elif isinstance(data, list):
+            productos = data
+        elif isinstance(data, dict) and "productos_solicitados" in data:
+            productos = data["productos_solicitados"]
+
+        if not productos:
+            continue
+
+        items = []
+        for i, p in enumerate(productos):
+            u_code = p.get("unidad_medida") or p.get("unidad") or "N/A"
+            nombre = p.get("nombre") or p.get("nombre_producto")
+            items.append({
+                "item_key": f"json_{i+1}",
+                "nombre_item": nombre,
+                "cantidad": p.get("cantidad"),
+                "unidad": normalizar_unidad(u_code),
+                "descripcion": p.get("descripcion"),
+                "codigo_producto": p.get("codigo_producto"),
+                "fuente_resumen": "JSON Oficial (Mercado Público)",
+                "fuentes": [_fuente(redis_key, f"Producto {i+1}: {nombre}")],
+            })
+        return {"items": items, "chunks_resueltos": [redis_key]}
+
+    return {"items": []}
+
+
+# ==========================================================
+# Compra Ágil (listado "ID: N" / nombre / descripción / cantidad + unidad)
+# ==========================================================
+
+_REGEX_ID_COMPRA_AGIL = re.compile(r"^\s*ID:\s*\d+", re.MULTILINE)
+
+
+def _sniff_compra_agil(chunks: List[Dict[str, Any]]) -> bool:
+    for c in chunks:
+        texto = c.get("texto") or ""
+        if ItemsLicitacionStatefulParser.REGEX_HEADER.search(texto) or _REGEX_ID_COMPRA_AGIL.search(texto):
+            return True
+    return False
+
+
+def _extract_compra_agil(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    parser = ItemsLicitacionStatefulParser()
+    items = list(parser.parsear_chunks(chunks))
+    return {"items": items, "chunks_resueltos": parser.chunks_resueltos}
+
+
+# ==========================================================
+# Formatos con campos etiquetados (Licitación Pública, Convenio Marco)
+# ==========================================================
+
+_REGEX_CAMPO = re.compile(
+    r"^(?P<campo>cantidad|unidad(?: de medida)?|u/m|descripci[oó]n|especificaci[oó]n(?:es)?(?: t[eé]cnicas?)?"
+    r"|producto|nombre(?: del producto)?|c[oó]digo onu)\s*:\s*(?P<valor>.*)$",
+    re.IGNORECASE,
+)
+_REGEX_CANTIDAD_VALOR = re.compile(r"^(\d+(?:[.,]\d+)?)\s*(.*)$")
+
+
+def _extraer_bloques_etiquetados(
+    chunks: List[Dict[str, Any]],
+    regex_inicio: "re.Pattern",
+    prefijo_key: str,
+    fuente_resumen: str,
+) -> List[Dict[str, Any]]:
+    """
+    Recorre las líneas en orden; cada match de `regex_inicio` abre un ítem (su grupo
+    "id" se usa como item_key) y las líneas "Campo: valor" completan sus datos. Una
+    línea libre es el nombre si aún no lo hay, y si no, se agrega a la descripción.
+    """
+    items: List[Dict[str, Any]] = []
+    actual: Optional[Dict[str, Any]] = None
+
+    for chunk in chunks:
+        redis_key = chunk.get("redis_key", "N/A")
+        for linea_raw in (chunk.get("texto") or "").split("\n"):
+            linea = linea_raw.strip()
+            if not linea:
+                continue
+
+            inicio = regex_inicio.match(linea)
+            if inicio:
+                actual = {
+                    "item_key": f"{prefijo_key}_{inicio.group('id')}",
+                    "nombre_item": (inicio.groupdict().get("nombre") or "").strip() or None,
+                    "cantidad": None,
+                    "unidad": None,
+                    "descripcion": None,
+                    "especificaciones": [],
+                    "fuente_resumen": fuente_resumen,
+                    "fuentes": [_fuente(redis_key, linea)],
+                    "confianza_item": 0.85,
+                    "notas": "Pre-extraído por formato conocido",
+                }
+                items.append(actual)
+                continue
+
+            if actual is None:
+                continue
+
+            campo = _REGEX_CAMPO.match(linea)
+            if campo:
+                nombre_campo = campo.group("campo").lower()
+                valor = campo.group("valor").strip()
+                if nombre_campo == "cantidad":
+                    match_cant = _REGEX_CANTIDAD_VALOR.match(valor)
+                    if match_cant:
+                        actual["cantidad"] = float(match_cant.group(1).replace(",", "."))
+                        if match_cant.group(2) and not actual["unidad"]:
+                            actual["unidad"] = normalizar_unidad(match_cant.group(2))
+                elif nombre_campo.startswith("unidad") or nombre_campo == "u/m":
+                    actual["unidad"] = normalizar_unidad(valor) or None
+                elif nombre_campo.startswith("especificaci"):
+                    if valor:
+                        actual["especificaciones"].append(valor)
+                elif nombre_campo.startswith("descripci"):
+                    actual["descripcion"] = valor or None
+                elif nombre_campo.endswith("onu"):
+                    actual["codigo_producto"] = valor or None
+                else:
+                    actual["nombre_item"] = valor or actual["nombre_item"]
+                continue
+
+            if actual["nombre_item"] is None:
+                actual["nombre_item"] = linea
+            elif actual["descripcion"] is None:
+                actual["descripcion"] = linea
+            else:
+                actual["descripcion"] += f" {linea}"
+
+    return items
+
+
+# Licitación Pública (ficha Mercado Público): bloques "Línea N" con Código ONU, Cantidad y Unidad de medida
+_REGEX_SNIFF_LICITACION_PUBLICA = re.compile(r"c[oó]digo onu", re.IGNORECASE)
+_REGEX_INICIO_LICITACION_PUBLICA = re.compile(r"^l[ií]nea\s*(?:n[°º.]?\s*)?(?P<id>\d+)\s*[:.\-]?\s*(?P<nombre>.*)$", re.IGNORECASE)
+
+
+def _sniff_licitacion_publica(chunks: List[Dict[str, Any]]) -> bool:
+    return any(_REGEX_SNIFF_LICITACION_PUBLICA.search(c.get("texto") or "") for c in chunks)
+
+
+def _extract_licitacion_publica(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    items = _extraer_bloques_etiquetados(
+        chunks, _REGEX_INICIO_LICITACION_PUBLICA, "linea", "Ficha Licitación Pública (Mercado Público)"
+    )
+    return {"items": items}
+
+
+# Convenio Marco: bloques "ID Producto: N" (o "ID Ficha: N") con Cantidad y Unidad
+_REGEX_SNIFF_CONVENIO_MARCO = re.compile(r"convenio marco", re.IGNORECASE)
+_REGEX_INICIO_CONVENIO_MARCO = re.compile(r"^id\s*(?:de\s*)?(?:producto|ficha)\s*:?\s*(?P<id>\d+)\s*[-:]?\s*(?P<nombre>.*)$", re.IGNORECASE)
+
+
+def _sniff_convenio_marco(chunks: List[Dict[str, Any]]) -> bool:
+    return any(_REGEX_SNIFF_CONVENIO_MARCO.search(c.get("texto") or "") for c in chunks)
+
+
+def _extract_convenio_marco(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    items = _extraer_bloques_etiquetados(
+        chunks, _REGEX_INICIO_CONVENIO_MARCO, "cm", "Convenio Marco (Mercado Público)"
+    )
+    return {"items": items}
+
+
+# =========================
+# REGISTRO DE FORMATOS
+# =========================
+
+register_formato("FICHA_JSON_MERCADO_PUBLICO", _sniff_ficha_json, _extract_ficha_json, 1.0)
+register_formato("COMPRA_AGIL", _sniff_compra_agil, _extract_compra_agil, 0.9)
+register_formato("LICITACION_PUBLICA", _sniff_licitacion_publica, _extract_licitacion_publica, 0.85)
+register_formato("CONVENIO_MARCO", _sniff_convenio_marco, _extract_convenio_marco, 0.8)
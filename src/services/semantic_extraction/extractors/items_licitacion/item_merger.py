@@ -0,0 +1,177 @@
+"""
+Fusión de ítems ITEMS_LICITACION provenientes de varios lotes / shards.
+
+Un mismo ítem suele aparecer en chunks superpuestos (la página `_full` y su
+elemento `_eN` en lotes distintos). Solo se fusionan ítems de lotes distintos:
+dentro de un mismo lote cada ítem devuelto es una línea propia. Dos ítems de
+lotes distintos se consideran el mismo si ambos tienen nombre, sus números y
+tokens de talla / unidad coinciden (talla M != talla L, 3 ml != 5 ml) y:
+1. Tienen el mismo item_key y el mismo nombre normalizado (cantidades sin conflicto).
+2. Tienen el mismo nombre normalizado y la misma cantidad.
+3. Sus nombres normalizados son similares (difflib >= umbral) y la misma cantidad.
+
+Una cantidad ausente no se considera compatible con ninguna otra (rubros 2 y 3).
+
+Al fusionar se unen `fuentes`, `especificaciones`, `criterios_cumplimiento` y
+`exclusiones_o_prohibiciones`, y los campos vacíos se completan con el otro ítem.
+Un item_key repetido entre ítems distintos se conserva con sufijo _2, _3...
+"""
+import copy
+import json
+import logging
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+from src.services.homologacion.homologacion_cache import normalizar_descripcion
+
+logger = logging.getLogger(__name__)
+
+UMBRAL_SIMILITUD = 0.88
+
+
+# Tokens que distinguen variantes de un mismo producto: tallas y unidades de medida
+TOKENS_VARIANTE = {
+    "xxs", "xs", "s", "m", "l", "xl", "xxl", "xxxl",
+    "ml", "lt", "lts", "cc", "mg", "mcg", "g", "gr", "grs", "kg", "ui",
+    "mm", "cm", "mt", "mts", "pulg", "fr",
+}
+
+
+def _cantidades_iguales(a: Any, b: Any) -> bool:
+    if a is None or b is None:
+        return False
+    try:
+        return abs(float(a) - float(b)) < 1e-9
+    except (TypeError, ValueError):
+        return str(a).strip() == str(b).strip()
+
+
+def _cantidades_sin_conflicto(a: Any, b: Any) -> bool:
+    return a is None or b is None or _cantidades_iguales(a, b)
+
+
+def _tokens_variante(nombre: str) -> frozenset:
+    """
+    Números y tokens de talla / unidad del nombre normalizado ("jeringa 5 ml" -> {5, ml}).
+    """
+    tokens = set()
+    for token in nombre.split():
+        numero = re.match(r"^(\d+)([a-z]*)$", token)
+        if numero:
+            tokens.add(numero.group(1))
+            if numero.group(2):
+                tokens.add(numero.group(2))
+        elif token in TOKENS_VARIANTE:
+            tokens.add(token)
+    return frozenset(tokens)
+
+
+def _clave_valor(valor: Any) -> str:
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str)
+    return str(valor)
+
+
+def _fusionar_en(destino: Dict[str, Any], item: Dict[str, Any]) -> None:
+    for campo, valor in item.items():
+        if campo == "item_key":
+            continue
+        if isinstance(valor, list):
+            actuales = destino.get(campo) or []
+            vistos = {_clave_valor(v) for v in actuales}
+            nuevos = []
+            for v in valor:
+                clave = _clave_valor(v)
+                if clave not in vistos:
+                    vistos.add(clave)
+                    nuevos.append(v)
+            destino[campo] = actuales + nuevos
+        elif campo == "confianza_item" and isinstance(valor, (int, float)):
+            destino[campo] = max(destino.get(campo) or 0.0, valor)
+        elif destino.get(campo) in (None, "") and valor not in (None, ""):
+            destino[campo] = valor
+
+
+def _compatible(grupo: Dict[str, Any], lote: int, variante: frozenset) -> bool:
+    return bool(grupo["nombre"]) and lote not in grupo["lotes"] and grupo["variante"] == variante
+
+
+def _buscar_grupo(
+    item: Dict[str, Any],
+    nombre: str,
+    lote: int,
+    grupos: List[Dict[str, Any]],
+    por_key: Dict[str, Dict[str, Any]],
+    por_nombre: Dict[str, List[Dict[str, Any]]],
+    umbral: float,
+) -> Optional[Dict[str, Any]]:
+    if not nombre:
+        return None
+    cantidad = item.get("cantidad")
+    variante = _tokens_variante(nombre)
+
+    grupo = por_key.get(item.get("item_key"))
+    if (
+        grupo is not None and grupo["nombre"] == nombre and _compatible(grupo, lote, variante)
+        and _cantidades_sin_conflicto(grupo["item"].get("cantidad"), cantidad)
+    ):
+        return grupo
+
+    for grupo in por_nombre.get(nombre, []):
+        if _compatible(grupo, lote, variante) and _cantidades_iguales(grupo["item"].get("cantidad"), cantidad):
+            return grupo
+
+    mejor, mejor_ratio = None, umbral
+    for grupo in grupos:
+        if not _compatible(grupo, lote, variante) or not _cantidades_iguales(grupo["item"].get("cantidad"), cantidad):
+            continue
+        matcher = SequenceMatcher(None, nombre, grupo["nombre"])
+        if matcher.real_quick_ratio() < mejor_ratio or matcher.quick_ratio() < mejor_ratio:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= mejor_ratio:
+            mejor, mejor_ratio = grupo, ratio
+    return mejor
+
+
+def fusionar_items(lotes: List[List[Dict[str, Any]]], umbral_similitud: float = UMBRAL_SIMILITUD) -> List[Dict[str, Any]]:
+    """
+    Recibe los ítems agrupados por lote / shard de origen y retorna la lista
+    deduplicada (en orden de primera aparición). No modifica los ítems recibidos.
+    """
+    grupos: List[Dict[str, Any]] = []
+    por_key: Dict[str, Dict[str, Any]] = {}
+    por_nombre: Dict[str, List[Dict[str, Any]]] = {}
+    total = 0
+
+    for lote, items in enumerate(lotes or []):
+        for original in items or []:
+            if not isinstance(original, dict):
+                continue
+            total += 1
+            item = copy.deepcopy(original)
+            nombre = normalizar_descripcion(item.get("nombre_item"))
+
+            grupo = _buscar_grupo(item, nombre, lote, grupos, por_key, por_nombre, umbral_similitud)
+            if grupo is not None:
+                _fusionar_en(grupo["item"], item)
+                grupo["lotes"].add(lote)
+                continue
+
+            key = item.get("item_key")
+            if key in por_key:
+                sufijo = 2
+                while f"{key}_{sufijo}" in por_key:
+                    sufijo += 1
+                item["item_key"] = f"{key}_{sufijo}"
+
+            grupo = {"item": item, "nombre": nombre, "variante": _tokens_variante(nombre), "lotes": {lote}}
+            grupos.append(grupo)
+            por_key[item.get("item_key")] = grupo
+            por_nombre.setdefault(nombre, []).append(grupo)
+
+    fusionados = [g["item"] for g in grupos]
+    if len(fusionados) != total:
+        logger.info("[ITEMS_MERGER] %s ítems fusionados en %s", total, len(fusionados))
+    return fusionados
@@ -22,6 +22,9 @@ logger = logging.getLogger(__name__)
 
 PROMPT_VERSION = "v4"
 
+# Prompt reducido para validar ítems ya extraídos por un parser de formato conocido
+PROMPT_VALIDACION_VERSION = "validacion_v1"
+
 
 def clean_json_output(text: str) -> str:
     """
@@ -46,6 +49,10 @@ class ItemsLicitacionExtractor(BaseSemanticExtractor):
 
     concepto = "ITEMS_LICITACION"
 
+    # "completo" (extracción desde cero) o "validacion" (solo validar ITEMS_PRE_EXTRAIDOS).
+    # El subgrafo de ítems lo asigna después de instanciar.
+    modo_prompt = "completo"
+
     # ======================================================
     # Queries semánticas (NO MODIFICADAS)
     # ======================================================
@@ -86,9 +93,10 @@ class ItemsLicitacionExtractor(BaseSemanticExtractor):
 
         # Uses relative path logic now that the prompt is in standard location
         # Convention: items_licitacion/prompt_items_licitacion_v3.txt
+        version = PROMPT_VALIDACION_VERSION if self.modo_prompt == "validacion" else PROMPT_VERSION
         prompt_path = (
             f"{self.concepto.lower()}/"
-            f"prompt_{self.concepto.lower()}_{PROMPT_VERSION}.txt"
+            f"prompt_{self.concepto.lower()}_{version}.txt"
         )
 
         prompt_template = self.load_prompt(prompt_path)
@@ -1,24 +1,56 @@
 import re
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 
 logger = logging.getLogger(__name__)
 
+# doc_raw_page:<lic_int>_<file_int>_<filename>:p<page>... | legacy pdf:<doc>:chunk:<n>
+REGEX_REDIS_KEY_PAGINA = re.compile(r"doc_raw_page:\d+_\d+_(.+?):p(\d+)")
+REGEX_REDIS_KEY_LEGACY = re.compile(r"pdf:([^:]+):chunk:(\d+)")
+
+
+def documento_y_pagina_desde_redis_key(redis_key: str) -> Tuple[str, int]:
+    """
+    Obtiene (nombre_documento, numero_pagina) desde la llave Redis del chunk.
+    """
+    match = REGEX_REDIS_KEY_PAGINA.search(redis_key or "")
+    if not match:
+        match = REGEX_REDIS_KEY_LEGACY.search(redis_key or "")
+    if match:
+        return match.group(1), int(match.group(2))
+    return "Documento", 1
+
+
 class ItemsLicitacionStatefulParser:
     """
     Parser determinístico (stateful) para extraer ítems de licitaciones (ej. Compra Ágil)
     basado en un flujo secuencial a través de las páginas.
     """
+
+    HEADERS_ITEMS = ("Listado de productos solicitados", "Productos Solicitados", "Descripción de los bienes", "Ítems de la licitación")
+
+    # Clasificador de línea precompilado una vez por clase:
+    # - encabezado de sección: una sola alternación buscada en cualquier posición de la línea
+    # - ID o cantidad + unidad: una sola alternación anclada al inicio (match)
+    # Prioridad: encabezado > ID > cantidad + unidad.
+    REGEX_HEADER = re.compile("|".join(re.escape(h) for h in HEADERS_ITEMS))
+    REGEX_LINEA = re.compile(
+        r"ID:\s*(?P<id>\d+)"
+        r"|(?i:(?P<cantidad>\d+(?:[.,]\d+)?)\s+(?P<unidad>[A-Za-z]+.*)$)"
+    )
     
     def __init__(self):
         self.items: List[Dict[str, Any]] = []
         self.item_actual: Optional[Dict[str, Any]] = None
         self.en_seccion_relevante = False
+        # redis_keys de chunks cuyo contenido quedo completamente cubierto por ítems cerrados
+        self.chunks_resueltos: List[str] = []
         
     def reset(self):
         self.items = []
         self.item_actual = None
         self.en_seccion_relevante = False
+        self.chunks_resueltos = []
 
     def _crear_item_vacio(self) -> Dict[str, Any]:
         return {
@@ -44,6 +76,9 @@ class ItemsLicitacionStatefulParser:
         # y lo aplana preservando los saltos de línea físicos.
         import json
         try:
+            # Solo un arreglo JSON se aplana; cualquier otro texto evita el json.loads
+            if not texto.lstrip().startswith("["):
+                raise ValueError("no es un arreglo JSON")
             data = json.loads(texto)
             if isinstance(data, list):
                 lineas = []
@@ -62,16 +97,46 @@ class ItemsLicitacionStatefulParser:
         texto_limpio = texto.replace('\\n', '\n')
         return texto_limpio
 
-    def parsear_texto(self, texto: str, documento_nombre: str = "Documento", pagina_num: int = 1) -> List[Dict[str, Any]]:
+    def parsear_texto(self, texto: str, documento_nombre: str = "Documento", pagina_num: int = 1, redis_key: str = "N/A") -> List[Dict[str, Any]]:
         """
         Recibe texto concatenado (idealmente página por página) y extrae ítems usando buffer de estado.
         """
+        for item in self._procesar_texto(texto, documento_nombre, pagina_num, redis_key):
+            self.items.append(item)
+        return self.items
+
+    def parsear_chunks(self, chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Versión streaming: consume los chunks ya ordenados (archivo -> página) uno a uno
+        y entrega cada ítem apenas se cierra, con el documento, la página y la redis_key
+        reales en sus fuentes. Los ítems entregados no se acumulan en `self.items`.
+
+        Un chunk queda en `self.chunks_resueltos` si todas sus líneas pertenecieron a la
+        sección de ítems, cerró al menos un ítem y no dejó un ítem abierto.
+        """
+        for chunk in chunks:
+            redis_key = chunk.get("redis_key", "N/A")
+            documento_nombre, pagina_num = documento_y_pagina_desde_redis_key(redis_key)
+            estado = {"lineas_fuera_de_seccion": 0}
+            cerrados = 0
+            for item in self._procesar_texto(chunk.get("texto", ""), documento_nombre, pagina_num, redis_key, estado):
+                cerrados += 1
+                yield item
+            if cerrados and self.item_actual is None and not estado["lineas_fuera_de_seccion"]:
+                self.chunks_resueltos.append(redis_key)
+
+    def _procesar_texto(
+        self,
+        texto: str,
+        documento_nombre: str,
+        pagina_num: int,
+        redis_key: str,
+        estado: Optional[Dict[str, int]] = None
+    ) -> Iterator[Dict[str, Any]]:
         texto_procesado = self._aplanar_json_texto(texto)
         lineas = texto_procesado.split('\n')
-        
-        # Regex utiles
-        regex_id = re.compile(r"^ID:\s*(\d+)")
-        regex_cantidad = re.compile(r"^(\d+(?:[.,]\d+)?)\s+([A-Za-z]+.*)$", re.IGNORECASE)
+        buscar_header = self.REGEX_HEADER.search
+        clasificar_linea = self.REGEX_LINEA.match
         
         for linea_raw in lineas:
             linea = self._limpiar_linea(linea_raw)
@@ -79,12 +144,12 @@ class ItemsLicitacionStatefulParser:
                 continue
 
             # Detectar inicio de sección útil (Específico para formatos conocidos como Compra Ágil)
-            headers_items = ["Listado de productos solicitados", "Productos Solicitados", "Descripción de los bienes", "Ítems de la licitación"]
-            if any(h in linea for h in headers_items):
+            if buscar_header(linea):
                 self.en_seccion_relevante = True
                 continue
 
-            match_id = regex_id.search(linea)
+            clasificacion = clasificar_linea(linea)
+            match_id = clasificacion if clasificacion and clasificacion.group("id") else None
 
             if not self.en_seccion_relevante:
                 # Fallback: Si vemos un ID claro, forzamos la entrada a la sección relevante
@@ -92,6 +157,8 @@ class ItemsLicitacionStatefulParser:
                 if match_id:
                     self.en_seccion_relevante = True
                 else:
+                    if estado is not None:
+                        estado["lineas_fuera_de_seccion"] += 1
                     continue
 
             if self.item_actual is None:
@@ -99,29 +166,30 @@ class ItemsLicitacionStatefulParser:
 
             # Lógica heurística:
             # 1. ¿Es una línea de ID?
-            match_id = regex_id.search(linea)
             if match_id:
-                self.item_actual["item_key"] = f"item_{match_id.group(1)}"
+                self.item_actual["item_key"] = f"item_{match_id.group('id')}"
                 continue
 
             # 2. ¿Es cantidad y unidad? (marca el cierre del ítem actual)
-            match_cant = regex_cantidad.search(linea)
+            match_cant = clasificacion if clasificacion and clasificacion.group("cantidad") else None
             # Evitar matches falsos si la línea es muy larga (Suele ser una descripción)
             if match_cant and len(linea) < 30 and self.item_actual["item_key"] is not None:
-                self.item_actual["cantidad"] = float(match_cant.group(1).replace(',', '.'))
-                self.item_actual["unidad"] = match_cant.group(2).strip()
+                self.item_actual["cantidad"] = float(match_cant.group("cantidad").replace(',', '.'))
+                self.item_actual["unidad"] = match_cant.group("unidad").strip()
                 
                 # Guardar el origen
                 self.item_actual["fuentes"].append({
                     "documento": documento_nombre,
+                    "documento_id": None,
                     "pagina": pagina_num,
                     "parrafo": f"ID={self.item_actual['item_key']} | Desc={self.item_actual['nombre_item']} | Cant={linea}",
-                    "redis_key": "N/A" # Lo llenará el LLM o lo ignoramos
+                    "redis_key": redis_key
                 })
                 
                 # Cerrar ítem
-                self.items.append(self.item_actual)
+                item_cerrado = self.item_actual
                 self.item_actual = None
+                yield item_cerrado
                 continue
 
             # 3. Categoría (precede al ID)
@@ -145,8 +213,6 @@ class ItemsLicitacionStatefulParser:
 
         # Si un ítem quedó abierto, se mantiene en self.item_actual
         # Al pasarle el texto de la siguiente página, continuará completándolo
-        
-        return self.items
 
     def obtener_items_cerrados(self) -> List[Dict[str, Any]]:
         return self.items
@@ -0,0 +1,119 @@
+"""
+Fingerprint por concepto para re-extracción incremental.
+
+El fingerprint resume todo lo que determina el resultado de un concepto:
+- hash del contenido de cada chunk recuperado (redis_key + texto)
+- versión de prompt del extractor y hash de sus plantillas de prompt
+- versión del extractor y modelo LLM
+
+Se guarda en `semantic_runs.fingerprint` (ver semantic_runs_fingerprint.sql). Si el
+run vigente de un concepto tiene el mismo fingerprint, se reutiliza su
+`semantic_results` en vez de volver a llamar al LLM.
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Subir cuando cambie la lógica de extracción de forma que invalide resultados previos
+FINGERPRINT_VERSION = "1"
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+_columna_disponible: Optional[bool] = None
+
+
+def _hash_prompts(concepto: str) -> str:
+    """
+    Hash de todas las plantillas de prompt del concepto (cualquier edición invalida).
+    """
+    h = hashlib.sha1()
+    carpeta = os.path.join(PROMPTS_DIR, concepto.lower())
+    if os.path.isdir(carpeta):
+        for nombre in sorted(os.listdir(carpeta)):
+            ruta = os.path.join(carpeta, nombre)
+            if os.path.isfile(ruta):
+                h.update(nombre.encode("utf-8"))
+                with open(ruta, "rb") as f:
+                    h.update(f.read())
+    return h.hexdigest()
+
+
+def version_prompt(extractor) -> Optional[str]:
+    """
+    prompt_version asignado por el runner o, si no hay, PROMPT_VERSION del módulo del extractor.
+    """
+    modulo = sys.modules.get(type(extractor).__module__)
+    return getattr(extractor, "prompt_version", None) or getattr(modulo, "PROMPT_VERSION", None)
+
+
+def calcular_fingerprint(
+    concepto: str,
+    chunks: List[Dict[str, Any]],
+    prompt_version: Optional[str],
+    extractor_version: Optional[str],
+    modelo: str,
+) -> str:
+    contenido = sorted(
+        (c["redis_key"], hashlib.sha1((c.get("texto") or "").encode("utf-8")).hexdigest())
+        for c in chunks
+    )
+    payload = {
+        "fingerprint_version": FINGERPRINT_VERSION,
+        "concepto": concepto,
+        "prompt_version": prompt_version,
+        "prompts": _hash_prompts(concepto),
+        "extractor_version": extractor_version,
+        "modelo": modelo,
+        "chunks": contenido,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def columna_fingerprint_disponible(cur) -> bool:
+    """
+    True si la migración de `semantic_runs.fingerprint` ya fue aplicada (se consulta una vez).
+    """
+    global _columna_disponible
+    if _columna_disponible is None:
+        cur.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'semantic_runs' AND column_name = 'fingerprint'
+        """)
+        _columna_disponible = cur.fetchone() is not None
+        if not _columna_disponible:
+            logger.warning("[FINGERPRINT] semantic_runs.fingerprint no existe; re-extracción incremental deshabilitada")
+    return _columna_disponible
+
+
+def buscar_resultado_vigente(conn, licitacion_id: str, concepto: str, fingerprint: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Retorna (semantic_run_id, resultado_json) del run vigente del concepto si su
+    fingerprint coincide; None en caso contrario.
+    """
+    with conn.cursor() as cur:
+        if not columna_fingerprint_disponible(cur):
+            return None
+        cur.execute("""
+            SELECT sr.id, res.resultado_json
+            FROM semantic_runs sr
+            JOIN semantic_results res ON res.semantic_run_id = sr.id
+            WHERE sr.licitacion_id = %s AND sr.concepto = %s AND sr.is_current = true AND sr.fingerprint = %s
+            LIMIT 1
+        """, (licitacion_id, concepto, fingerprint))
+        fila = cur.fetchone()
+    if not fila:
+        return None
+    resultado = fila[1]
+    if isinstance(resultado, str):
+        resultado = json.loads(resultado)
+    return str(fila[0]), resultado
+
+
+def registrar_fingerprint(cur, semantic_run_id: str, fingerprint: Optional[str]) -> None:
+    if fingerprint and columna_fingerprint_disponible(cur):
+        cur.execute("UPDATE semantic_runs SET fingerprint = %s WHERE id = %s", (fingerprint, semantic_run_id))
@@ -0,0 +1,368 @@
+"""
+Índice en memoria de los chunks de los documentos de una licitación.
+
+Carga en dos fases:
+1. Al cargar los documentos solo se trae el campo del vector de cada chunk (HMGET
+   `vector`/`embedding`) y se arma una matriz float32 (n_chunks x dim) por documento.
+2. El texto (`text`/`texto`) se trae recién para los chunks que quedan en el top-k
+   de alguna búsqueda, y se conserva para las búsquedas siguientes del mismo índice.
+
+Con top_k de 15-30 sobre miles de chunks, la mayor parte del texto nunca viaja
+desde Redis ni ocupa memoria del worker.
+
+Las matrices (con los textos ya traídos) se guardan en un cache LRU del proceso,
+acotado por bytes (DOC_CACHE_MAX_MB), validado contra la versión del documento
+`doc_version:{doc_id}` que escribe run_embedding_batch: reintentos y trabajos
+siguientes de la misma licitación no vuelven a cargar el documento desde Redis.
+Documentos sin versión se cargan siempre desde Redis (quien escriba chunks debe
+llamar a `marcar_version_documento` para que sean cacheables).
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src import config
+from src.utils.logging_config import muestreo
+from src.utils.redis_client import pipeline_hmget
+from src.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Patrones de claves por documento: "doc_raw_page:{doc_id}..." (páginas y elementos) y legacy
+PATRONES_CLAVES = (
+    "doc_raw_page:{doc_id}*",  # Match amplio para capturar suffix como ':p1_full' o '_page1'
+    "pdf:{doc_id}:chunk:*",
+)
+CAMPOS_VECTOR = ("vector", "embedding")
+CAMPOS_TEXTO = ("text", "texto")
+CLAVE_VERSION = "doc_version:{doc_id}"
+
+# Los textos hidratados viven en la MatrizDocumento, compartida entre índices vía el cache
+_textos_lock = threading.Lock()
+
+
+def _a_str(valor) -> str:
+    return valor.decode() if isinstance(valor, bytes) else valor
+
+
+def _primer_valor(valores: Sequence[Any]) -> Any:
+    return next((v for v in valores if v), None)
+
+
+class MatrizDocumento:
+    """
+    Vectores de los chunks de un documento: `claves[i]` corresponde a la fila `matriz[i]`.
+    `textos` acumula el texto de los chunks que ya se trajeron de Redis.
+    """
+    __slots__ = ("doc_id", "claves", "matriz", "textos")
+
+    def __init__(self, doc_id: str, claves: List[str], matriz: np.ndarray):
+        self.doc_id = doc_id
+        self.claves = claves
+        self.matriz = matriz
+        self.textos: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    @property
+    def nbytes(self) -> int:
+        """Tamaño aproximado: matriz + claves + textos hidratados."""
+        with _textos_lock:
+            largo_textos = sum(len(t) for t in self.textos.values())
+        return int(self.matriz.nbytes) + sum(len(c) for c in self.claves) + largo_textos
+
+
+def cargar_matriz_documento(cliente, doc_id: str) -> MatrizDocumento:
+    """
+    Fase 1: trae solo los vectores de los chunks del documento.
+    Se descartan los chunks sin vector, con JSON inválido o con dimensión distinta a la del primero.
+    """
+    claves: List[str] = []
+    vectores: List[np.ndarray] = []
+    for patron in PATRONES_CLAVES:
+        patron = patron.format(doc_id=doc_id)
+        # KEYS directo: el patrón es restrictivo y SCAN agrega round-trips por red
+        encontradas = [_a_str(k) for k in cliente.keys(patron)]
+        if not encontradas:
+            continue
+        for clave, valores in zip(encontradas, pipeline_hmget(cliente, encontradas, CAMPOS_VECTOR)):
+            crudo = _primer_valor(valores)
+            if not crudo:
+                continue
+            try:
+                vector = np.asarray(json.loads(_a_str(crudo)), dtype=np.float32)
+            except (ValueError, TypeError) as e:
+                logger.warning("[⚠️] Vector inválido en la clave %s: %s", clave, e, extra=muestreo())
+                continue
+            if vector.ndim != 1 or not vector.size:
+                continue
+            if vectores and vector.shape != vectores[0].shape:
+                logger.warning("[⚠️] Dimensión %s distinta de %s en la clave %s", vector.size, vectores[0].size, clave, extra=muestreo())
+                continue
+            claves.append(clave)
+            vectores.append(vector)
+        logger.debug("[CACHE] Encontrados %s chunks con patrón: %s", len(encontradas), patron)
+
+    matriz = np.vstack(vectores) if vectores else np.empty((0, 0), dtype=np.float32)
+    return MatrizDocumento(doc_id, claves, matriz)
+
+
+class IndiceChunks:
+    """
+    Matriz de vectores de varios documentos + textos hidratados bajo demanda.
+    Thread-safe para búsquedas concurrentes sobre el mismo índice.
+    """
+
+    def __init__(self, cliente, documentos: Sequence[MatrizDocumento]):
+        self._cliente = cliente
+        # Documento dueño de cada clave (ahí se guarda su texto)
+        self._documento: Dict[str, MatrizDocumento] = {}
+
+        self.claves: List[str] = []
+        filas: List[np.ndarray] = []
+        vistas = set()
+        for documento in documentos:
+            if not len(documento):
+                continue
+            if filas and documento.matriz.shape[1] != filas[0].shape[1]:
+                logger.warning("[⚠️] Documento %s con dimensión de embedding distinta, se omite", documento.doc_id)
+                continue
+            # Un mismo chunk puede aparecer en dos documentos (doc_id prefijo de otro)
+            nuevas = [i for i, c in enumerate(documento.claves) if c not in vistas]
+            vistas.update(documento.claves)
+            for i in nuevas:
+                self._documento[documento.claves[i]] = documento
+            if len(nuevas) == len(documento):
+                filas.append(documento.matriz)
+                self.claves.extend(documento.claves)
+            elif nuevas:
+                filas.append(documento.matriz[nuevas])
+                self.claves.extend(documento.claves[i] for i in nuevas)
+        if len(filas) == 1:
+            # Un solo documento: se usa su matriz sin copiarla (puede estar en el cache)
+            self.matriz = filas[0]
+        else:
+            self.matriz = np.vstack(filas) if filas else np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matriz.nbytes)
+
+    def textos(self, claves: Sequence[str]) -> Dict[str, str]:
+        """
+        Fase 2: texto de las claves pedidas; solo va a Redis por las que no se trajeron antes.
+        """
+        with _textos_lock:
+            faltantes = [c for c in claves if c not in self._documento[c].textos]
+        if faltantes:
+            with span("redis.hidratar_textos", chunks=len(faltantes)):
+                valores = pipeline_hmget(self._cliente, faltantes, CAMPOS_TEXTO)
+            with _textos_lock:
+                for clave, campos in zip(faltantes, valores):
+                    self._documento[clave].textos[clave] = _a_str(_primer_valor(campos) or "")
+        with _textos_lock:
+            return {c: self._documento[c].textos[c] for c in claves}
+
+    def buscar(self, q_vec: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """
+        Los `top_k` chunks más cercanos (distancia euclidiana) que tienen texto, ordenados
+        por distancia. Los chunks sin texto se saltan y se reemplazan por los siguientes.
+        """
+        if not len(self) or top_k <= 0:
+            return []
+        distancias = np.linalg.norm(self.matriz - q_vec, axis=1)
+        orden = np.argsort(distancias, kind="stable")
+
+        resultados: List[Dict[str, Any]] = []
+        posicion = 0
+        while len(resultados) < top_k and posicion < len(orden):
+            lote = orden[posicion:posicion + top_k - len(resultados)]
+            posicion += len(lote)
+            textos = self.textos([self.claves[i] for i in lote])
+            for i in lote:
+                clave = self.claves[i]
+                if textos[clave]:
+                    resultados.append({
+                        "redis_key": clave,
+                        "texto": textos[clave],
+                        "distancia": float(distancias[i]),
+                    })
+        return resultados
+
+
+class CacheMatrices:
+    """
+    LRU de MatrizDocumento por doc_id, acotado por bytes. Cada entrada guarda la versión
+    del documento con la que se cargó; si la versión actual difiere, la entrada se descarta.
+    Cargas concurrentes del mismo documento (conceptos en paralelo) esperan a la primera.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entradas: "OrderedDict[str, Tuple[str, MatrizDocumento]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._cargas: Dict[str, threading.Lock] = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidadas = 0
+        self.expulsiones = 0
+
+    def _buscar(self, doc_id: str, version: str) -> Optional[MatrizDocumento]:
+        with self._lock:
+            entrada = self._entradas.get(doc_id)
+            if entrada is None:
+                return None
+            if entrada[0] != version:
+                del self._entradas[doc_id]
+                self.invalidadas += 1
+                invalidada = True
+            else:
+                self._entradas.move_to_end(doc_id)
+                return entrada[1]
+        if invalidada:
+            _registrar_metricas(invalidadas=1)
+        return None
+
+    def obtener_o_cargar(self, doc_id: str, version: str, cargar: Callable[[], MatrizDocumento]) -> MatrizDocumento:
+        matriz = self._buscar(doc_id, version)
+        if matriz is None:
+            with self._lock:
+                lock_carga = self._cargas.setdefault(doc_id, threading.Lock())
+            with lock_carga:
+                # Otro hilo pudo terminar de cargarlo mientras se esperaba
+                matriz = self._buscar(doc_id, version)
+                if matriz is None:
+                    matriz = cargar()
+                    self._guardar(doc_id, version, matriz)
+                    resultado = "miss"
+                else:
+                    resultado = "hit"
+        else:
+            resultado = "hit"
+        with self._lock:
+            if resultado == "hit":
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+        _registrar_metricas(resultado)
+        return matriz
+
+    def _guardar(self, doc_id: str, version: str, matriz: MatrizDocumento) -> None:
+        if matriz.nbytes > self.max_bytes:
+            logger.debug("[CACHE] Documento %s (%s bytes) excede DOC_CACHE_MAX_MB, no se cachea", doc_id, matriz.nbytes)
+            return
+        with self._lock:
+            self._entradas[doc_id] = (version, matriz)
+            self._entradas.move_to_end(doc_id)
+        self.recortar()
+
+    def recortar(self) -> None:
+        """
+        Expulsa los menos usados hasta quedar bajo max_bytes (los textos hidratados
+        hacen crecer las entradas después de guardarlas, por eso se llama en cada carga).
+        """
+        expulsadas = 0
+        with self._lock:
+            tamanos = {doc_id: m.nbytes for doc_id, (_, m) in self._entradas.items()}
+            total = sum(tamanos.values())
+            while total > self.max_bytes and self._entradas:
+                doc_id, _ = self._entradas.popitem(last=False)
+                total -= tamanos[doc_id]
+                expulsadas += 1
+            self.expulsiones += expulsadas
+        _registrar_metricas(expulsiones=expulsadas, bytes_en_uso=total)
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            matrices = [m for _, m in self._entradas.values()]
+            estadisticas = {
+                "entradas": len(matrices),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "invalidadas": self.invalidadas,
+                "expulsiones": self.expulsiones,
+            }
+        estadisticas["bytes"] = sum(m.nbytes for m in matrices)
+        return estadisticas
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+        _registrar_metricas(bytes_en_uso=0)
+
+
+def _registrar_metricas(
+    resultado: Optional[str] = None, invalidadas: int = 0, expulsiones: int = 0, bytes_en_uso: Optional[int] = None
+) -> None:
+    from src.utils.prometheus_metrics import registrar_cache_documentos
+    registrar_cache_documentos(resultado, invalidadas, expulsiones, bytes_en_uso)
+
+
+_cache: Optional[CacheMatrices] = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache() -> Optional[CacheMatrices]:
+    """
+    Cache de matrices del proceso (None con DOC_CACHE_MAX_MB=0).
+    """
+    global _cache
+    if config.DOC_CACHE_MAX_MB <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheMatrices(int(config.DOC_CACHE_MAX_MB * 1024 * 1024))
+        return _cache
+
+
+def version_documento(cliente, doc_id: str) -> Optional[str]:
+    """
+    Versión vigente de lo que cubre `doc_id`. Igual que PATRONES_CLAVES, el doc_id puede
+    ser un prefijo (los nodos pasan "{lic}_{archivo}" y las claves son
+    "doc_raw_page:{lic}_{archivo}_{nombre}:..."), así que combina todas las
+    doc_version:{doc_id}*. None si no hay ninguna (documento no cacheable).
+    """
+    claves = sorted(_a_str(k) for k in cliente.keys(CLAVE_VERSION.format(doc_id=doc_id) + "*"))
+    if not claves:
+        return None
+    valores = cliente.mget(claves)
+    if not all(valores):
+        return None
+    return ";".join(f"{clave}={_a_str(valor)}" for clave, valor in zip(claves, valores))
+
+
+def marcar_version_documento(cliente, doc_id: str) -> str:
+    """
+    Registra una nueva versión del documento; llamar después de (re)escribir sus chunks.
+    """
+    import uuid
+    version = uuid.uuid4().hex
+    cliente.set(CLAVE_VERSION.format(doc_id=doc_id), version)
+    return version
+
+
+def cargar_indice(cliente, documento_ids: Sequence[str]) -> IndiceChunks:
+    cache = obtener_cache()
+    if cache is None or not documento_ids:
+        return IndiceChunks(cliente, [cargar_matriz_documento(cliente, doc_id) for doc_id in documento_ids])
+
+    # La versión se lee ANTES de cargar: si el documento cambia durante la carga, la
+    # entrada queda con la versión vieja y el próximo trabajo la descarta
+    documentos = []
+    for doc_id in documento_ids:
+        version = version_documento(cliente, doc_id)
+        if version is None:
+            _registrar_metricas("sin_version")
+            documentos.append(cargar_matriz_documento(cliente, doc_id))
+        else:
+            documentos.append(cache.obtener_o_cargar(doc_id, version, lambda: cargar_matriz_documento(cliente, doc_id)))
+    cache.recortar()
+    return IndiceChunks(cliente, documentos)
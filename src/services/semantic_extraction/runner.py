@@ -1,19 +1,22 @@
 
+import logging
 import json
 import os
-import traceback
 from datetime import datetime
 from typing import Any, Dict, List
 from urllib.parse import urlparse
 import re
 
 import psycopg2
-import redis
 
 # Adapted imports
-from src.config import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, REDIS_USERNAME
 from src.services.embedding_service import generar_embedding
 from src.services.semantic_extraction.registry import get_extractor
+from src.utils.tracing import span, trazar
+from src.utils.redis_client import get_redis_client
+from src.services.semantic_extraction.indice_chunks import IndiceChunks, cargar_indice
+
+logger = logging.getLogger(__name__)
 
 # MODO_DEBUG = True
 MODO_DEBUG = os.getenv("MODO_DEBUG", "False").lower() == "true"
@@ -24,19 +27,9 @@ def _json_serial(obj):
         return obj.isoformat()
     raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-# Redis configuration adapted to src/config.py variables
-# The original code used a REDIS_URL, but our config uses individual fields.
-# We will reconstruct connection here or use the utils.redis_client if preferred.
-# For now, to keep it similar to the original, I'll instantiate it here.
-
-redis_client = redis.Redis(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    username=REDIS_USERNAME,
-    password=REDIS_PASSWORD,
-    db=REDIS_DB,
-    decode_responses=False # Original code used bytes for some operations
-)
+def _get_redis_client():
+    # Cliente compartido en bytes: los hashes de chunks guardan el vector como JSON crudo
+    return get_redis_client(decode_responses=False)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -46,84 +39,23 @@ def _get_pg_conn():
         raise RuntimeError("DATABASE_URL no está definido en el entorno")
     return psycopg2.connect(DATABASE_URL)
 
-def load_documents_to_memory(documento_ids: List[str]) -> List[Dict[str, Any]]:
+@trazar("redis.load_documents_to_memory")
+def load_documents_to_memory(documento_ids: List[str]) -> IndiceChunks:
     """
-    Carga TODOS los chunks de los documentos solicitados en memoria RAM.
-    Optimización: Evita ir a Redis por cada query.
+    Carga en memoria los vectores de TODOS los chunks de los documentos solicitados.
+    Optimización: Evita ir a Redis por cada query. El texto de cada chunk se trae
+    recién cuando aparece en el top-k de una búsqueda (ver indice_chunks.py).
     """
-    import numpy as np
-    cached_chunks = []
-    print(f"[CACHE] Cargando documentos en memoria: {documento_ids}")
-    
-    for doc_id in documento_ids:
-        # Intentar patrón 1: "doc_raw_page:{doc_id}:*_full" (Legacy / Semantic Loader)
-        patterns = [
-            f"doc_raw_page:{doc_id}*", # Match más amplio para capturar suffix como ':p1_full' o '_page1'
-            f"pdf:{doc_id}:chunk:*"  # Pattern legacy
-        ]
-        
-        found_any = False
-        for pattern in patterns:
-            # En lugar de scan_iter (que puede ser muy lento por red en bases grandes),
-            # intentamos un keys directo si el patrón es muy restrictivo
-            keys = redis_client.keys(pattern)
-            if not keys:
-                continue
-                
-            found_any = True
-            
-            # Usar pipeline para traer todos los hgetall de golpe
-            pipe = redis_client.pipeline()
-            # Convert bytes to string if keys are bytes
-            decoded_keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
-            
-            for key in decoded_keys:
-                pipe.hgetall(key)
-                
-            resultados_pipe = pipe.execute()
-            
-            for key, data in zip(decoded_keys, resultados_pipe):
-                if not data:
-                    continue
-                try:
-                    emb_bytes = data.get(b"vector") or data.get(b"embedding") or b"[]"
-                    texto_bytes = data.get(b"text") or data.get(b"texto") or b""
-                    
-                    if not emb_bytes or not texto_bytes:
-                        continue
-
-                    # Manejo de JSON string vs raw bytes
-                    if isinstance(emb_bytes, bytes):
-                        emb_str = emb_bytes.decode()
-                    else:
-                        emb_str = emb_bytes
-                        
-                    if isinstance(texto_bytes, bytes):
-                        texto_str = texto_bytes.decode()
-                    else:
-                        texto_str = texto_bytes
-
-                    emb = json.loads(emb_str)
-                    
-                    cached_chunks.append({
-                        "redis_key": key,
-                        "texto": texto_str,
-                        "embedding": np.array(emb, dtype=np.float32)
-                    })
-                except Exception as e:
-                    print(f"[⚠️] Error procesando pipeline Redis para la clave {key}: {e}")
-                    continue
-            
-            if found_any:
-                print(f"[CACHE] Encontrados {len(decoded_keys)} chunks con patrón: {pattern}")
-    
-    print(f"[CACHE] Total chunks cargados en RAM: {len(cached_chunks)}")
-    return cached_chunks
+    logger.info("[CACHE] Cargando documentos en memoria: %s", documento_ids)
+    indice = cargar_indice(_get_redis_client(), documento_ids)
+    logger.info("[CACHE] Total chunks cargados en RAM: %s (%.1f MiB de vectores)", len(indice), indice.nbytes / (1024 * 1024))
+    return indice
 
-def semantic_search_in_memory(query: str, cached_chunks: List[Dict[str, Any]], top_k: int, min_score: float) -> List[Dict[str, Any]]:
+@trazar("busqueda.semantic_search_in_memory")
+def semantic_search_in_memory(query: str, cached_chunks: IndiceChunks, top_k: int, min_score: float) -> List[Dict[str, Any]]:
     import numpy as np
 
-    print(f"[magnifier] Generando embedding para query: {query}")
+    logger.debug("[magnifier] Generando embedding para query: %s", query)
     vector = generar_embedding(query, model=MODEL_EMBEDDING)
     if not vector:
         return []
@@ -132,32 +64,15 @@ def semantic_search_in_memory(query: str, cached_chunks: List[Dict[str, Any]], t
         return []
 
     q_vec = np.array(vector, dtype=np.float32)
-    
-    resultados = []
-    # Vectorización podría ser aún más rápida con matrices, pero este loop simple en memoria ya es 100x más rápido que Redis roundtrip
-    for chunk in cached_chunks:
-        # Calcular distancia ecludiana (o coseno si estuvieran normalizados, asumimos ecludiana por el código anterior)
-        dist = float(np.linalg.norm(q_vec - chunk["embedding"]))
-        
-        # Guardamos todo y filtramos por top_k después
-        resultados.append({
-            "redis_key": chunk["redis_key"],
-            "texto": chunk["texto"],
-            "distancia": dist,
-        })
-
-    resultados.sort(key=lambda x: x["distancia"])
-    
-    # Filtrado post-sort si fuera necesario, pero el top_k manda.
-    finales = resultados[:top_k]
-    
-    print(f"[magnifier] Resultados en memoria para '{query}': {len(finales)} (Mejor dist={finales[0]['distancia'] if finales else 'N/A'})")
 
-    for i, r in enumerate(finales):
-        pass # Silenciar log verbose por cada query para ganar velocidad, o dejarlo si se requiere debug
+    # Distancia euclidiana contra toda la matriz de una vez; el texto solo se trae para el top_k
+    finales = cached_chunks.buscar(q_vec, top_k)
+    
+    logger.debug("[magnifier] Resultados en memoria para '%s': %s (Mejor dist=%s)", query, len(finales), finales[0]['distancia'] if finales else 'N/A')
 
     return finales
 
+@trazar("contexto.build_context")
 def build_context(chunks: List[Dict[str, Any]]) -> str:
     bloques = []
     import re
@@ -197,8 +112,9 @@ def _guardar_json_en_disco(nombre_licitacion: str, concepto: str, result: dict):
     path_completo = os.path.join(base_dir, nombre_archivo)
     with open(path_completo, "w", encoding="utf-8") as f:
         json.dump(result, f, indent=2, ensure_ascii=False, default=_json_serial)
-    print(f"[📁] Resultado guardado en: {path_completo}")
+    logger.info("[📁] Resultado guardado en: %s", path_completo)
 
+@trazar("semantic.run_semantic_extraction")
 def run_semantic_extraction(
     *,
     licitacion_id: str,
@@ -209,9 +125,10 @@ def run_semantic_extraction(
     min_score: float = 0.25,
     prompt_version: str | None = None,
     extractor_version: str | None = None,
+    force: bool = False,
 ) -> Dict[str, Any]:
 
-    print(f"[SEMANTIC] Ejecutando extractor semantico: {concepto}")
+    logger.info("[SEMANTIC] Ejecutando extractor semantico: %s", concepto)
     extractor_cls = get_extractor(concepto)
     extractor = extractor_cls(licitacion_id=licitacion_id)
     extractor.prompt_version = prompt_version
@@ -220,7 +137,7 @@ def run_semantic_extraction(
     # --- OPTIMIZACIÓN: Cargar cache una sola vez ---
     cached_chunks = load_documents_to_memory(documento_ids)
     if not cached_chunks:
-         print(f"[SEMANTIC] ⚠️ No se cargaron chunks en memoria. Posiblemente doc_id incorrecto o vacío.")
+         logger.warning("[SEMANTIC] ⚠️ No se cargaron chunks en memoria. Posiblemente doc_id incorrecto o vacío.")
 
     semantic_chunks = []
     queries = extractor._call_build_queries()
@@ -232,7 +149,7 @@ def run_semantic_extraction(
 
     if not semantic_chunks:
         # Fallback o error warning, pero no romper si no hay matches exactos
-        print("[SEMANTIC] No se encontraron fragmentos relevantes (o cache vacia). continuando con contexto vacio.")
+        logger.info("[SEMANTIC] No se encontraron fragmentos relevantes (o cache vacia). continuando con contexto vacio.")
         # raise RuntimeError("No se encontraron fragmentos relevantes en Redis")
 
     # DEDUPLICAR CHUNKS para evitar enviar filas repetidas múltiples veces
@@ -244,6 +161,40 @@ def run_semantic_extraction(
             unique_chunks_dict[k] = c
     semantic_chunks = list(unique_chunks_dict.values())
 
+    # --- RE-EXTRACCIÓN INCREMENTAL: reutilizar el run vigente si la evidencia no cambió ---
+    fingerprint = None
+    if not MODO_DEBUG:
+        from src.services.llm_service import configuracion_llm_por_defecto
+        from src.services.semantic_extraction.fingerprint import calcular_fingerprint, version_prompt, buscar_resultado_vigente
+
+        config_llm = configuracion_llm_por_defecto()
+        fingerprint = calcular_fingerprint(
+            concepto,
+            semantic_chunks,
+            version_prompt(extractor),
+            extractor_version,
+            f"{config_llm['engine']}:{config_llm['model']}",
+        )
+        if not force:
+            try:
+                conn = _get_pg_conn()
+                try:
+                    vigente = buscar_resultado_vigente(conn, licitacion_id, concepto, fingerprint)
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning("[⚠️] No se pudo consultar el fingerprint vigente de %s: %s", concepto, e)
+                vigente = None
+            if vigente:
+                semantic_run_id, _ = vigente
+                logger.info("[SEMANTIC] ⏩ %s sin cambios en la evidencia (fingerprint %s). Se reutiliza semantic_run %s.", concepto, fingerprint[:12], semantic_run_id)
+                return {
+                    "status": "OK",
+                    "concepto": concepto,
+                    "semantic_run_id": semantic_run_id,
+                    "reutilizado": True,
+                }
+
     # --- DEBUGGING LÓGICA: GuardarChunks para análisis ---
     debug_log = {
         "licitacion_id": licitacion_id,
@@ -259,9 +210,9 @@ def run_semantic_extraction(
         is_batch_mode = True
 
     if is_batch_mode:
-        print(f"[SEMANTIC] 📦 Activando MODO BATCH DINÁMICO para {len(semantic_chunks)} chunks totales.")
+        logger.info("[SEMANTIC] 📦 Activando MODO BATCH DINÁMICO para %s chunks totales.", len(semantic_chunks))
         
-        all_items = []
+        items_por_lote = []
         all_especificaciones = []
         all_warnings = []
         combined_resumen = {"observaciones": "Procesamiento en lotes.", "total_items_detectados": 0}
@@ -294,7 +245,7 @@ def run_semantic_extraction(
         total_batches = len(batches)
         
         for i, batch_chunks in enumerate(batches):
-            print(f"[SEMANTIC] 📦 Procesando Batch {i+1}/{total_batches} ({len(batch_chunks)} chunks)...")
+            logger.debug("[SEMANTIC] 📦 Procesando Batch %s/%s (%s chunks)...", i+1, total_batches, len(batch_chunks))
             
             context = build_context(list({c["redis_key"]: c for c in batch_chunks}.values()))
             try:
@@ -304,11 +255,11 @@ def run_semantic_extraction(
                 
                 # Consolidar resultados
                 items_generados = batch_result.get("items") or []
-                all_items.extend(items_generados)
+                items_por_lote.append(items_generados)
                 all_especificaciones.extend(batch_result.get("especificaciones") or [])
                 all_warnings.extend(batch_result.get("warnings") or [])
                 
-                print(f"   └─ Extraídos {len(items_generados)} ítems en este batch.")
+                logger.debug("   └─ Extraídos %s ítems en este batch.", len(items_generados))
                 
                 # --- DEBUGGING LÓGICA ---
                 debug_log["batches"].append({
@@ -320,9 +271,9 @@ def run_semantic_extraction(
                 # ------------------------
                 
             except Exception as e:
-                import traceback
-                traceback.print_exc()
-                print(f"   ❌ Error en Batch {i+1}: {e}")
+                logger.exception("   ❌ Error en Batch %s: %s", i+1, e)
+                # Resultado parcial: sin fingerprint para que la próxima corrida vuelva a extraer
+                fingerprint = None
                 
         # --- DEBUGGING LÓGICA: Guardar archivo ---
         if MODO_DEBUG:
@@ -332,9 +283,16 @@ def run_semantic_extraction(
             os.makedirs("salida_json", exist_ok=True)
             with open(debug_filename, "w", encoding="utf-8") as f:
                 json.dump(debug_log, f, indent=2, ensure_ascii=False)
-            print(f"[SEMANTIC] 📝 Log de debug guardado en {debug_filename}")
+            logger.info("[SEMANTIC] 📝 Log de debug guardado en %s", debug_filename)
         # -----------------------------------------
         
+        # Deduplicar ítems vistos en lotes distintos (ej. página _full y su elemento _eN)
+        from src.services.semantic_extraction.extractors.items_licitacion.item_merger import fusionar_items
+        total_items_lotes = sum(len(items) for items in items_por_lote)
+        all_items = fusionar_items(items_por_lote)
+        if total_items_lotes != len(all_items):
+            logger.info("[SEMANTIC] 🔗 Fusión de ítems entre lotes: %s -> %s", total_items_lotes, len(all_items))
+        
         # Construir resultado maestro
         result = {
             "concepto": concepto,
@@ -347,7 +305,7 @@ def run_semantic_extraction(
             "warnings": all_warnings
         }
         
-        print(f"[SEMANTIC] 📦 MODO BATCH FINALIZADO. Total ítems extraídos combinados: {len(all_items)}")
+        logger.info("[SEMANTIC] 📦 MODO BATCH FINALIZADO. Total ítems extraídos combinados: %s", len(all_items))
 
     else:
         # LÓGICA ESTÁNDAR ORIGINAL P/ OTROS CONCEPTOS NO ITEMS
@@ -355,106 +313,109 @@ def run_semantic_extraction(
         safe_chunks = semantic_chunks[:80]
         
         context = build_context(safe_chunks)
-        print(f"[SEMANTIC] Contexto final tiene {len(context)} caracteres (limitado a {len(safe_chunks)} chunks para seguridad)")
+        logger.info("[SEMANTIC] Contexto final tiene %s caracteres (limitado a %s chunks para seguridad)", len(context), len(safe_chunks))
     
-        print(f"[SEMANTIC] Ejecutando extractor.run()...")
+        logger.info("[SEMANTIC] Ejecutando extractor.run()...")
         result = extractor.run(context)
 
     try:
         _guardar_json_en_disco(nombre_licitacion, concepto, result)
     except Exception as e:
-        print(f"[⚠️] Error guardando archivo JSON en disco: {e}")
+        logger.warning("[⚠️] Error guardando archivo JSON en disco: %s", e)
 
     if MODO_DEBUG:
         ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         nombre_archivo = f"debug_semantic_{concepto}_{ts}.json"
-        print(f"\n[DEBUG] Resultado normalizado:\n")
-        print(json.dumps(result, indent=2, ensure_ascii=False, default=_json_serial))
+        logger.debug("[DEBUG] Resultado normalizado:\n%s", json.dumps(result, indent=2, ensure_ascii=False, default=_json_serial))
         with open(nombre_archivo, "w", encoding="utf-8") as f:
             json.dump(result, f, indent=2, ensure_ascii=False, default=_json_serial)
-        print(f"\n[DEBUG] Resultado guardado en archivo: {nombre_archivo}")
+        logger.info("[DEBUG] Resultado guardado en archivo: %s", nombre_archivo)
         return {
             "status": "DEBUG_ONLY",
             "concepto": concepto,
             "mensaje": "No se escribió en base de datos",
         }
 
-    print("[💾] Guardando en base de datos...")
+    logger.info("[💾] Guardando en base de datos...")
     conn = _get_pg_conn()
     cur = conn.cursor()
     semantic_run_id = None
 
-    try:
-        cur.execute("""
-            UPDATE semantic_runs
-            SET is_current = false
-            WHERE licitacion_id = %s AND concepto = %s AND is_current = true
-        """, (licitacion_id, concepto))
-
-        cur.execute("""
-            INSERT INTO semantic_runs
-            (licitacion_id, concepto, is_current, prompt_version, extractor_version)
-            VALUES (%s, %s, true, %s, %s)
-            RETURNING id
-        """, (licitacion_id, concepto, prompt_version, extractor_version))
-
-        semantic_run_id = cur.fetchone()[0]
-
-        cur.execute("""
-            INSERT INTO semantic_results (semantic_run_id, concepto, resultado_json)
-            VALUES (%s, %s, %s)
-        """, (semantic_run_id, concepto, json.dumps(result, default=_json_serial)))
-
-        # Obtener mapa de UUIDs de archivos
-        from src.services.licitacion_service import obtener_mapa_uuid_por_interno
-        mapa_archivos = obtener_mapa_uuid_por_interno(licitacion_id)
-        print(f"[SEMANTIC] Mapa de archivos cargado: {len(mapa_archivos)} documentos")
-
-        for c in semantic_chunks:
-            # Parsear metadata desde redis_key
-            # Formato esperado: doc_raw_page:<lic_int>_<file_int>_<name>:p<page>...
-            # Ejemplo: doc_raw_page:10_5_archivo.pdf:p3_full
+    with span("db.persistir_semantic_run", evidencias=len(semantic_chunks)):
+        try:
+            cur.execute("""
+                UPDATE semantic_runs
+                SET is_current = false
+                WHERE licitacion_id = %s AND concepto = %s AND is_current = true
+            """, (licitacion_id, concepto))
+
+            cur.execute("""
+                INSERT INTO semantic_runs
+                (licitacion_id, concepto, is_current, prompt_version, extractor_version)
+                VALUES (%s, %s, true, %s, %s)
+                RETURNING id
+            """, (licitacion_id, concepto, prompt_version, extractor_version))
+
+            semantic_run_id = cur.fetchone()[0]
+
+            from src.services.semantic_extraction.fingerprint import registrar_fingerprint
+            registrar_fingerprint(cur, semantic_run_id, fingerprint)
+
+            cur.execute("""
+                INSERT INTO semantic_results (semantic_run_id, concepto, resultado_json)
+                VALUES (%s, %s, %s)
+            """, (semantic_run_id, concepto, json.dumps(result, default=_json_serial)))
+
+            # Obtener mapa de UUIDs de archivos
+            from src.services.licitacion_service import obtener_mapa_uuid_por_interno
+            mapa_archivos = obtener_mapa_uuid_por_interno(licitacion_id)
+            logger.info("[SEMANTIC] Mapa de archivos cargado: %s documentos", len(mapa_archivos))
+
+            for c in semantic_chunks:
+                # Parsear metadata desde redis_key
+                # Formato esperado: doc_raw_page:<lic_int>_<file_int>_<name>:p<page>...
+                # Ejemplo: doc_raw_page:10_5_archivo.pdf:p3_full
             
-            redis_key = c["redis_key"]
-            pagina = None
-            documento_uuid = None
+                redis_key = c["redis_key"]
+                pagina = None
+                documento_uuid = None
             
-            try:
-                # 1. Extraer ID Interno del archivo
-                # Buscamos el bloque entre "doc_raw_page:" y ":p"
-                # Regex: doc_raw_page:\d+_(\d+)_.*:p(\d+)
-                match = re.search(r"doc_raw_page:\d+_(\d+)_.+:p(\d+)", redis_key)
-                if match:
-                    file_int_id = match.group(1)
-                    page_num = match.group(2)
+                try:
+                    # 1. Extraer ID Interno del archivo
+                    # Buscamos el bloque entre "doc_raw_page:" y ":p"
+                    # Regex: doc_raw_page:\d+_(\d+)_.*:p(\d+)
+                    match = re.search(r"doc_raw_page:\d+_(\d+)_.+:p(\d+)", redis_key)
+                    if match:
+                        file_int_id = match.group(1)
+                        page_num = match.group(2)
                     
-                    documento_uuid = mapa_archivos.get(file_int_id)
-                    pagina = int(page_num)
-            except Exception as e:
-                print(f"[⚠️] Error parseando metadata de clave '{redis_key}': {e}")
+                        documento_uuid = mapa_archivos.get(file_int_id)
+                        pagina = int(page_num)
+                except Exception as e:
+                    logger.warning("[⚠️] Error parseando metadata de clave '%s': %s", redis_key, e)
+
+                cur.execute("""
+                    INSERT INTO semantic_evidences (semantic_run_id, redis_key, texto_fragmento, score_similitud, pagina, documento_id)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (
+                    semantic_run_id, 
+                    c["redis_key"], 
+                    c["texto"],
+                    c.get("distancia"), # Score (distancia)
+                    pagina,
+                    documento_uuid
+                ))
+
+            conn.commit()
+            logger.info("[✅] Extracción semántica persistida correctamente")
 
-            cur.execute("""
-                INSERT INTO semantic_evidences (semantic_run_id, redis_key, texto_fragmento, score_similitud, pagina, documento_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                semantic_run_id, 
-                c["redis_key"], 
-                c["texto"],
-                c.get("distancia"), # Score (distancia)
-                pagina,
-                documento_uuid
-            ))
-
-        conn.commit()
-        print("[✅] Extracción semántica persistida correctamente")
-
-    except Exception:
-        conn.rollback()
-        traceback.print_exc()
-        raise
+        except Exception:
+            conn.rollback()
+            logger.exception("[SEMANTIC] ❌ Error persistiendo %s", concepto)
+            raise
 
-    finally:
-        cur.close()
+        finally:
+            cur.close()
 
     # NOTE: The original code had specific logic for different concepts (ITEMS, FINANZAS, etc.)
     # calling services.licitacion_service. This service does not exist in this project yet.
@@ -482,16 +443,14 @@ def run_semantic_extraction(
 
         elif concepto == "FINANZAS_LICITACION":
             from src.services.licitacion_service import guardar_finanzas_licitacion
-            import datetime
-            now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"[{now}] 🏦 Procesando resultado de FINANZAS_LICITACION para licitacion_id={licitacion_id}")
+            logger.info("🏦 Procesando resultado de FINANZAS_LICITACION para licitacion_id=%s", licitacion_id)
             
             if result.get("finanzas"):
                 try:
                     guardar_finanzas_licitacion(conn, licitacion_id, result["finanzas"], semantic_run_id)
-                    print(f"[{now}] ✅ Datos financieros guardados correctamente en BD")
+                    logger.info("✅ Datos financieros guardados correctamente en BD")
                 except Exception as e:
-                    print(f"[{now}] ❌ Error al guardar datos financieros: {str(e)}")
+                    logger.error("❌ Error al guardar datos financieros: %s", str(e))
                     # No hacemos raise para no abortar todo el flujo si falla finanzas
                     # raise 
 
@@ -507,15 +466,13 @@ def run_semantic_extraction(
 
         elif concepto == "ENTREGAS_LICITACION":
             from src.services.licitacion_service import guardar_entregas_licitacion
-            import datetime
-            now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"[{now}] 🚚 Procesando resultado de ENTREGAS_LICITACION para licitacion_id={licitacion_id}")
+            logger.info("🚚 Procesando resultado de ENTREGAS_LICITACION para licitacion_id=%s", licitacion_id)
             
             try:
                 guardar_entregas_licitacion(conn, licitacion_id, result, semantic_run_id)
-                print(f"[{now}] ✅ Datos de entregas guardados correctamente en BD")
+                logger.info("✅ Datos de entregas guardados correctamente en BD")
             except Exception as e:
-                print(f"[{now}] ❌ Error al guardar datos de entregas: {str(e)}")
+                logger.error("❌ Error al guardar datos de entregas: %s", str(e))
 
     finally:
         conn.close()
@@ -1,8 +1,11 @@
+import logging
 import os
 import json
 import unicodedata
 import re
 
+logger = logging.getLogger(__name__)
+
 def guardar_resultados(resultados, carpeta_destino, nombre_base="resultado"):
     """
     Guarda los resultados de la extracción en tres archivos:
@@ -19,7 +22,7 @@ def guardar_resultados(resultados, carpeta_destino, nombre_base="resultado"):
     ruta_json = os.path.join(carpeta_destino, f"{base_nombre}_resultado_paginas.json")
     with open(ruta_json, "w", encoding="utf-8") as f:
         json.dump(resultados, f, ensure_ascii=False, indent=2)
-    print(f"[guardar_archivos] → Guardando JSON en {os.path.basename(ruta_json)}")
+    logger.info("[guardar_archivos] → Guardando JSON en %s", os.path.basename(ruta_json))
 
     # Texto plano
     texto_completo = ""
@@ -37,7 +40,7 @@ def guardar_resultados(resultados, carpeta_destino, nombre_base="resultado"):
     ruta_txt = os.path.join(carpeta_destino, f"{base_nombre}.txt")
     with open(ruta_txt, "w", encoding="utf-8") as f:
         f.write(texto_completo.strip())
-    print(f"[guardar_archivos] → Guardando texto plano en {os.path.basename(ruta_txt)}")
+    logger.info("[guardar_archivos] → Guardando texto plano en %s", os.path.basename(ruta_txt))
 
     # Tokens por página
     ruta_tokens = os.path.join(carpeta_destino, f"{base_nombre}_tokens.txt")
@@ -46,9 +49,9 @@ def guardar_resultados(resultados, carpeta_destino, nombre_base="resultado"):
             num = pagina.get("pagina", "N/A")
             tokens = pagina.get("tokens", "N/A")
             f.write(f"Página {num}: {tokens} tokens\n")
-    print(f"[guardar_archivos] → Guardando tokens en {os.path.basename(ruta_tokens)}")
+    logger.info("[guardar_archivos] → Guardando tokens en %s", os.path.basename(ruta_tokens))
 
-    print("[guardar_archivos] ✅ Archivos guardados correctamente")
+    logger.info("[guardar_archivos] ✅ Archivos guardados correctamente")
 
 def normalizar_nombre(nombre):
     """
@@ -0,0 +1,159 @@
+"""
+Logging estructurado del servicio.
+
+Todo `src/` escribe con `logging.getLogger(__name__)`; este módulo configura el root
+logger una vez por proceso (entrypoints: worker, main, run_pipeline):
+
+- Formato (LOG_FORMAT): "json" (una línea JSON por evento, para los drivers de logs
+  de Docker) o "texto" (legible en consola).
+- Nivel (LOG_LEVEL): los eventos por chunk / por fila / por query van en DEBUG.
+- Contexto: cada registro lleva licitacion_id, concepto, trace_id y span_id del span
+  activo (src/utils/tracing.py), sin tener que pasarlos en cada llamada.
+- Muestreo: los eventos de alta frecuencia que se quieren ver en INFO se marcan con
+  `extra=muestreo()` y solo se emite 1 de cada LOG_SAMPLE_EVERY por mensaje.
+- Sin I/O síncrono en el hilo que loguea: los registros pasan por una cola y un
+  hilo de fondo (QueueListener) los escribe en stdout.
+"""
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import itertools
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from src import config
+
+# Atributos propios de LogRecord (el resto de `extra` se serializa como campos del evento)
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+_CAMPOS_CONTEXTO = ("licitacion_id", "concepto", "trace_id", "span_id")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def muestreo(cada: Optional[int] = None) -> Dict[str, int]:
+    """
+    `extra` para eventos de alta frecuencia: se emite 1 de cada `cada` (default LOG_SAMPLE_EVERY).
+    """
+    return {"muestreo": cada or config.LOG_SAMPLE_EVERY}
+
+
+class FiltroContexto(logging.Filter):
+    """
+    Agrega al registro el contexto del span activo (se evalúa en el hilo que loguea).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        from src.utils.tracing import span_actual
+        span = span_actual()
+        if span is not None:
+            for campo in ("licitacion_id", "concepto"):
+                if getattr(record, campo, None) is None and span.atributos.get(campo) is not None:
+                    setattr(record, campo, span.atributos[campo])
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar 1 de cada N registros marcados con `muestreo=N`, contando por (logger, mensaje).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._contadores: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        cada = getattr(record, "muestreo", None)
+        if not cada or cada <= 1:
+            return True
+        clave = (record.name, record.msg)
+        with self._lock:
+            contador = self._contadores.setdefault(clave, itertools.count())
+            n = next(contador)
+        if n % cada:
+            return False
+        record.muestreados = cada
+        return True
+
+
+class _ManejadorCola(logging.handlers.QueueHandler):
+    """
+    QueueHandler que deja el traceback en `excepcion` en vez de concatenarlo al mensaje.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.excepcion = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+class FormateadorJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        for campo, valor in vars(record).items():
+            if campo not in _ATRIBUTOS_ESTANDAR and campo != "muestreo" and valor is not None:
+                evento[campo] = valor
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        texto = super().format(record)
+        contexto = " ".join(f"{c}={getattr(record, c)}" for c in ("licitacion_id", "concepto") if getattr(record, c, None))
+        if contexto:
+            texto = f"{texto} [{contexto}]"
+        if getattr(record, "excepcion", None):
+            texto = f"{texto}\n{record.excepcion}"
+        return texto
+
+
+def configurar_logging(nivel: Optional[str] = None, formato: Optional[str] = None) -> None:
+    """
+    Configura el root logger (idempotente). Llamar al inicio de cada entrypoint.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        formato = (formato or config.LOG_FORMAT).lower()
+        manejador = logging.StreamHandler(sys.stdout)
+        manejador.setFormatter(FormateadorJSON() if formato == "json" else FormateadorTexto())
+
+        cola: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        en_cola = _ManejadorCola(cola)
+        # Los filtros corren en el hilo que loguea (ahí está el contextvar del span)
+        en_cola.addFilter(FiltroMuestreo())
+        en_cola.addFilter(FiltroContexto())
+
+        raiz = logging.getLogger()
+        for existente in list(raiz.handlers):
+            raiz.removeHandler(existente)
+        raiz.addHandler(en_cola)
+        raiz.setLevel((nivel or config.LOG_LEVEL).upper())
+        # Librerías ruidosas en DEBUG/INFO
+        for ruidoso in ("httpx", "httpcore", "openai", "urllib3"):
+            logging.getLogger(ruidoso).setLevel(logging.WARNING)
+
+        _listener = logging.handlers.QueueListener(cola, manejador, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
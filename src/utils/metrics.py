@@ -1,6 +1,9 @@
+import logging
 import os
 import requests
 import urllib3
+
+logger = logging.getLogger(__name__)
 # from src.config import settings
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -14,7 +17,7 @@ def log_ai_usage(licitacion_id: str, action: str, provider: str, model: str, inp
     Registra el consumo de tokens en el Backend Central de Licitaciones
     """
     if licitacion_id == "default" or not licitacion_id:
-        print(f"⚠️ [Metrics] Ignorando métricas sin licitacion_id: {action}")
+        logger.debug("⚠️ [Metrics] Ignorando métricas sin licitacion_id: %s", action)
         return
         
     url = f"{BACKEND_URL}/licitaciones/{licitacion_id}/token-usage"
@@ -30,8 +33,8 @@ def log_ai_usage(licitacion_id: str, action: str, provider: str, model: str, inp
     try:
         response = requests.post(url, json=payload, timeout=10)
         if response.status_code in [200, 201]:
-            print(f"📊 [Metrics] Uso registrado OK: {input_tokens}in, {output_tokens}out ({action})")
+            logger.debug("📊 [Metrics] Uso registrado OK: %sin, %sout (%s)", input_tokens, output_tokens, action)
         else:
-            print(f"⚠️ [Metrics] Backend falló al registrar tokens: {response.text}")
+            logger.warning("⚠️ [Metrics] Backend falló al registrar tokens: %s", response.text)
     except Exception as e:
-        print(f"❌ [Metrics] Error enviando métricas de IA al backend: {e}")
+        logger.error("❌ [Metrics] Error enviando métricas de IA al backend: %s", e)
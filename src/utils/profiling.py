@@ -0,0 +1,250 @@
+"""
+Profiling bajo demanda de un trabajo del worker.
+
+Se activa por mensaje ("profile": true en el payload de semantic_queue) o para una
+fracción PROFILE_SAMPLE_RATE de los trabajos; el resto corre sin ningún costo extra.
+Durante el trabajo perfilado:
+
+- Muestreo de pilas de todos los hilos cada PROFILE_INTERVAL_MS (el grafo reparte
+  shards de ítems y batches de homologación en hilos, que cProfile no ve).
+- cProfile sobre el hilo que ejecuta el trabajo (orquestación del grafo y persistencia).
+- tracemalloc: pico de memoria y top de líneas que más memoria retienen al final.
+
+Artefactos en PROFILE_DIR/{licitacion_id}/{timestamp}/:
+- resumen.json: top de funciones (propio / inclusivo), memoria y metadatos
+- pilas.txt: pilas colapsadas ("a;b;c N"), entrada directa para flamegraph.pl / speedscope
+- cpu.prof: estadísticas de cProfile (`python -m pstats cpu.prof`, snakeviz)
+
+Uso: `python -m src.utils.profiling <ruta/resumen.json>` imprime el resumen.
+"""
+import os
+import sys
+import json
+import time
+import random
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src import config
+from src.utils.file_utils import normalizar_nombre
+
+logger = logging.getLogger(__name__)
+
+# Hojas de pila que indican un hilo ocioso (pool sin trabajo, listener de logs, servidor de métricas)
+_MODULOS_ESPERA = ("threading.py", "queue.py", "selectors.py", "socketserver.py")
+
+
+def debe_perfilar(solicitado: bool = False) -> bool:
+    """
+    True si el mensaje lo pide o si el trabajo cae en la muestra PROFILE_SAMPLE_RATE.
+    """
+    if solicitado:
+        return True
+    tasa = config.PROFILE_SAMPLE_RATE
+    return tasa > 0 and random.random() < tasa
+
+
+def _etiqueta(frame) -> str:
+    codigo = frame.f_code
+    modulo = frame.f_globals.get("__name__") or os.path.basename(codigo.co_filename)
+    return f"{modulo}:{codigo.co_name}"
+
+
+def _en_espera(frame) -> bool:
+    codigo = frame.f_code
+    if codigo.co_filename.endswith(_MODULOS_ESPERA):
+        return True
+    # Worker de ThreadPoolExecutor bloqueado en SimpleQueue.get (C, no aparece como frame)
+    return codigo.co_name == "_worker" and codigo.co_filename.endswith(os.path.join("concurrent", "futures", "thread.py"))
+
+
+class MuestreadorPilas:
+    """
+    Profiler por muestreo: un hilo daemon lee `sys._current_frames()` a intervalos fijos
+    y cuenta pilas colapsadas. Mide tiempo de pared de hilos activos (incluye esperas de
+    red hacia LLM/Redis/Postgres, excluye hilos bloqueados en colas o locks ociosos).
+    """
+
+    def __init__(self, intervalo_ms: Optional[float] = None):
+        self.intervalo = (intervalo_ms or config.PROFILE_INTERVAL_MS) / 1000.0
+        self.pilas: Counter = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        self._hilo = threading.Thread(target=self._bucle, name="profiling-sampler", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _bucle(self) -> None:
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            self.muestras += 1
+            for hilo_id, frame in sys._current_frames().items():
+                if hilo_id == propio or _en_espera(frame):
+                    continue
+                pila: List[str] = []
+                while frame is not None:
+                    pila.append(_etiqueta(frame))
+                    frame = frame.f_back
+                self.pilas[tuple(reversed(pila))] += 1
+
+    def top_funciones(self, n: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        (top por tiempo propio, top por tiempo inclusivo), en muestras y segundos estimados.
+        """
+        propio: Counter = Counter()
+        inclusivo: Counter = Counter()
+        for pila, conteo in self.pilas.items():
+            propio[pila[-1]] += conteo
+            for funcion in set(pila):
+                inclusivo[funcion] += conteo
+        total = sum(self.pilas.values()) or 1
+
+        def _filas(contador: Counter) -> List[Dict[str, Any]]:
+            return [
+                {
+                    "funcion": funcion,
+                    "muestras": conteo,
+                    "segundos": round(conteo * self.intervalo, 3),
+                    "porcentaje": round(100.0 * conteo / total, 1),
+                }
+                for funcion, conteo in contador.most_common(n)
+            ]
+
+        return _filas(propio), _filas(inclusivo)
+
+    def escribir_colapsadas(self, ruta: str) -> None:
+        with open(ruta, "w", encoding="utf-8") as f:
+            for pila, conteo in self.pilas.most_common():
+                f.write(f"{';'.join(pila)} {conteo}\n")
+
+
+def _resumen_memoria(snapshot: "tracemalloc.Snapshot", pico: int, n: int) -> Dict[str, Any]:
+    top = []
+    for estadistica in snapshot.statistics("lineno")[:n]:
+        marco = estadistica.traceback[0]
+        top.append({
+            "linea": f"{marco.filename}:{marco.lineno}",
+            "kib": round(estadistica.size / 1024, 1),
+            "bloques": estadistica.count,
+        })
+    return {"pico_mib": round(pico / (1024 * 1024), 2), "top_lineas": top}
+
+
+def _directorio_artefactos(licitacion_id: str) -> str:
+    sello = datetime.now().strftime("%Y%m%d-%H%M%S")
+    ruta = os.path.join(config.PROFILE_DIR, normalizar_nombre(str(licitacion_id)), sello)
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+@contextmanager
+def perfilar(licitacion_id: str, **metadatos: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Perfila el bloque y guarda los artefactos al salir (también si el bloque lanza).
+    Entrega un dict que al terminar contiene "directorio" con la ruta de los artefactos.
+    """
+    resultado: Dict[str, Any] = {}
+    muestreador = MuestreadorPilas()
+    perfil = cProfile.Profile()
+    # Si tracemalloc ya estaba activo (p.ej. PYTHONTRACEMALLOC) no se detiene al final
+    tracemalloc_propio = not tracemalloc.is_tracing()
+    if tracemalloc_propio:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    logger.info("[PROFILE] Perfilando trabajo %s", licitacion_id)
+    inicio = time.perf_counter()
+    muestreador.iniciar()
+    perfil.enable()
+    try:
+        yield resultado
+    finally:
+        perfil.disable()
+        muestreador.detener()
+        duracion = time.perf_counter() - inicio
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        _, pico = tracemalloc.get_traced_memory()
+        if tracemalloc_propio:
+            tracemalloc.stop()
+        try:
+            resultado["directorio"] = _guardar_artefactos(
+                licitacion_id, duracion, muestreador, perfil, snapshot, pico, metadatos
+            )
+        except Exception as e:
+            logger.warning("[PROFILE] No se pudieron guardar los artefactos de %s: %s", licitacion_id, e)
+
+
+def _guardar_artefactos(
+    licitacion_id: str,
+    duracion: float,
+    muestreador: MuestreadorPilas,
+    perfil: cProfile.Profile,
+    snapshot: "tracemalloc.Snapshot",
+    pico: int,
+    metadatos: Dict[str, Any],
+) -> str:
+    directorio = _directorio_artefactos(licitacion_id)
+    n = config.PROFILE_TOP
+    top_propio, top_inclusivo = muestreador.top_funciones(n)
+
+    resumen = {
+        "licitacion_id": licitacion_id,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "duracion_s": round(duracion, 3),
+        "intervalo_ms": muestreador.intervalo * 1000,
+        "muestras": muestreador.muestras,
+        "top_propio": top_propio,
+        "top_inclusivo": top_inclusivo,
+        "memoria": _resumen_memoria(snapshot, pico, n),
+        **metadatos,
+    }
+    with open(os.path.join(directorio, "resumen.json"), "w", encoding="utf-8") as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=2)
+    muestreador.escribir_colapsadas(os.path.join(directorio, "pilas.txt"))
+    perfil.dump_stats(os.path.join(directorio, "cpu.prof"))
+
+    logger.info(
+        "[PROFILE] %s: %.1fs, pico memoria %.1f MiB, artefactos en %s",
+        licitacion_id, duracion, resumen["memoria"]["pico_mib"], directorio,
+    )
+    for fila in top_propio[:5]:
+        logger.info("[PROFILE]   %5.1f%%  %7.2fs  %s", fila["porcentaje"], fila["segundos"], fila["funcion"])
+    return directorio
+
+
+def _imprimir_resumen(ruta: str) -> None:
+    with open(ruta, encoding="utf-8") as f:
+        resumen = json.load(f)
+    print(f"Licitación {resumen['licitacion_id']}: {resumen['duracion_s']}s, "
+          f"{resumen['muestras']} muestras cada {resumen['intervalo_ms']}ms, "
+          f"pico memoria {resumen['memoria']['pico_mib']} MiB")
+    for titulo, clave in (("Tiempo propio", "top_propio"), ("Tiempo inclusivo", "top_inclusivo")):
+        print(f"\n=== {titulo} ===")
+        for fila in resumen[clave]:
+            print(f"{fila['porcentaje']:6.1f}%  {fila['segundos']:8.2f}s  {fila['funcion']}")
+    print("\n=== Memoria retenida (top líneas) ===")
+    for fila in resumen["memoria"]["top_lineas"]:
+        print(f"{fila['kib']:10.1f} KiB  {fila['bloques']:7d}  {fila['linea']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python -m src.utils.profiling <resumen.json>")
+        sys.exit(1)
+    _imprimir_resumen(sys.argv[1])
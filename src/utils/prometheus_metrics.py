@@ -0,0 +1,275 @@
+"""
+Métricas del worker en formato de texto Prometheus, expuestas por HTTP (METRICS_PORT).
+
+- GET /metrics: exposición Prometheus (text/plain; version=0.0.4)
+- GET /health: 200 "ok" mientras el proceso responde
+
+La mayoría de las métricas se derivan de los spans de src/utils/tracing.py (se
+registra como observador al importar este módulo), así que no dependen de que haya
+un exportador de trazas configurado:
+- grafo.* / items.* / worker.*  -> lic_stage_duration_seconds y lic_node_errors_total
+- llm.generate_text             -> lic_llm_request_duration_seconds y lic_llm_tokens_total por modelo
+- redis.* / db.*                -> lic_redis_* / lic_postgres_* (llamadas y latencia)
+
+El resto se actualiza explícitamente (trabajos en curso, profundidad de la cola, cache de embeddings).
+Implementación sin dependencias (no se usa prometheus_client).
+"""
+import math
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.tracing import registrar_observador
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: Sequence[str], valores: Tuple[str, ...], extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(valores.get(e, "")) for e in self.etiquetas)
+
+    def exponer(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"] + self._muestras()
+
+    def _muestras(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, cantidad: float = 1, **etiquetas: str) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def valor(self, **etiquetas: str) -> float:
+        return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def _muestras(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._valores.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}" for k, v in items]
+
+
+class Medidor(_Metrica):
+    """
+    Gauge; con `funcion` el valor se calcula al momento del scrape.
+    """
+    tipo = "gauge"
+
+    def __init__(self, *args, funcion: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self.funcion = funcion
+
+    def set(self, valor: float, **etiquetas: str) -> None:
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = float(valor)
+
+    def inc(self, cantidad: float = 1, **etiquetas: str) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def dec(self, cantidad: float = 1, **etiquetas: str) -> None:
+        self.inc(-cantidad, **etiquetas)
+
+    def _muestras(self) -> List[str]:
+        if self.funcion is not None:
+            try:
+                self.set(self.funcion())
+            except Exception as e:
+                logger.warning("[METRICS] No se pudo calcular %s: %s", self.nombre, e)
+                return []
+        with self._lock:
+            items = sorted(self._valores.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}" for k, v in items]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = BUCKETS_SEGUNDOS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # clave -> [conteos por bucket (no acumulados), suma, total]
+        self._valores: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, valor: float, **etiquetas: str) -> None:
+        clave = self._clave(etiquetas)
+        indice = next(i for i, limite in enumerate(self.buckets) if valor <= limite)
+        with self._lock:
+            estado = self._valores.setdefault(clave, [[0] * len(self.buckets), 0.0, 0])
+            estado[0][indice] += 1
+            estado[1] += valor
+            estado[2] += 1
+
+    def _muestras(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._valores.items())
+        lineas = []
+        for clave, (conteos, suma, total) in items:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                le = 'le="' + _numero(limite) + '"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}")
+        return lineas
+
+
+# ======================================================
+# Métricas del worker
+# ======================================================
+
+COLA_PROFUNDIDAD = Medidor("lic_semantic_queue_depth", "Mensajes pendientes en la cola semantic_queue")
+TRABAJOS_EN_CURSO = Medidor("lic_jobs_in_flight", "Licitaciones en procesamiento en este worker")
+TRABAJOS = Contador("lic_jobs_total", "Licitaciones procesadas por resultado", ["resultado"])
+DURACION_ETAPA = Histograma("lic_stage_duration_seconds", "Duración por etapa (nodo del grafo / subgrafo / trabajo)", ["etapa"])
+ERRORES_NODO = Contador("lic_node_errors_total", "Nodos que terminaron con excepción o con errores en su salida", ["nodo"])
+LLM_DURACION = Histograma("lic_llm_request_duration_seconds", "Latencia de llamadas al LLM", ["motor", "modelo"])
+LLM_TOKENS = Contador("lic_llm_tokens_total", "Tokens consumidos en llamadas al LLM", ["motor", "modelo", "tipo"])
+LLM_ERRORES = Contador("lic_llm_errors_total", "Llamadas al LLM que fallaron", ["motor", "modelo"])
+CACHE_EMBEDDINGS = Contador("lic_embedding_cache_requests_total", "Consultas al cache de embeddings del catálogo", ["resultado"])
+CACHE_DOCUMENTOS = Contador("lic_doc_matrix_cache_requests_total", "Consultas al cache de matrices de documentos (hit/miss/sin_version)", ["resultado"])
+CACHE_DOCUMENTOS_INVALIDACIONES = Contador("lic_doc_matrix_cache_invalidations_total", "Entradas descartadas por cambio de doc_version")
+CACHE_DOCUMENTOS_EXPULSIONES = Contador("lic_doc_matrix_cache_evictions_total", "Documentos expulsados del cache de matrices por límite de bytes")
+CACHE_DOCUMENTOS_BYTES = Medidor("lic_doc_matrix_cache_bytes", "Bytes aproximados en el cache de matrices de documentos")
+REDIS_DURACION = Histograma("lic_redis_operation_duration_seconds", "Latencia de operaciones contra Redis", ["operacion"])
+POSTGRES_DURACION = Histograma("lic_postgres_operation_duration_seconds", "Latencia de escrituras/lecturas contra Postgres", ["operacion"])
+
+TRABAJOS_EN_CURSO.set(0)
+
+METRICAS: List[_Metrica] = [
+    COLA_PROFUNDIDAD, TRABAJOS_EN_CURSO, TRABAJOS, DURACION_ETAPA, ERRORES_NODO,
+    LLM_DURACION, LLM_TOKENS, LLM_ERRORES, CACHE_EMBEDDINGS, CACHE_DOCUMENTOS,
+    CACHE_DOCUMENTOS_INVALIDACIONES, CACHE_DOCUMENTOS_EXPULSIONES, CACHE_DOCUMENTOS_BYTES, REDIS_DURACION, POSTGRES_DURACION,
+]
+
+_PREFIJOS_ETAPA = ("grafo.", "items.", "worker.")
+
+
+def observar_span(span) -> None:
+    """
+    Traduce un span terminado a métricas (ver docstring del módulo).
+    """
+    nombre = span.nombre
+    segundos = span.duracion_ms / 1000.0
+    if nombre.startswith(_PREFIJOS_ETAPA):
+        DURACION_ETAPA.observe(segundos, etapa=nombre)
+        if span.estado == "ERROR" or span.atributos.get("errores"):
+            ERRORES_NODO.inc(nodo=nombre)
+    elif nombre == "llm.generate_text":
+        motor, modelo = span.atributos.get("motor", ""), span.atributos.get("modelo", "")
+        LLM_DURACION.observe(segundos, motor=motor, modelo=modelo)
+        if span.estado == "ERROR":
+            LLM_ERRORES.inc(motor=motor, modelo=modelo)
+        LLM_TOKENS.inc(span.atributos.get("tokens_input", 0), motor=motor, modelo=modelo, tipo="input")
+        LLM_TOKENS.inc(span.atributos.get("tokens_output", 0), motor=motor, modelo=modelo, tipo="output")
+    elif nombre.startswith("redis."):
+        REDIS_DURACION.observe(segundos, operacion=nombre[len("redis."):])
+    elif nombre.startswith("db."):
+        POSTGRES_DURACION.observe(segundos, operacion=nombre[len("db."):])
+
+
+registrar_observador(observar_span)
+
+
+def registrar_cache_embeddings(aciertos: int, fallos: int) -> None:
+    if aciertos:
+        CACHE_EMBEDDINGS.inc(aciertos, resultado="hit")
+    if fallos:
+        CACHE_EMBEDDINGS.inc(fallos, resultado="miss")
+
+
+def registrar_cache_documentos(
+    resultado: Optional[str] = None, invalidadas: int = 0, expulsiones: int = 0, bytes_en_uso: Optional[int] = None
+) -> None:
+    if resultado:
+        CACHE_DOCUMENTOS.inc(resultado=resultado)
+    if invalidadas:
+        CACHE_DOCUMENTOS_INVALIDACIONES.inc(invalidadas)
+    if expulsiones:
+        CACHE_DOCUMENTOS_EXPULSIONES.inc(expulsiones)
+    if bytes_en_uso is not None:
+        CACHE_DOCUMENTOS_BYTES.set(bytes_en_uso)
+
+
+def exponer_metricas() -> str:
+    lineas: List[str] = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        ruta = self.path.split("?", 1)[0]
+        if ruta == "/metrics":
+            cuerpo = exponer_metricas().encode("utf-8")
+            tipo = "text/plain; version=0.0.4; charset=utf-8"
+        elif ruta in ("/health", "/healthz"):
+            cuerpo, tipo = b"ok\n", "text/plain; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        # Los scrapes periódicos no ensucian la salida del worker
+        pass
+
+
+def iniciar_servidor_metricas(puerto: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """
+    Levanta el endpoint en un hilo daemon. Retorna None si el puerto es 0 o no se pudo abrir.
+    """
+    if not puerto:
+        return None
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), _Handler)
+    except OSError as e:
+        logger.warning("[METRICS] No se pudo abrir el puerto %s: %s", puerto, e)
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("[METRICS] Endpoint de métricas en http://%s:%s/metrics", host, puerto)
+    return servidor
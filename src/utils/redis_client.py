@@ -1,15 +1,116 @@
+"""
+Capa única de acceso a Redis del servicio (todas las conexiones usan REDIS_DB).
+
+- `get_redis_client()`: cliente de comandos con respuestas decodificadas (str).
+- `get_redis_client(decode_responses=False)`: cliente de comandos en bytes, para
+  hashes con vectores / JSON crudo (chunks de documentos).
+- `get_blocking_client()`: conexión dedicada a lecturas bloqueantes (BLPOP de la
+  cola), para que la espera no retenga conexiones del pool de comandos.
+
+Cada cliente se crea una sola vez por proceso y es thread-safe: su pool de
+conexiones (hasta REDIS_MAX_CONNECTIONS) se comparte entre módulos, nodos del grafo
+y trabajos concurrentes.
+
+Helpers de pipelining en lotes de REDIS_PIPELINE_BATCH comandos: `pipeline_hgetall`,
+`pipeline_hmget` y `pipeline_hset`.
+"""
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
 import redis
 from src.config import (
-    REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_USERNAME, REDIS_PASSWORD
+    REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_USERNAME, REDIS_PASSWORD,
+    REDIS_MAX_CONNECTIONS, REDIS_PIPELINE_BATCH
 )
 
-def get_redis_client() -> redis.Redis:
-    """Retorna una instancia de cliente Redis configurada."""
+_clientes: Dict[str, redis.Redis] = {}
+_lock = threading.Lock()
+
+
+def _crear_cliente(decode_responses: bool, **opciones: Any) -> redis.Redis:
     return redis.Redis(
-        host=REDIS_HOST, 
-        port=REDIS_PORT, 
-        db=REDIS_DB, 
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
         username=REDIS_USERNAME,
         password=REDIS_PASSWORD,
-        decode_responses=True
+        decode_responses=decode_responses,
+        health_check_interval=30,
+        **opciones
     )
+
+
+def _obtener(nombre: str, decode_responses: bool, **opciones: Any) -> redis.Redis:
+    cliente = _clientes.get(nombre)
+    if cliente is None:
+        with _lock:
+            cliente = _clientes.get(nombre)
+            if cliente is None:
+                cliente = _crear_cliente(decode_responses, **opciones)
+                _clientes[nombre] = cliente
+    return cliente
+
+
+def get_redis_client(decode_responses: bool = True) -> redis.Redis:
+    """Retorna el cliente Redis compartido de comandos (str por defecto, bytes con decode_responses=False)."""
+    nombre = "comandos" if decode_responses else "comandos_bytes"
+    return _obtener(nombre, decode_responses, max_connections=REDIS_MAX_CONNECTIONS)
+
+
+def get_blocking_client() -> redis.Redis:
+    """
+    Cliente para BLPOP / lecturas bloqueantes. Sin socket_timeout: el timeout lo define
+    el comando (p.ej. BLPOP con timeout=10).
+    """
+    return _obtener("bloqueante", True, max_connections=2, socket_timeout=None)
+
+
+def cerrar_conexiones() -> None:
+    """Cierra los pools y olvida los clientes (el próximo uso los vuelve a crear)."""
+    with _lock:
+        for cliente in _clientes.values():
+            cliente.close()
+        _clientes.clear()
+
+
+def en_lotes(elementos: Sequence[Any], tamano: Optional[int] = None) -> Iterator[Sequence[Any]]:
+    tamano = tamano or REDIS_PIPELINE_BATCH
+    for inicio in range(0, len(elementos), tamano):
+        yield elementos[inicio:inicio + tamano]
+
+
+def pipeline_hgetall(cliente: redis.Redis, claves: Sequence[str], tamano_lote: Optional[int] = None) -> List[Dict]:
+    """HGETALL de cada clave, en pipelines de `tamano_lote` (sin MULTI). Mismo orden que `claves`."""
+    resultados: List[Dict] = []
+    for lote in en_lotes(claves, tamano_lote):
+        pipe = cliente.pipeline(transaction=False)
+        for clave in lote:
+            pipe.hgetall(clave)
+        resultados.extend(pipe.execute())
+    return resultados
+
+
+def pipeline_hmget(
+    cliente: redis.Redis, claves: Sequence[str], campos: Sequence[str], tamano_lote: Optional[int] = None
+) -> List[List[Any]]:
+    """HMGET de `campos` para cada clave (solo transfiere esos campos). Mismo orden que `claves`."""
+    resultados: List[List[Any]] = []
+    for lote in en_lotes(claves, tamano_lote):
+        pipe = cliente.pipeline(transaction=False)
+        for clave in lote:
+            pipe.hmget(clave, list(campos))
+        resultados.extend(pipe.execute())
+    return resultados
+
+
+def pipeline_hset(
+    cliente: redis.Redis, registros: Iterable[Tuple[str, Dict[str, Any]]], tamano_lote: Optional[int] = None
+) -> int:
+    """HSET clave -> mapping para cada registro, en pipelines. Retorna la cantidad de registros escritos."""
+    registros = list(registros)
+    for lote in en_lotes(registros, tamano_lote):
+        pipe = cliente.pipeline(transaction=False)
+        for clave, mapping in lote:
+            pipe.hset(clave, mapping=mapping)
+        pipe.execute()
+    return len(registros)
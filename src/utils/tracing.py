@@ -0,0 +1,340 @@
+"""
+Trazas por span del pipeline semántico (nodos del grafo, subgrafo de ítems, carga de
+Redis, embeddings, búsqueda vectorial, contexto, LLM, validación de schema y escrituras en BD).
+
+Uso:
+    with span("llm.generate_text", modelo=modelo) as s:
+        ...
+        s.set("tokens_input", 123)
+
+    @trazar("busqueda.semantic_search")
+    def semantic_search_in_memory(...): ...
+
+El span activo vive en un contextvar: los hijos heredan trace_id y los atributos
+licitacion_id / concepto del padre. Los hilos (fan-out de LangGraph, shards, batches)
+deben ejecutarse con contextvars.copy_context().run para quedar bajo el mismo trace.
+
+Exportadores (TRACING_EXPORTER):
+- "none" (default): no se exporta nada
+- "jsonl": una línea por span en TRACING_JSONL_PATH
+- "otlp": OTLP/HTTP JSON a TRACING_OTLP_ENDPOINT (ej. collector local en :4318), en lotes
+
+Resumen de un archivo JSONL (tiempo total por span, para ver dónde se fue el tiempo):
+    python -m src.utils.tracing traces.jsonl [licitacion_id]
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import inspect
+import logging
+import secrets
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+# Atributos que los spans hijos heredan del padre
+ATRIBUTOS_HEREDADOS = ("licitacion_id", "concepto")
+
+_span_actual: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span_actual", default=None)
+
+# Funciones llamadas con cada span terminado (ej. métricas Prometheus), con o sin exportador
+_observadores: List[Callable[["Span"], None]] = []
+
+
+class Span:
+    __slots__ = ("nombre", "trace_id", "span_id", "parent_id", "inicio_ns", "fin_ns", "atributos", "estado", "error")
+
+    def __init__(self, nombre: str, padre: Optional["Span"], atributos: Dict[str, Any]):
+        self.nombre = nombre
+        self.trace_id = padre.trace_id if padre else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = padre.span_id if padre else None
+        heredados = {k: padre.atributos[k] for k in ATRIBUTOS_HEREDADOS if padre and padre.atributos.get(k) is not None}
+        self.atributos = {**heredados, **{k: v for k, v in atributos.items() if v is not None}}
+        self.inicio_ns = time.time_ns()
+        self.fin_ns: Optional[int] = None
+        self.estado = "OK"
+        self.error: Optional[str] = None
+
+    def set(self, clave: str, valor: Any) -> None:
+        self.atributos[clave] = valor
+
+    @property
+    def duracion_ms(self) -> float:
+        return ((self.fin_ns or time.time_ns()) - self.inicio_ns) / 1e6
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "nombre": self.nombre,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "inicio_ns": self.inicio_ns,
+            "fin_ns": self.fin_ns,
+            "duracion_ms": round(self.duracion_ms, 3),
+            "estado": self.estado,
+            "error": self.error,
+            "atributos": self.atributos,
+        }
+
+
+# ======================================================
+# Exportadores
+# ======================================================
+
+class ExportadorJSONL:
+    def __init__(self, ruta: str):
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def exportar(self, span: Span) -> None:
+        linea = json.dumps(span.a_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock, open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(linea)
+
+    def cerrar(self) -> None:
+        pass
+
+
+def _valor_otlp(valor: Any) -> Dict[str, Any]:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+class ExportadorOTLP:
+    """
+    OTLP/HTTP con payload JSON, enviado en lotes desde un hilo de fondo (el pipeline
+    no espera al collector; si no responde, los spans se descartan con un warning).
+    """
+
+    TAMANO_LOTE = 256
+    INTERVALO_SEGUNDOS = 2.0
+
+    def __init__(self, endpoint: str, servicio: str):
+        self.endpoint = endpoint
+        self.servicio = servicio
+        self._cola: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=10000)
+        self._hilo = threading.Thread(target=self._loop, name="tracing-otlp", daemon=True)
+        self._hilo.start()
+
+    def exportar(self, span: Span) -> None:
+        try:
+            self._cola.put_nowait(span)
+        except queue.Full:
+            pass
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.servicio}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "src.utils.tracing"},
+                    "spans": [{
+                        "traceId": s.trace_id,
+                        "spanId": s.span_id,
+                        "parentSpanId": s.parent_id or "",
+                        "name": s.nombre,
+                        "kind": 1,
+                        "startTimeUnixNano": str(s.inicio_ns),
+                        "endTimeUnixNano": str(s.fin_ns),
+                        "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in s.atributos.items()],
+                        "status": {"code": 2, "message": s.error or ""} if s.estado == "ERROR" else {"code": 1},
+                    } for s in spans],
+                }],
+            }]
+        }
+
+    def _enviar(self, spans: List[Span]) -> None:
+        import requests
+        try:
+            resp = requests.post(self.endpoint, json=self._payload(spans), timeout=5)
+            if resp.status_code >= 300:
+                logger.warning("[TRACING] Collector respondió %s: %s", resp.status_code, resp.text[:200])
+        except Exception as e:
+            logger.warning("[TRACING] No se pudieron enviar %d spans a %s: %s", len(spans), self.endpoint, e)
+
+    def _loop(self) -> None:
+        pendientes: List[Span] = []
+        limite = time.monotonic() + self.INTERVALO_SEGUNDOS
+        while True:
+            try:
+                span = self._cola.get(timeout=max(0.0, limite - time.monotonic()))
+                if span is None:
+                    break
+                pendientes.append(span)
+            except queue.Empty:
+                pass
+            if len(pendientes) >= self.TAMANO_LOTE or (pendientes and time.monotonic() >= limite):
+                self._enviar(pendientes)
+                pendientes = []
+            if time.monotonic() >= limite:
+                limite = time.monotonic() + self.INTERVALO_SEGUNDOS
+        if pendientes:
+            self._enviar(pendientes)
+
+    def cerrar(self) -> None:
+        self._cola.put(None)
+        self._hilo.join(timeout=10)
+
+
+_exportador = None
+_exportador_inicializado = False
+_exportador_lock = threading.Lock()
+
+
+def obtener_exportador():
+    """
+    Exportador configurado (singleton por proceso) o None si las trazas están deshabilitadas.
+    """
+    global _exportador, _exportador_inicializado
+    if _exportador_inicializado:
+        return _exportador
+    with _exportador_lock:
+        if not _exportador_inicializado:
+            tipo = str(config.TRACING_EXPORTER).lower()
+            try:
+                if tipo == "jsonl":
+                    _exportador = ExportadorJSONL(config.TRACING_JSONL_PATH)
+                elif tipo == "otlp":
+                    _exportador = ExportadorOTLP(config.TRACING_OTLP_ENDPOINT, config.TRACING_SERVICE_NAME)
+                elif tipo != "none":
+                    logger.warning("[TRACING] TRACING_EXPORTER=%s no reconocido; trazas deshabilitadas", tipo)
+            except Exception as e:
+                logger.warning("[TRACING] Exportador %s no disponible: %s", tipo, e)
+                _exportador = None
+            if _exportador is not None:
+                atexit.register(_exportador.cerrar)
+            _exportador_inicializado = True
+    return _exportador
+
+
+# ======================================================
+# API
+# ======================================================
+
+@contextmanager
+def span(nombre: str, **atributos: Any) -> Iterator[Span]:
+    """
+    Abre un span hijo del span activo. Las excepciones marcan el span con estado ERROR y se propagan.
+    """
+    padre = _span_actual.get()
+    actual = Span(nombre, padre, atributos)
+    token = _span_actual.set(actual)
+    try:
+        yield actual
+    except BaseException as e:
+        actual.estado = "ERROR"
+        actual.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        actual.fin_ns = time.time_ns()
+        _span_actual.reset(token)
+        for observador in _observadores:
+            try:
+                observador(actual)
+            except Exception as e:
+                logger.warning("[TRACING] Error en observador de span %s: %s", nombre, e)
+        exportador = obtener_exportador()
+        if exportador is not None:
+            try:
+                exportador.exportar(actual)
+            except Exception as e:
+                logger.warning("[TRACING] Error exportando span %s: %s", nombre, e)
+
+
+def span_actual() -> Optional[Span]:
+    return _span_actual.get()
+
+
+def registrar_observador(observador: Callable[[Span], None]) -> None:
+    """
+    Registra una función que recibe cada span al terminar (idempotente).
+    """
+    if observador not in _observadores:
+        _observadores.append(observador)
+
+
+def trazar(nombre: Optional[str] = None, atributos: tuple = ATRIBUTOS_HEREDADOS) -> Callable:
+    """
+    Decorador: ejecuta la función dentro de un span. Los argumentos cuyo nombre está en
+    `atributos` (por defecto licitacion_id y concepto) se agregan como atributos del span.
+    """
+    def decorador(fn: Callable) -> Callable:
+        nombre_span = nombre or f"{fn.__module__}.{fn.__qualname__}"
+        firma = inspect.signature(fn)
+        capturados = [a for a in atributos if a in firma.parameters]
+
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            valores = {}
+            if capturados:
+                enlazados = firma.bind_partial(*args, **kwargs).arguments
+                valores = {a: enlazados.get(a) for a in capturados}
+            with span(nombre_span, **valores):
+                return fn(*args, **kwargs)
+
+        return envoltura
+    return decorador
+
+
+def trazar_nodo(nombre: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]], **atributos: Any) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Envuelve un nodo de LangGraph (fn(state) -> dict) en un span con el licitacion_id
+    del estado más los atributos fijos indicados (ej. concepto).
+    """
+    def _nodo(state: Dict[str, Any]) -> Dict[str, Any]:
+        with span(nombre, licitacion_id=state.get("licitacion_id"), **atributos) as s:
+            salida = fn(state)
+            if isinstance(salida, dict) and salida.get("errors"):
+                s.set("errores", len(salida["errors"]))
+            return salida
+
+    _nodo.__name__ = getattr(fn, "__name__", nombre)
+    return _nodo
+
+
+# ======================================================
+# Resumen de un archivo JSONL
+# ======================================================
+
+def resumir_jsonl(ruta: str, licitacion_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Agrupa los spans por nombre: llamadas, tiempo total, máximo y errores (ordenado por tiempo total).
+    """
+    resumen: Dict[str, Dict[str, Any]] = {}
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            s = json.loads(linea)
+            if licitacion_id and str(s["atributos"].get("licitacion_id")) != str(licitacion_id):
+                continue
+            r = resumen.setdefault(s["nombre"], {"nombre": s["nombre"], "llamadas": 0, "total_ms": 0.0, "max_ms": 0.0, "errores": 0})
+            r["llamadas"] += 1
+            r["total_ms"] += s["duracion_ms"]
+            r["max_ms"] = max(r["max_ms"], s["duracion_ms"])
+            r["errores"] += s["estado"] == "ERROR"
+    return sorted(resumen.values(), key=lambda r: -r["total_ms"])
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Uso: python -m src.utils.tracing <traces.jsonl> [licitacion_id]")
+        sys.exit(1)
+    filas = resumir_jsonl(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"{'span':<45} {'llamadas':>8} {'total_s':>10} {'max_s':>9} {'errores':>7}")
+    for r in filas:
+        print(f"{r['nombre']:<45} {r['llamadas']:>8} {r['total_ms'] / 1000:>10.3f} {r['max_ms'] / 1000:>9.3f} {r['errores']:>7}")
@@ -1,15 +1,68 @@
+import logging
 import json
 import redis
 import time
 import os
-from src.config import REDIS_DB, REDIS_HOST, REDIS_PORT, REDIS_USERNAME, REDIS_PASSWORD
-from src.graph.semantic_graph import build_semantic_graph
+import threading
+from src.config import REDIS_DB, REDIS_HOST, REDIS_PORT, METRICS_PORT, WORKER_PRELOAD
 from src.graph.state import GraphState
+from src.graph.checkpoint import calcular_checkpoint_key, limpiar_checkpoints, versiones_documentos
+from src.utils.tracing import trazar
+from src.utils.redis_client import get_blocking_client, get_redis_client
+from src.utils.profiling import debe_perfilar, perfilar
+from src.utils import prometheus_metrics as metricas
 
-def process_message(licitacion_id: str, documento_ids: list):
-    print(f"🛠️ Procesando Semantic Extraction para ID: {licitacion_id} | Docs: {len(documento_ids)}")
+logger = logging.getLogger(__name__)
+
+def _precargar_grafo():
+    """
+    Importa el grafo y sus dependencias pesadas (langgraph, SDKs, extractores) fuera del
+    camino de arranque: el worker queda escuchando la cola de inmediato.
+    """
+    inicio = time.perf_counter()
+    try:
+        import src.graph.semantic_graph  # noqa: F401
+    except Exception as e:
+        logger.warning("⚠️ No se pudo precargar el grafo: %s", e)
+        return
+    logger.info("📦 Grafo precargado en %.2fs", time.perf_counter() - inicio)
+
+def process_message(licitacion_id: str, documento_ids: list, force: bool = False, profile: bool = False):
+    metricas.TRABAJOS_EN_CURSO.inc()
+    try:
+        if debe_perfilar(profile):
+            with perfilar(licitacion_id, documentos=len(documento_ids), force=force):
+                resultado = _procesar_mensaje(licitacion_id, documento_ids, force=force)
+        else:
+            resultado = _procesar_mensaje(licitacion_id, documento_ids, force=force)
+    finally:
+        metricas.TRABAJOS_EN_CURSO.dec()
+    metricas.TRABAJOS.inc(resultado=resultado)
+
+@trazar("worker.process_message")
+def _procesar_mensaje(licitacion_id: str, documento_ids: list, force: bool = False) -> str:
+    """
+    Ejecuta el grafo para un mensaje. Retorna el resultado para métricas: "ok", "errores" o "excepcion".
+    """
+    logger.info("🛠️ Procesando Semantic Extraction para ID: %s | Docs: %s", licitacion_id, len(documento_ids))
+    
+    # Checkpoints por nodo: un reintento del mismo mensaje reanuda desde el último nodo completado.
+    # La llave incluye la versión de los documentos (si se re-procesaron, no se reutilizan salidas
+    # viejas); sin versión conocida se ejecuta sin checkpoints
+    try:
+        versiones = versiones_documentos(licitacion_id, documento_ids)
+    except Exception as e:
+        logger.warning("⚠️ No se pudo leer la versión de los documentos de %s: %s", licitacion_id, e)
+        versiones = None
+    checkpoint_key = calcular_checkpoint_key(licitacion_id, documento_ids, versiones) if versiones else None
+    if checkpoint_key is None:
+        logger.info("⚠️ Documentos de %s sin versión registrada: se ejecuta sin checkpoints", licitacion_id)
+    if force and checkpoint_key:
+        logger.info("🔁 Ejecución forzada: se descartan los checkpoints de %s", checkpoint_key)
+        limpiar_checkpoints(checkpoint_key)
     
     try:
+        from src.graph.semantic_graph import build_semantic_graph
         app = build_semantic_graph()
         
         initial_state = GraphState(
@@ -23,7 +76,9 @@ def process_message(licitacion_id: str, documento_ids: list):
             homologation_result=None,
             status="init",
             errors=[],
-            current_step="init"
+            current_step="init",
+            checkpoint_key=checkpoint_key,
+            force=force
         )
         
         # Invoke the graph
@@ -31,12 +86,14 @@ def process_message(licitacion_id: str, documento_ids: list):
         
         # Check output state
         if result.get("errors"):
-             print(f"⚠️ Extracción finalizada con errores: {result.get('errors')}")
+             logger.warning("⚠️ Extracción finalizada con errores: %s", result.get('errors'))
              from src.services.licitacion_service import actualizar_estado_licitacion
              from src.constants.states import LicitacionStatus
              actualizar_estado_licitacion(licitacion_id, LicitacionStatus.EXTRACCION_SEMANTICA_COMPLETADA)
+             return "errores"
         else:
-             print(f"✅ Extracción completada exitosamente para {licitacion_id}")
+             logger.info("✅ Extracción completada exitosamente para %s", licitacion_id)
+             limpiar_checkpoints(checkpoint_key)
              from src.services.licitacion_service import actualizar_estado_licitacion
              from src.constants.states import LicitacionStatus
              # Mark as Homologacion Completada if it reached the end of the graph correctly
@@ -44,39 +101,45 @@ def process_message(licitacion_id: str, documento_ids: list):
                 actualizar_estado_licitacion(licitacion_id, LicitacionStatus.HOMOLOGACION_COMPLETADA)
              else:
                 actualizar_estado_licitacion(licitacion_id, LicitacionStatus.EXTRACCION_SEMANTICA_COMPLETADA)
+             return "ok"
             
     except Exception as e:
-        print(f"❌ Error procesando {licitacion_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error procesando %s: %s", licitacion_id, e)
+        return "excepcion"
 
 def main():
-    print(f"📡 Worker Semántico Iniciado.")
-    print(f"🔗 Redis: {REDIS_HOST}:{REDIS_PORT}, DB: {REDIS_DB}")
+    from src.utils.logging_config import configurar_logging
+    configurar_logging()
+    logger.info("📡 Worker Semántico Iniciado.")
+    logger.info("🔗 Redis: %s:%s, DB: %s", REDIS_HOST, REDIS_PORT, REDIS_DB)
     
-    r = redis.Redis(
-        host=REDIS_HOST, 
-        port=REDIS_PORT, 
-        db=REDIS_DB, 
-        username=REDIS_USERNAME,
-        password=REDIS_PASSWORD,
-        decode_responses=True
-    )
+    # BLPOP en su propia conexión; el resto de los comandos usa el pool compartido
+    cola = get_blocking_client()
     
     QUEUE_NAME = "semantic_queue"
+
+    # Métricas para autoescalado: la profundidad de la cola se consulta en cada scrape
+    metricas.COLA_PROFUNDIDAD.funcion = lambda: get_redis_client().llen(QUEUE_NAME)
+    if metricas.iniciar_servidor_metricas(METRICS_PORT):
+        logger.info("📈 Métricas en http://0.0.0.0:%s/metrics", METRICS_PORT)
+
+    if WORKER_PRELOAD:
+        threading.Thread(target=_precargar_grafo, name="precarga-grafo", daemon=True).start()
     
     while True:
         try:
-            print(f"⏳ Esperando mensaje en '{QUEUE_NAME}'...")
-            result = r.blpop(QUEUE_NAME, timeout=10)
+            logger.debug("⏳ Esperando mensaje en '%s'...", QUEUE_NAME)
+            result = cola.blpop(QUEUE_NAME, timeout=10)
             
             if result:
                 _, message = result
-                print(f"📥 Mensaje recibido: {message}")
+                logger.info("📥 Mensaje recibido: %s", message)
                 try:
                     data = json.loads(message)
                     lic_id = data.get("licitacion_id")
                     doc_ids = data.get("documento_ids", [])
+                    force = bool(data.get("force", False))
+                    profile = bool(data.get("profile", False))
                     
                     if lic_id and doc_ids:
                         # IMPORTANTE: El extractor de documentos guarda keys como "pdf:{filename}:chunk:{i}"
@@ -87,18 +150,18 @@ def main():
                         from src.constants.states import LicitacionStatus
                         
                         actualizar_estado_licitacion(lic_id, LicitacionStatus.EXTRACCION_SEMANTICA_EN_PROCESO)
-                        process_message(lic_id, doc_ids)
+                        process_message(lic_id, doc_ids, force=force, profile=profile)
 
                     else:
-                        print("⚠️ Mensaje incompleto (falta licitacion_id o documento_ids)")
+                        logger.warning("⚠️ Mensaje incompleto (falta licitacion_id o documento_ids)")
                 except json.JSONDecodeError:
-                    print(f"⚠️ Error decodificando JSON: {message}")
+                    logger.warning("⚠️ Error decodificando JSON: %s", message)
                     
         except redis.exceptions.ConnectionError:
-            print("⚠️ Error de conexión con Redis. Reintentando...")
+            logger.warning("⚠️ Error de conexión con Redis. Reintentando...")
             time.sleep(5)
         except Exception as e:
-            print(f"⚠️ Error inesperado en loop principal: {e}")
+            logger.warning("⚠️ Error inesperado en loop principal: %s", e)
             time.sleep(5)
 
 if __name__ == "__main__":
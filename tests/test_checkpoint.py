@@ -0,0 +1,227 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.graph import checkpoint
+from src.services import licitacion_service
+from src.services.semantic_extraction.indice_chunks import marcar_version_documento
+from src.utils import redis_client
+
+LICITACION = "5f0c8a52-6a4e-4c1b-9a57-3f1d2e7b9c10"
+ARCHIVO_A = "0b5e6a8c-1d2f-4a3b-8c9d-0e1f2a3b4c5d"
+ARCHIVO_B = "9a8b7c6d-5e4f-4a3b-9c2d-1e0f9a8b7c6d"
+
+
+class _CursorArchivos:
+    """Responde las consultas de resolver_prefijos_documentos: licitación 84 con archivos 126 y 127."""
+
+    def __init__(self):
+        self._filas = []
+
+    def execute(self, sql, params=None):
+        if "FROM licitaciones" in sql:
+            self._filas = [(LICITACION, 84)]
+        elif "FROM licitacion_archivos" in sql:
+            internos = {ARCHIVO_A: 126, ARCHIVO_B: 127}
+            self._filas = [(internos[p],) for p in params if p in internos]
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def fetchall(self):
+        return self._filas
+
+    def close(self):
+        pass
+
+
+class _ConexionArchivos:
+    def cursor(self):
+        return _CursorArchivos()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def redis_falso(monkeypatch):
+    cliente = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "get_redis_client", lambda decode_responses=True: cliente)
+    monkeypatch.setattr(licitacion_service, "get_pg_conn", lambda: _ConexionArchivos())
+    return cliente
+
+
+def _llave(documento_ids):
+    versiones = checkpoint.versiones_documentos(LICITACION, documento_ids)
+    return checkpoint.calcular_checkpoint_key(LICITACION, documento_ids, versiones) if versiones else None
+
+
+def test_uuid_de_documento_se_resuelve_al_prefijo_de_redis(redis_falso):
+    marcar_version_documento(redis_falso, "84_126_bases.pdf")
+    marcar_version_documento(redis_falso, "84_127_anexo.pdf")
+
+    versiones = checkpoint.versiones_documentos(LICITACION, [ARCHIVO_A, ARCHIVO_B])
+
+    assert set(versiones) == {"84_126", "84_127"}
+
+
+def test_reingesta_cambia_la_llave(redis_falso):
+    marcar_version_documento(redis_falso, "84_126_bases.pdf")
+    antes = _llave([ARCHIVO_A])
+
+    assert antes is not None
+    assert _llave([ARCHIVO_A]) == antes
+
+    marcar_version_documento(redis_falso, "84_126_bases.pdf")
+
+    assert _llave([ARCHIVO_A]) != antes
+
+
+def test_documento_sin_version_deshabilita_checkpoints(redis_falso):
+    marcar_version_documento(redis_falso, "84_126_bases.pdf")
+
+    assert checkpoint.versiones_documentos(LICITACION, [ARCHIVO_A, ARCHIVO_B]) is None
+    assert _llave([ARCHIVO_A, ARCHIVO_B]) is None
+
+
+# --- con_checkpoint -------------------------------------------------------
+
+@pytest.fixture
+def store_sqlite(tmp_path, monkeypatch):
+    from src import config
+    monkeypatch.setattr(config, "GRAPH_CHECKPOINT_BACKEND", "sqlite")
+    monkeypatch.setattr(config, "GRAPH_CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.sqlite3"))
+    monkeypatch.setattr(checkpoint, "_store", None)
+    return checkpoint.obtener_checkpoint_store()
+
+
+def _nodo_contado(salidas):
+    """Nodo que retorna la siguiente salida de `salidas` (o lanza si es una excepción)."""
+    llamadas = []
+
+    def _nodo(state):
+        salida = salidas[min(len(llamadas), len(salidas) - 1)]
+        llamadas.append(state)
+        if isinstance(salida, Exception):
+            raise salida
+        return salida
+
+    return _nodo, llamadas
+
+
+def test_reanuda_tras_falla_sin_repetir_nodos_completados(store_sqlite):
+    import operator
+    from typing import Annotated, List, Optional, TypedDict
+    from langgraph.graph import END, StateGraph
+
+    class Estado(TypedDict):
+        checkpoint_key: Optional[str]
+        extraction_items: Optional[dict]
+        extraction_finances: Optional[dict]
+        status: str
+        errors: Annotated[List[str], operator.add]
+
+    items, llamadas_items = _nodo_contado([{"extraction_items": {"items": [{"item_key": "a"}]}}])
+    finanzas, llamadas_finanzas = _nodo_contado([RuntimeError("LLM caído"), {"extraction_finances": {"monto": 10}}])
+    save, llamadas_save = _nodo_contado([{"status": "completed"}])
+
+    workflow = StateGraph(Estado)
+    workflow.add_node("load_data", lambda state: {})
+    workflow.add_node("extract_items", checkpoint.con_checkpoint("extract_items", items))
+    workflow.add_node("extract_finances", checkpoint.con_checkpoint("extract_finances", finanzas))
+    workflow.add_node("save", checkpoint.con_checkpoint("save", save))
+    workflow.set_entry_point("load_data")
+    workflow.add_edge("load_data", "extract_items")
+    workflow.add_edge("load_data", "extract_finances")
+    workflow.add_edge("extract_items", "save")
+    workflow.add_edge("extract_finances", "save")
+    workflow.add_edge("save", END)
+    app = workflow.compile()
+
+    inicial = {"checkpoint_key": "lic:abc", "extraction_items": None, "extraction_finances": None, "status": "init", "errors": []}
+    with pytest.raises(RuntimeError):
+        app.invoke(dict(inicial))
+
+    resultado = app.invoke(dict(inicial))
+
+    assert len(llamadas_items) == 1
+    assert len(llamadas_finanzas) == 2
+    assert resultado["extraction_items"] == {"items": [{"item_key": "a"}]}
+    assert resultado["extraction_finances"] == {"monto": 10}
+    assert resultado["status"] == "completed"
+    assert resultado["errors"] == []
+
+
+@pytest.mark.parametrize("salida, es_completa", [
+    ({"extraction_items": {"items": [1]}, "errors": ["LLM Error"]}, None),
+    ({"extraction_items": {}, "errors": []}, None),
+    ({}, None),
+    ({"extraction_items": {"items": []}, "errors": []}, lambda s: bool(s["extraction_items"].get("items"))),
+])
+def test_no_guarda_salidas_con_errores_vacias_o_incompletas(store_sqlite, salida, es_completa):
+    nodo, llamadas = _nodo_contado([salida])
+    envuelto = checkpoint.con_checkpoint("extract_items", nodo, es_completa)
+
+    envuelto({"checkpoint_key": "lic:abc"})
+    envuelto({"checkpoint_key": "lic:abc"})
+
+    assert len(llamadas) == 2
+    assert store_sqlite.obtener("lic:abc", "extract_items") is None
+
+
+def test_limpiar_checkpoints_fuerza_reejecucion(store_sqlite):
+    nodo, llamadas = _nodo_contado([{"extraction_finances": {"monto": 10}}])
+    envuelto = checkpoint.con_checkpoint("extract_finances", nodo)
+
+    envuelto({"checkpoint_key": "lic:abc"})
+    envuelto({"checkpoint_key": "lic:abc"})
+    assert len(llamadas) == 1
+
+    checkpoint.limpiar_checkpoints("lic:abc")
+    envuelto({"checkpoint_key": "lic:abc"})
+
+    assert len(llamadas) == 2
+
+
+def test_sin_checkpoint_key_no_usa_el_store(store_sqlite):
+    nodo, llamadas = _nodo_contado([{"extraction_finances": {"monto": 10}}])
+    envuelto = checkpoint.con_checkpoint("extract_finances", nodo)
+
+    envuelto({"checkpoint_key": None})
+    envuelto({"checkpoint_key": None})
+
+    assert len(llamadas) == 2
+
+
+def test_backend_redis_guarda_y_limpia():
+    cliente = fakeredis.FakeRedis(decode_responses=True)
+    store = checkpoint.RedisCheckpointStore(cliente, ttl=60)
+
+    store.guardar("lic:abc", "extract_items", {"extraction_items": {"items": [1]}})
+
+    assert store.obtener("lic:abc", "extract_items") == {"extraction_items": {"items": [1]}}
+    assert 0 < cliente.ttl("graph_checkpoint:lic:abc") <= 60
+    store.limpiar("lic:abc")
+    assert store.obtener("lic:abc", "extract_items") is None
+
+
+def test_force_descarta_los_checkpoints_antes_de_ejecutar(monkeypatch):
+    from src import worker
+    from src.graph import semantic_graph
+
+    eventos = []
+
+    class _App:
+        def invoke(self, estado):
+            eventos.append(("invoke", estado["checkpoint_key"]))
+            return {"errors": [], "current_step": "homologation_completed"}
+
+    monkeypatch.setattr(worker, "versiones_documentos", lambda lic, docs: {"84_126": "v1"})
+    monkeypatch.setattr(worker, "limpiar_checkpoints", lambda key: eventos.append(("limpiar", key)))
+    monkeypatch.setattr(semantic_graph, "build_semantic_graph", lambda: _App())
+    monkeypatch.setattr(licitacion_service, "actualizar_estado_licitacion", lambda *a, **k: None)
+
+    assert worker._procesar_mensaje(LICITACION, [ARCHIVO_A], force=True) == "ok"
+
+    llave = checkpoint.calcular_checkpoint_key(LICITACION, [ARCHIVO_A], {"84_126": "v1"})
+    assert eventos == [("limpiar", llave), ("invoke", llave), ("limpiar", llave)]
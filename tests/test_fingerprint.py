@@ -0,0 +1,160 @@
+import pytest
+
+from src.services import licitacion_service, llm_service
+from src.services.semantic_extraction import fingerprint, runner
+from src.services.semantic_extraction.fingerprint import calcular_fingerprint
+
+LICITACION = "5f0c8a52-6a4e-4c1b-9a57-3f1d2e7b9c10"
+
+
+def _chunk(pagina, texto):
+    return {"redis_key": f"doc_raw_page:84_126_bases.pdf:p{pagina}", "texto": texto, "distancia": pagina / 10}
+
+
+def test_fingerprint_depende_del_contenido_y_no_del_orden():
+    chunks = [_chunk(1, "Guante nitrilo"), _chunk(2, "Alcohol gel")]
+    base = calcular_fingerprint("ITEMS_LICITACION", chunks, "v1", None, "openai:gpt-4o")
+
+    assert calcular_fingerprint("ITEMS_LICITACION", list(reversed(chunks)), "v1", None, "openai:gpt-4o") == base
+    assert calcular_fingerprint("ITEMS_LICITACION", [chunks[0], _chunk(2, "Alcohol gel 70%")], "v1", None, "openai:gpt-4o") != base
+    assert calcular_fingerprint("ITEMS_LICITACION", chunks, "v2", None, "openai:gpt-4o") != base
+    assert calcular_fingerprint("ITEMS_LICITACION", chunks, "v1", None, "gemini:gemini-1.5-pro") != base
+
+
+# --- runner: reutilizacion y lotes parciales -----------------------------------
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+        self._fila = None
+
+    def execute(self, sql, params=None):
+        self.db.sentencias.append((" ".join(sql.split()), params))
+        if "information_schema" in sql:
+            self._fila = (1,)
+        elif "FROM semantic_runs sr" in sql:
+            self._fila = self.db.vigente
+        elif "RETURNING id" in sql:
+            self._fila = (77,)
+        else:
+            self._fila = None
+
+    def fetchone(self):
+        return self._fila
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Conexion:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return _Cursor(self.db)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Db:
+    def __init__(self):
+        self.sentencias = []
+        self.vigente = None
+
+    def fingerprints_registrados(self):
+        return [params[0] for sql, params in self.sentencias if sql.startswith("UPDATE semantic_runs SET fingerprint")]
+
+
+class _ExtractorLotes:
+    """Extractor que falla en los lotes cuyo contexto contiene `texto_caido`."""
+
+    texto_caido = None
+    contextos = []
+
+    def __init__(self, licitacion_id=None):
+        pass
+
+    def _call_build_queries(self):
+        return ["productos solicitados"]
+
+    def run(self, context):
+        self.contextos.append(context)
+        if self.texto_caido and self.texto_caido in context:
+            raise RuntimeError("LLM caído")
+        return {"items": [{"item_key": f"item_{len(self.contextos)}", "nombre_item": f"Producto {len(self.contextos)}", "cantidad": 1}]}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = _Db()
+    # Dos lotes: cada chunk ocupa más de la mitad de MAX_CHARS_PER_BATCH
+    chunks = [_chunk(1, "A" * 7000), _chunk(2, "B" * 7000)]
+
+    _ExtractorLotes.contextos = []
+    monkeypatch.setattr(_ExtractorLotes, "texto_caido", None)
+    monkeypatch.setattr(runner, "MODO_DEBUG", False)
+    monkeypatch.setattr(runner, "get_extractor", lambda concepto: _ExtractorLotes)
+    monkeypatch.setattr(runner, "load_documents_to_memory", lambda documento_ids: ["indice"])
+    monkeypatch.setattr(runner, "semantic_search_in_memory", lambda *a: [dict(c) for c in chunks])
+    monkeypatch.setattr(runner, "_get_pg_conn", lambda: _Conexion(db))
+    monkeypatch.setattr(fingerprint, "_columna_disponible", None)
+    monkeypatch.setattr(llm_service, "configuracion_llm_por_defecto", lambda: {"engine": "openai", "model": "gpt-4o"})
+    monkeypatch.setattr(licitacion_service, "obtener_mapa_uuid_por_interno", lambda licitacion_id: {})
+    monkeypatch.setattr(licitacion_service, "guardar_items_licitacion", lambda *a: None)
+    monkeypatch.setattr(licitacion_service, "guardar_especificaciones_tecnicas", lambda *a: None)
+    return db
+
+
+def _extraer_items(**extra):
+    return runner.run_semantic_extraction(
+        licitacion_id=LICITACION, concepto="ITEMS_LICITACION", documento_ids=["84_126"], **extra
+    )
+
+
+def test_fingerprint_vigente_omite_la_extraccion(db):
+    db.vigente = ("41", '{"items": []}')
+
+    resultado = _extraer_items()
+
+    assert resultado == {"status": "OK", "concepto": "ITEMS_LICITACION", "semantic_run_id": "41", "reutilizado": True}
+    assert _ExtractorLotes.contextos == []
+    assert not any(sql.startswith("INSERT INTO semantic_runs") for sql, _ in db.sentencias)
+
+
+def test_force_ignora_el_fingerprint_vigente(db):
+    db.vigente = ("41", '{"items": []}')
+
+    resultado = _extraer_items(force=True)
+
+    assert resultado["semantic_run_id"] == "77"
+    assert len(_ExtractorLotes.contextos) == 2
+    assert not any("FROM semantic_runs sr" in sql for sql, _ in db.sentencias)
+
+
+def test_lotes_completos_registran_el_fingerprint(db):
+    _extraer_items()
+
+    assert len(db.fingerprints_registrados()) == 1
+
+
+def test_lote_fallido_guarda_el_run_sin_fingerprint(db, monkeypatch):
+    monkeypatch.setattr(_ExtractorLotes, "texto_caido", "B" * 7000)
+
+    resultado = _extraer_items()
+
+    assert resultado["semantic_run_id"] == "77"
+    assert len(_ExtractorLotes.contextos) == 2
+    assert db.fingerprints_registrados() == []
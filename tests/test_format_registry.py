@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from src.services.semantic_extraction.extractors.items_licitacion import format_registry
+from src.services.semantic_extraction.extractors.items_licitacion.format_registry import (
+    calcular_confianza,
+    detectar_y_extraer,
+    item_completo,
+    register_formato,
+)
+
+
+def _chunk(texto, documento="bases.pdf", pagina=1):
+    return {"redis_key": f"doc_raw_page:84_126_{documento}:p{pagina}", "texto": texto}
+
+
+def _item(nombre="Guante nitrilo", cantidad=10.0, unidad="Caja"):
+    return {"nombre_item": nombre, "cantidad": cantidad, "unidad": unidad}
+
+
+@pytest.fixture
+def formatos_aislados(monkeypatch):
+    """Registro vacío para probar prioridades sin depender de los formatos incorporados."""
+    monkeypatch.setattr(format_registry, "_formatos", {})
+
+
+def test_item_completo_requiere_nombre_cantidad_y_unidad():
+    assert item_completo(_item())
+    assert not item_completo(_item(nombre="  "))
+    assert not item_completo(_item(cantidad="10"))
+    assert not item_completo(_item(unidad="N/A"))
+    assert not item_completo(_item(unidad=None))
+
+
+def test_confianza_escala_con_la_fraccion_de_items_completos():
+    assert calcular_confianza([_item(), _item()], 0.9) == 0.9
+    assert calcular_confianza([_item(), _item(unidad="N/A")], 0.9) == 0.45
+    assert calcular_confianza([], 0.9) == 0.0
+
+
+def test_ficha_json():
+    ficha = {"payload": {"productos_solicitados": [
+        {"nombre": "Guante nitrilo", "cantidad": 100, "unidad_medida": "UN", "codigo_producto": "42132203"},
+        {"nombre_producto": "Alcohol gel", "cantidad": 20, "unidad": "Litro"},
+    ]}}
+    chunks = [_chunk("Bases administrativas"), _chunk(json.dumps(ficha), documento="ficha.json")]
+
+    deteccion = detectar_y_extraer(chunks)
+
+    assert deteccion["formato"] == "FICHA_JSON_MERCADO_PUBLICO"
+    assert deteccion["confianza"] == 1.0
+    assert [i["nombre_item"] for i in deteccion["items"]] == ["Guante nitrilo", "Alcohol gel"]
+    assert deteccion["items"][0]["unidad"] == "Unidades"
+    assert deteccion["chunks_resueltos"] == [chunks[1]["redis_key"]]
+
+
+def test_compra_agil():
+    chunks = [_chunk("Listado de productos solicitados\nInsumos\nID: 10\nGuante nitrilo\n100 Unidad")]
+
+    deteccion = detectar_y_extraer(chunks)
+
+    assert deteccion["formato"] == "COMPRA_AGIL"
+    assert deteccion["confianza"] == 0.9
+    assert deteccion["items"][0]["item_key"] == "item_10"
+    assert deteccion["chunks_resueltos"] == [chunks[0]["redis_key"]]
+
+
+def test_licitacion_publica():
+    texto = "\n".join([
+        "Línea 1: Guante de nitrilo talla M",
+        "Código ONU: 42132203",
+        "Cantidad: 200",
+        "Unidad de medida: Caja",
+        "Especificaciones técnicas: Sin polvo",
+        "Línea 2: Mascarilla quirúrgica",
+        "Código ONU: 42131713",
+        "Cantidad: 50",
+    ])
+
+    deteccion = detectar_y_extraer([_chunk(texto, pagina=3)])
+
+    assert deteccion["formato"] == "LICITACION_PUBLICA"
+    primero, segundo = deteccion["items"]
+    assert (primero["item_key"], primero["nombre_item"], primero["cantidad"], primero["unidad"]) == (
+        "linea_1", "Guante de nitrilo talla M", 200.0, "Caja"
+    )
+    assert primero["codigo_producto"] == "42132203"
+    assert primero["especificaciones"] == ["Sin polvo"]
+    assert primero["fuentes"][0]["pagina"] == 3
+    # La segunda línea no trae unidad: la confianza baja a la mitad de la base
+    assert segundo["unidad"] is None
+    assert deteccion["confianza"] == 0.425
+
+
+def test_convenio_marco():
+    texto = "\n".join([
+        "Orden de compra Convenio Marco",
+        "ID Producto: 1234567 - Papel fotocopia carta",
+        "Cantidad: 10 Resma",
+    ])
+
+    deteccion = detectar_y_extraer([_chunk(texto)])
+
+    assert deteccion["formato"] == "CONVENIO_MARCO"
+    assert deteccion["confianza"] == 0.8
+    item = deteccion["items"][0]
+    assert (item["item_key"], item["nombre_item"], item["cantidad"], item["unidad"]) == (
+        "cm_1234567", "Papel fotocopia carta", 10.0, "Resma"
+    )
+
+
+def test_sin_formato_conocido_retorna_none():
+    assert detectar_y_extraer([_chunk("Bases administrativas de la licitación.\nPlazo de entrega: 10 días")]) is None
+
+
+def test_gana_el_formato_de_mayor_confianza(formatos_aislados):
+    register_formato("PARCIAL", lambda c: True, lambda c: {"items": [_item(), _item(unidad=None)]}, 1.0)
+    register_formato("COMPLETO", lambda c: True, lambda c: {"items": [_item()], "chunks_resueltos": ["k"]}, 0.8)
+    register_formato("NO_RECONOCE", lambda c: False, lambda c: {"items": [_item()]}, 1.0)
+
+    deteccion = detectar_y_extraer([_chunk("x")])
+
+    assert (deteccion["formato"], deteccion["confianza"], deteccion["chunks_resueltos"]) == ("COMPLETO", 0.8, ["k"])
+
+
+def test_empate_lo_resuelve_el_orden_de_registro(formatos_aislados):
+    register_formato("PRIMERO", lambda c: True, lambda c: {"items": [_item()]}, 0.9)
+    register_formato("SEGUNDO", lambda c: True, lambda c: {"items": [_item()]}, 0.9)
+
+    assert detectar_y_extraer([_chunk("x")])["formato"] == "PRIMERO"
+
+
+def test_formato_que_falla_o_no_extrae_se_ignora(formatos_aislados):
+    def _falla(chunks):
+        raise ValueError("texto inesperado")
+
+    register_formato("FALLA", lambda c: True, _falla, 1.0)
+    register_formato("VACIO", lambda c: True, lambda c: {"items": []}, 1.0)
+
+    assert detectar_y_extraer([_chunk("x")]) is None
+
+
+def test_registro_rechaza_otro_extractor_con_el_mismo_nombre(formatos_aislados):
+    def _extract(chunks):
+        return {"items": []}
+
+    register_formato("compra_agil", lambda c: True, _extract, 0.9)
+    register_formato("COMPRA_AGIL", lambda c: True, _extract, 0.9)
+
+    assert format_registry.get_formatos() == ["COMPRA_AGIL"]
+    with pytest.raises(ValueError):
+        register_formato("COMPRA_AGIL", lambda c: True, lambda c: {"items": []}, 0.9)
@@ -0,0 +1,108 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src import config
+from src.services.homologacion.homologacion_cache import (
+    CACHE_PREFIX,
+    CLAVE_CATALOGO_ACTUAL,
+    HomologacionCache,
+    calcular_hash_catalogo,
+    normalizar_descripcion,
+)
+from src.utils import redis_client
+
+CATALOGO = [
+    {"codigo": "1", "nombre": "102152-CARISTOP 5000 PASTA X 51 G", "descripcion": "nan"},
+    {"codigo": "2", "nombre": "KERR174-LIMAS K 30MM KERR 15", "descripcion": "nan"},
+]
+HOMOLOGACION = {"razonamiento_general": "Calza por nombre", "candidatos": [{"codigo": "2", "score_similitud": 0.9}]}
+
+
+@pytest.fixture
+def redis_falso(monkeypatch):
+    cliente = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "get_redis_client", lambda decode_responses=True: cliente)
+    monkeypatch.setattr(config, "HOMOLOGACION_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "HOMOLOGACION_CACHE_TTL", 60)
+    return cliente
+
+
+def _item(item_key, descripcion=""):
+    return {"item_key": item_key, "descripcion_detectada": descripcion}
+
+
+def test_normalizacion_ignora_tildes_mayusculas_y_puntuacion():
+    assert normalizar_descripcion("  Limas  K-30mm, ENDODÓNTICAS. ") == normalizar_descripcion("limas k 30mm endodonticas")
+    assert normalizar_descripcion(None) == ""
+
+
+def test_descripciones_equivalentes_comparten_entrada(redis_falso):
+    cache = HomologacionCache.desde_config(CATALOGO, "v1", "modelo-a")
+    cache.guardar([(_item("Limas K 30mm", "Endodónticas"), HOMOLOGACION)])
+
+    hits = cache.obtener([_item("LIMAS k-30MM", "endodonticas."), _item("Limas K 25mm", "Endodónticas")])
+
+    assert list(hits) == [0]
+    assert hits[0]["item_key"] == "LIMAS k-30MM"
+    assert hits[0]["candidatos"] == HOMOLOGACION["candidatos"]
+    assert 0 < redis_falso.ttl(cache._clave(_item("Limas K 30mm", "Endodónticas"))) <= 60
+
+
+@pytest.mark.parametrize("catalogo, prompt_version, modelo", [
+    (CATALOGO + [{"codigo": "3", "nombre": "3M-CINTA ADHESIVA", "descripcion": "nan"}], "v1", "modelo-a"),
+    (CATALOGO, "v2", "modelo-a"),
+    (CATALOGO, "v1", "modelo-b"),
+])
+def test_cambio_de_catalogo_prompt_o_modelo_no_reutiliza(redis_falso, catalogo, prompt_version, modelo):
+    item = _item("Limas K 30mm", "Endodónticas")
+    HomologacionCache.desde_config(CATALOGO, "v1", "modelo-a").guardar([(item, HOMOLOGACION)])
+
+    assert HomologacionCache.desde_config(catalogo, prompt_version, modelo).obtener([item]) == {}
+
+
+def test_hash_de_catalogo_no_depende_del_orden():
+    assert calcular_hash_catalogo(CATALOGO) == calcular_hash_catalogo(list(reversed(CATALOGO)))
+
+
+def test_invalidacion_elimina_solo_el_catalogo_anterior(redis_falso):
+    catalogo_nuevo = CATALOGO + [{"codigo": "3", "nombre": "3M-CINTA ADHESIVA", "descripcion": "nan"}]
+    hash_anterior = calcular_hash_catalogo(CATALOGO)
+    hash_nuevo = calcular_hash_catalogo(catalogo_nuevo)
+    ajena = "otra_cache:clave"
+    redis_falso.set(ajena, "1")
+
+    HomologacionCache.desde_config(CATALOGO, "v1", "modelo-a").guardar(
+        [(_item(f"Item {i}"), HOMOLOGACION) for i in range(3)]
+    )
+    # Entrada ya escrita para el catalogo nuevo (p.ej. por otro worker) que no debe borrarse
+    HomologacionCache(redis_falso, hash_nuevo, "v1", "modelo-a", 60).guardar([(_item("Item 0"), HOMOLOGACION)])
+
+    cache = HomologacionCache.desde_config(catalogo_nuevo, "v1", "modelo-a")
+
+    assert list(redis_falso.scan_iter(match=f"{CACHE_PREFIX}:{hash_anterior}:*")) == []
+    assert len(list(redis_falso.scan_iter(match=f"{CACHE_PREFIX}:{hash_nuevo}:*"))) == 1
+    assert redis_falso.get(ajena) == "1"
+    assert redis_falso.get(CLAVE_CATALOGO_ACTUAL) == hash_nuevo
+    assert list(cache.obtener([_item("Item 0")])) == [0]
+
+
+def test_mismo_catalogo_no_invalida(redis_falso):
+    HomologacionCache.desde_config(CATALOGO, "v1", "modelo-a").guardar([(_item("Item 0"), HOMOLOGACION)])
+
+    cache = HomologacionCache.desde_config(CATALOGO, "v1", "modelo-a")
+
+    assert cache.invalidar_si_catalogo_cambio() == 0
+    assert list(cache.obtener([_item("Item 0")])) == [0]
+
+
+def test_cache_deshabilitado_o_sin_redis_retorna_none(redis_falso, monkeypatch):
+    monkeypatch.setattr(config, "HOMOLOGACION_CACHE_ENABLED", False)
+    assert HomologacionCache.desde_config(CATALOGO, "v1", "modelo-a") is None
+
+    def _caido(decode_responses=True):
+        raise ConnectionError("redis caído")
+
+    monkeypatch.setattr(config, "HOMOLOGACION_CACHE_ENABLED", True)
+    monkeypatch.setattr(redis_client, "get_redis_client", _caido)
+    assert HomologacionCache.desde_config(CATALOGO, "v1", "modelo-a") is None
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from src.services.homologacion import homologacion_db
+from src.services.homologacion.homologacion_db import insertar_homologaciones_bulk
+
+
+class _Cursor:
+    """Registra las filas de cada INSERT multi-fila (execute_values usa mogrify + execute)."""
+
+    def __init__(self, conexion):
+        self.connection = conexion
+        self._filas = []
+
+    def mogrify(self, template, args):
+        self._filas.append(tuple(args))
+        return b"(...)"
+
+    def execute(self, sql, params=None):
+        sql = sql.decode("utf-8") if isinstance(sql, bytes) else sql
+        tabla = sql.split("INSERT INTO", 1)[1].split("(", 1)[0].strip()
+        self.connection.sentencias.append(sql)
+        self.connection.filas.setdefault(tabla, []).extend(self._filas)
+        self._filas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class _Conexion:
+    encoding = "UTF8"
+
+    def __init__(self):
+        self.filas = {}
+        self.sentencias = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+def _homologacion(item_key, codigos):
+    return {
+        "item_key": item_key,
+        "descripcion_detectada": item_key,
+        "razonamiento_general": "ok",
+        "candidatos": [
+            {"ranking": i + 1, "producto": {"codigo": c, "nombre": f"Producto {c}"}, "score_similitud": 0.9}
+            for i, c in enumerate(codigos)
+        ],
+    }
+
+
+def test_ids_generados_enlazan_candidatos():
+    conn = _Conexion()
+    homologaciones = [_homologacion("guante", ["A1", "A2"]), _homologacion("jeringa", []), _homologacion("gasa", ["C1"])]
+
+    ids = insertar_homologaciones_bulk(conn, "lic-1", homologaciones, 10, 5, "gpt-4o", datetime(2026, 1, 1))
+
+    filas_h = conn.filas["homologaciones_productos"]
+    filas_c = conn.filas["candidatos_homologacion"]
+    assert ids == [f[0] for f in filas_h]
+    assert len(set(ids)) == 3
+    assert [f[2] for f in filas_h] == ["guante", "jeringa", "gasa"]
+    assert [(f[0], f[2]) for f in filas_c] == [(ids[0], "A1"), (ids[0], "A2"), (ids[2], "C1")]
+    assert not any("RETURNING" in s for s in conn.sentencias)
+
+
+def test_inserta_en_paginas(monkeypatch):
+    monkeypatch.setattr(homologacion_db, "BULK_PAGE_SIZE", 2)
+    conn = _Conexion()
+
+    ids = insertar_homologaciones_bulk(
+        conn, "lic-1", [_homologacion(f"item {i}", ["X"]) for i in range(5)], 0, 0, "gpt-4o", datetime(2026, 1, 1)
+    )
+
+    assert len(ids) == 5
+    assert len(conn.sentencias) == 6
+    assert [f[0] for f in conn.filas["candidatos_homologacion"]] == ids
+
+
+def test_sin_homologaciones_no_escribe():
+    conn = _Conexion()
+
+    assert insertar_homologaciones_bulk(conn, "lic-1", [], 0, 0, "gpt-4o", datetime(2026, 1, 1)) == []
+    assert conn.sentencias == []
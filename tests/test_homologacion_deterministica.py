@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+from src.services.homologacion.homologacion_deterministica import (
+    IndiceDeterministico,
+    codigos_en_texto,
+    homologar_deterministico,
+)
+
+UMBRAL = 0.85
+RUTA_CATALOGO = os.path.join(os.path.dirname(__file__), "..", "productos", "productos.xlsx")
+
+
+def _producto(codigo, nombre, descripcion="nan"):
+    # Misma forma que product_loader: codigo / codigo_tienda son correlativos internos en texto
+    return {
+        "codigo": str(codigo),
+        "codigo_tienda": str(codigo),
+        "nombre": nombre,
+        "descripcion": descripcion,
+        "stock_disponible": 0,
+        "ubicacion_stock": "sin informacion",
+    }
+
+
+@pytest.fixture
+def catalogo():
+    productos = [_producto(i, f"{900000 + i}-PRODUCTO GENERICO {i}") for i in range(1, 3000)]
+    productos[1000 - 1] = _producto(1000, "DLATEX036-LATEX MACHTIG XS C/P")
+    productos[1500 - 1] = _producto(1500, "IDENT029-I-CAL HIDROXIDO CALCIO JERINGA ACUOSO 2 GR")
+    productos[2025 - 1] = _producto(2025, "KERR174-LIMAS K 30MM KERR 15")
+    productos[4 - 1] = _producto(4, "102152-CARISTOP 5000 PASTA X 51 G")
+    productos[10 - 1] = _producto(10, "3M-ESPONJA PULIDORA")
+    productos[11 - 1] = _producto(11, "3M-CINTA ADHESIVA")
+    productos[20 - 1] = _producto(20, "0707-DIAMANTE REDONDA 801 008 MEDIANO BV.")
+    productos[21 - 1] = _producto(21, "SUERO FISIOLOGICO 500 ML")
+    productos[22 - 1] = _producto(22, "ALCOHOL GEL GLICERINADO BIDON")
+    productos[23 - 1] = _producto(23, "GUANTE NITRILO AZUL TALLA S", "CAJA EXAMEN")
+    productos[24 - 1] = _producto(24, "GUANTE NITRILO AZUL TALLA M", "CAJA EXAMEN")
+    return productos
+
+
+def _item(nombre, descripcion=""):
+    return {"item_key": nombre, "descripcion_detectada": descripcion}
+
+
+def _codigo_resuelto(resultado):
+    return resultado["candidatos"][0]["producto"]["codigo"]
+
+
+@pytest.mark.parametrize("texto", [
+    "Limas endodónticas. Entrega año 2025",
+    "Detergente bidón 1000 ml",
+    "Pañuelos caja de 1500 unidades",
+])
+def test_numeros_sueltos_no_son_codigos(catalogo, texto):
+    assert homologar_deterministico([_item(texto)], catalogo, UMBRAL) == {}
+
+
+def test_tokens_de_cantidad_no_son_codigos():
+    assert codigos_en_texto("Suero 500ML X100 2025 caja 2UNI") == set()
+
+
+@pytest.mark.parametrize("texto, codigo", [
+    ("Limas endodonticas cód. KERR174", "2025"),
+    ("Limas endodonticas KERR174", "2025"),
+    ("Pasta profilactica código: 102152", "4"),
+    ("Fresa diamante ref. N° 0707", "20"),
+])
+def test_codigo_rotulado_o_alfanumerico(catalogo, texto, codigo):
+    resueltos = homologar_deterministico([_item(texto)], catalogo, UMBRAL)
+
+    assert _codigo_resuelto(resueltos[0]) == codigo
+    assert "coincidencia exacta de código" in resueltos[0]["razonamiento_general"]
+
+
+def test_codigo_numerico_sin_rotulo_no_calza(catalogo):
+    assert homologar_deterministico([_item("Pasta profilactica 102152")], catalogo, UMBRAL) == {}
+
+
+def test_codigo_ambiguo_no_se_resuelve(catalogo):
+    # "3M" es prefijo de varios productos; KERR174 + DLATEX036 apuntan a dos productos distintos
+    assert IndiceDeterministico(catalogo).por_codigo_exacto("Insumo cod. 3M") is None
+    assert IndiceDeterministico(catalogo).por_codigo_exacto("KERR174 o DLATEX036") is None
+
+
+def test_nombre_exacto(catalogo):
+    resueltos = homologar_deterministico([_item("Suero fisiológico 500 ml")], catalogo, UMBRAL)
+
+    assert _codigo_resuelto(resueltos[0]) == "21"
+    assert resueltos[0]["candidatos"][0]["score_similitud"] == 1.0
+    assert "nombre normalizado" in resueltos[0]["razonamiento_general"]
+
+
+def test_lexico_sobre_umbral(catalogo):
+    # Mismas palabras clave que el producto (la descripcion "nan" del catalogo no cuenta)
+    indice = IndiceDeterministico(catalogo)
+
+    assert indice.por_lexico("alcohol gel glicerinado bidon", 0.75) == (22 - 1, 1.0)
+    assert indice.por_lexico("alcohol gel", UMBRAL) is None
+
+    resueltos = homologar_deterministico([_item("Bidon de alcohol gel glicerinado")], catalogo, UMBRAL)
+    assert _codigo_resuelto(resueltos[0]) == "22"
+    assert "léxica" in resueltos[0]["razonamiento_general"]
+
+
+def test_lexico_bajo_umbral_no_se_resuelve(catalogo):
+    resueltos = homologar_deterministico([_item("Alcohol gel bidon 5 litros")], catalogo, UMBRAL)
+
+    assert resueltos == {}
+
+
+def test_lexico_sin_margen_no_se_resuelve(catalogo):
+    # Talla S y talla M empatan para un ítem sin talla: ambiguo, va al LLM
+    indice = IndiceDeterministico(catalogo)
+
+    assert indice.por_lexico("guante nitrilo azul talla caja examen", 0.5) is None
+
+
+@pytest.mark.skipif(not os.path.exists(RUTA_CATALOGO), reason="catalogo real no disponible")
+def test_catalogo_real_no_calza_numeros_sueltos():
+    pytest.importorskip("pandas")
+    from src.services.homologacion.product_loader import cargar_productos_catalogo
+
+    catalogo = cargar_productos_catalogo(RUTA_CATALOGO)
+    items = [
+        _item("Limas endodónticas. Entrega año 2025"),
+        _item("Alcohol gel bidón 1000 ml"),
+        _item("Guantes caja de 1500 unidades"),
+        _item("Limas cód. KERR174"),
+    ]
+
+    resueltos = homologar_deterministico(items, catalogo, UMBRAL)
+
+    assert not any("código" in r["razonamiento_general"] for pos, r in resueltos.items() if pos < 3)
+    assert resueltos[3]["candidatos"][0]["producto"]["nombre"].startswith("KERR174-")
@@ -0,0 +1,56 @@
+from src.services.semantic_extraction.extractors.items_licitacion.item_merger import fusionar_items
+
+
+def _item(item_key, nombre, cantidad, **extra):
+    return {"item_key": item_key, "nombre_item": nombre, "cantidad": cantidad, **extra}
+
+
+def test_fusiona_mismo_item_de_lotes_distintos():
+    lote_full = [_item("item_1", "Guante de nitrilo talla M", 100, fuentes=["p1_full"])]
+    lote_elemento = [_item("item_1", "Guante nitrilo talla M", 100, fuentes=["p1_e2"])]
+
+    items = fusionar_items([lote_full, lote_elemento])
+
+    assert len(items) == 1
+    assert items[0]["fuentes"] == ["p1_full", "p1_e2"]
+
+
+def test_no_fusiona_tallas_distintas():
+    lotes = [
+        [_item("item_1", "Guante nitrilo talla M", 100)],
+        [_item("item_2", "Guante nitrilo talla L", 100)],
+    ]
+
+    items = fusionar_items(lotes)
+
+    assert [i["nombre_item"] for i in items] == ["Guante nitrilo talla M", "Guante nitrilo talla L"]
+
+
+def test_no_fusiona_volumenes_distintos():
+    lotes = [[_item("item_1", "Jeringa 5 ml", 200)], [_item("item_1", "Jeringa 3 ml", 200)]]
+
+    items = fusionar_items(lotes)
+
+    assert [i["nombre_item"] for i in items] == ["Jeringa 5 ml", "Jeringa 3 ml"]
+    assert [i["item_key"] for i in items] == ["item_1", "item_1_2"]
+
+
+def test_no_fusiona_items_sin_nombre_ni_cantidad():
+    lotes = [[_item("item_1", "", None)], [_item("item_2", None, None)]]
+
+    assert len(fusionar_items(lotes)) == 2
+
+
+def test_no_fusiona_items_del_mismo_lote():
+    lote = [
+        _item("item_1", "Mascarilla quirurgica", 50),
+        _item("item_2", "Mascarilla quirurgica", 50),
+    ]
+
+    assert [i["item_key"] for i in fusionar_items([lote])] == ["item_1", "item_2"]
+
+
+def test_cantidad_ausente_no_es_compatible():
+    lotes = [[_item("item_1", "Alcohol gel", 10)], [_item("item_7", "Alcohol gel", None)]]
+
+    assert len(fusionar_items(lotes)) == 2
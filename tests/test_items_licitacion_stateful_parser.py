@@ -0,0 +1,164 @@
+import re
+
+import pytest
+
+from src.services.semantic_extraction.extractors.items_licitacion.items_licitacion_stateful_parser import (
+    ItemsLicitacionStatefulParser,
+    documento_y_pagina_desde_redis_key,
+)
+
+
+def _chunk(pagina, *lineas, documento="bases.pdf"):
+    return {"redis_key": f"doc_raw_page:84_126_{documento}:p{pagina}", "texto": "\n".join(lineas)}
+
+
+def _bloque(item_id, nombre, cantidad="10 Unidad"):
+    return ["Insumos clínicos", f"ID: {item_id}", nombre, cantidad]
+
+
+def test_documento_y_pagina_desde_redis_key():
+    assert documento_y_pagina_desde_redis_key("doc_raw_page:84_126_bases tecnicas.pdf:p7") == ("bases tecnicas.pdf", 7)
+    assert documento_y_pagina_desde_redis_key("pdf:anexo:chunk:3") == ("anexo", 3)
+    assert documento_y_pagina_desde_redis_key("otra_llave") == ("Documento", 1)
+
+
+def test_parsear_chunks_entrega_items_en_orden_con_su_pagina():
+    chunks = [
+        _chunk(1, "Listado de productos solicitados", *_bloque(10, "Guante nitrilo"), *_bloque(11, "Mascarilla N95")),
+        _chunk(2, *_bloque(12, "Alcohol gel")),
+        _chunk(1, *_bloque(13, "Jeringa 5 ml"), documento="anexo.pdf"),
+    ]
+
+    items = list(ItemsLicitacionStatefulParser().parsear_chunks(chunks))
+
+    assert [i["item_key"] for i in items] == ["item_10", "item_11", "item_12", "item_13"]
+    assert [(i["fuentes"][0]["documento"], i["fuentes"][0]["pagina"]) for i in items] == [
+        ("bases.pdf", 1), ("bases.pdf", 1), ("bases.pdf", 2), ("anexo.pdf", 1),
+    ]
+    assert items[2]["fuentes"][0]["redis_key"] == chunks[1]["redis_key"]
+
+
+def test_parsear_chunks_entrega_cada_item_apenas_se_cierra():
+    parser = ItemsLicitacionStatefulParser()
+    flujo = parser.parsear_chunks([
+        _chunk(1, "Productos Solicitados", *_bloque(10, "Guante nitrilo")),
+        _chunk(2, *_bloque(11, "Mascarilla N95")),
+    ])
+
+    primero = next(flujo)
+
+    assert primero["item_key"] == "item_10"
+    assert parser.chunks_resueltos == []
+    assert [i["item_key"] for i in flujo] == ["item_11"]
+    assert parser.items == []
+
+
+def test_item_que_cruza_paginas_se_cierra_en_la_siguiente():
+    chunks = [
+        _chunk(1, "Productos Solicitados", *_bloque(10, "Guante nitrilo"), "Insumos clínicos", "ID: 11", "Mascarilla N95"),
+        _chunk(2, "Triple capa con elástico", "50 Caja"),
+    ]
+
+    items = list(ItemsLicitacionStatefulParser().parsear_chunks(chunks))
+
+    assert items[1]["item_key"] == "item_11"
+    assert items[1]["descripcion"] == "Triple capa con elástico"
+    assert items[1]["fuentes"][0]["pagina"] == 2
+
+
+def test_chunks_resueltos_solo_incluye_paginas_cubiertas_por_items_cerrados():
+    chunks = [
+        # Texto de bases antes del encabezado: la pagina no queda resuelta
+        _chunk(1, "Bases administrativas", "Listado de productos solicitados", *_bloque(10, "Guante nitrilo")),
+        # Solo items cerrados: resuelta
+        _chunk(2, *_bloque(11, "Mascarilla N95")),
+        # Deja un item abierto: no resuelta
+        _chunk(3, *_bloque(12, "Alcohol gel"), "Insumos clínicos", "ID: 13", "Jeringa"),
+        # Cierra el item abierto pero no es la pagina que lo abrio: resuelta
+        _chunk(4, "Desechable", "20 Unidad", *_bloque(14, "Papel higiénico")),
+        # Sin items: no resuelta
+        _chunk(5),
+    ]
+    parser = ItemsLicitacionStatefulParser()
+
+    items = list(parser.parsear_chunks(chunks))
+
+    assert len(items) == 5
+    assert parser.chunks_resueltos == [chunks[1]["redis_key"], chunks[3]["redis_key"]]
+
+
+def test_parsear_texto_conserva_el_comportamiento_acumulado():
+    parser = ItemsLicitacionStatefulParser()
+    texto = "\n".join(["Productos Solicitados", *_bloque(10, "Guante nitrilo"), *_bloque(11, "Mascarilla N95")])
+
+    items = parser.parsear_texto(texto)
+
+    assert [i["item_key"] for i in items] == ["item_10", "item_11"]
+    assert items is parser.obtener_items_cerrados()
+    assert items[0]["fuentes"][0]["redis_key"] == "N/A"
+    assert parser.chunks_resueltos == []
+
+
+# --- clasificador de linea precompilado ----------------------------------------
+
+_HEADERS_ANTERIORES = ["Listado de productos solicitados", "Productos Solicitados", "Descripción de los bienes", "Ítems de la licitación"]
+_REGEX_ID_ANTERIOR = re.compile(r"^ID:\s*(\d+)")
+_REGEX_CANTIDAD_ANTERIOR = re.compile(r"^(\d+(?:[.,]\d+)?)\s+([A-Za-z]+.*)$", re.IGNORECASE)
+
+
+def _clasificar_anterior(linea):
+    """Recorrido por linea previo al clasificador precompilado."""
+    if any(h in linea for h in _HEADERS_ANTERIORES):
+        return ("header",)
+    match_id = _REGEX_ID_ANTERIOR.search(linea)
+    if match_id:
+        return ("id", match_id.group(1))
+    match_cant = _REGEX_CANTIDAD_ANTERIOR.search(linea)
+    if match_cant:
+        return ("cantidad", match_cant.group(1), match_cant.group(2))
+    return None
+
+
+def _clasificar_precompilado(linea):
+    if ItemsLicitacionStatefulParser.REGEX_HEADER.search(linea):
+        return ("header",)
+    clasificacion = ItemsLicitacionStatefulParser.REGEX_LINEA.match(linea)
+    if clasificacion and clasificacion.group("id"):
+        return ("id", clasificacion.group("id"))
+    if clasificacion and clasificacion.group("cantidad"):
+        return ("cantidad", clasificacion.group("cantidad"), clasificacion.group("unidad"))
+    return None
+
+
+@pytest.mark.parametrize("linea", [
+    "Listado de productos solicitados",
+    "2. Productos Solicitados (ver anexo)",
+    "Descripción de los bienes y servicios",
+    "Ítems de la licitación",
+    "productos solicitados",
+    "ID: 1234",
+    "ID:99 Guantes",
+    "id: 1234",
+    "Ver ID: 1234",
+    "ID: Productos Solicitados",
+    "10 Unidad",
+    "2,5 litros",
+    "1.000 CAJA",
+    "500 ml de alcohol gel",
+    "10 unidades ID: 5",
+    "10",
+    "10 %",
+    "Unidad 10",
+    "Guante de nitrilo talla M",
+    "",
+])
+def test_clasificador_precompilado_equivale_al_anterior(linea):
+    assert _clasificar_precompilado(linea) == _clasificar_anterior(linea)
+
+
+def test_texto_json_se_aplana_y_texto_plano_no_se_decodifica():
+    parser = ItemsLicitacionStatefulParser()
+
+    assert parser._aplanar_json_texto('[["ID: 1\\nGuante", "10 Unidad"], "Caja"]') == "ID: 1\nGuante\n10 Unidad\nCaja"
+    assert parser._aplanar_json_texto('{"ID": 1}') == '{"ID": 1}'
+    assert parser._aplanar_json_texto("ID: 1\\nGuante") == "ID: 1\nGuante"
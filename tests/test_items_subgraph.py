@@ -0,0 +1,333 @@
+import pytest
+
+from src import config
+from src.graph import items_subgraph
+
+LICITACION = "5f0c8a52-6a4e-4c1b-9a57-3f1d2e7b9c10"
+
+# Referencia al nodo real: algunos tests lo reemplazan en el módulo antes de construir el subgrafo
+_node_fingerprint_check = items_subgraph.node_fingerprint_check
+
+
+def _fuente(pagina, documento="bases.pdf"):
+    return {
+        "documento": documento,
+        "documento_id": None,
+        "pagina": pagina,
+        "parrafo": "",
+        "redis_key": f"doc_raw_page:84_126_{documento}:p{pagina}",
+    }
+
+
+def _item(item_key, pagina=1, documento="bases.pdf", **extra):
+    item = {
+        "item_key": item_key,
+        "nombre_item": f"Producto {item_key}",
+        "cantidad": 10.0,
+        "unidad": "Caja",
+        "fuentes": [_fuente(pagina, documento)],
+    }
+    item.update(extra)
+    return item
+
+
+def _estado(**extra):
+    estado = {
+        "licitacion_id": LICITACION,
+        "documento_ids": ["84_126"],
+        "semantic_chunks": [],
+        "pre_extracted_items": [],
+        "chunks_resueltos": [],
+        "formato_detectado": None,
+        "confianza_formato": 0.0,
+        "politica_verificacion": "",
+        "final_items_result": {},
+        "fingerprint": "fp-actual",
+        "force": False,
+        "errors": [],
+    }
+    estado.update(extra)
+    return estado
+
+
+@pytest.fixture
+def umbrales(monkeypatch):
+    monkeypatch.setattr(config, "ITEMS_UMBRAL_OMITIR_LLM", 0.95)
+    monkeypatch.setattr(config, "ITEMS_UMBRAL_VALIDACION_LLM", 0.75)
+
+
+# --- politica de verificacion ----------------------------------------------------
+
+@pytest.mark.parametrize("items, confianza, politica", [
+    ([_item("1"), _item("2")], 1.0, "persistir"),
+    ([_item("1"), _item("2")], 0.95, "persistir"),
+    ([_item("1"), _item("2")], 0.9, "enriquecer"),
+    ([_item("1"), _item("2", unidad="N/A")], 1.0, "verificar"),
+    ([_item("1", cantidad=None)], 1.0, "verificar"),
+    # Completo pero sin fuentes: no cumple el schema
+    ([_item("1", fuentes=[])], 1.0, "verificar"),
+    ([], 1.0, "verificar"),
+])
+def test_politica_de_verificacion(umbrales, items, confianza, politica):
+    estado = _estado(pre_extracted_items=items, confianza_formato=confianza, formato_detectado="COMPRA_AGIL")
+
+    salida = items_subgraph.node_verification_policy(estado)
+
+    assert salida == {"politica_verificacion": politica}
+    assert items_subgraph._ruta_verificacion({**estado, **salida}) == politica
+
+
+def test_ruta_sin_politica_verifica():
+    assert items_subgraph._ruta_verificacion(_estado(politica_verificacion=None)) == "verificar"
+
+
+@pytest.fixture
+def subgrafo_instrumentado(monkeypatch, umbrales):
+    """
+    Subgrafo con la política real y el resto de los nodos reemplazados por registros,
+    para comprobar a qué nodo final llega cada política.
+    """
+    visitados = []
+
+    def _registrar(nombre, salida=None):
+        def _nodo(state):
+            visitados.append(nombre)
+            return salida or {}
+        return _nodo
+
+    monkeypatch.setattr(items_subgraph, "node_semantic_locator", _registrar("semantic_locator"))
+    monkeypatch.setattr(items_subgraph, "node_fingerprint_check", _registrar("fingerprint_check", {"fingerprint": "fp-actual"}))
+    for nombre in ("persist_deterministic", "spec_enrichment", "llm_verification"):
+        monkeypatch.setattr(items_subgraph, f"node_{nombre}", _registrar(nombre, {"final_items_result": {"nodo": nombre}}))
+
+    def _con_formato(items, confianza):
+        monkeypatch.setattr(items_subgraph, "node_format_parser", _registrar("format_parser", {
+            "pre_extracted_items": items, "formato_detectado": "COMPRA_AGIL", "confianza_formato": confianza,
+        }))
+        return items_subgraph.build_items_subgraph()
+
+    return _con_formato, visitados
+
+
+@pytest.mark.parametrize("items, confianza, nodo_final", [
+    ([_item("1")], 1.0, "persist_deterministic"),
+    ([_item("1")], 0.8, "spec_enrichment"),
+    ([_item("1", unidad=None)], 1.0, "llm_verification"),
+])
+def test_subgrafo_enruta_segun_la_politica(subgrafo_instrumentado, items, confianza, nodo_final):
+    construir, visitados = subgrafo_instrumentado
+
+    resultado = construir(items, confianza).invoke(_estado())
+
+    assert visitados == ["semantic_locator", "fingerprint_check", "format_parser", nodo_final]
+    assert resultado["final_items_result"] == {"nodo": nodo_final}
+
+
+# --- shards de verificacion LLM --------------------------------------------------
+
+def _chunk(pagina, largo=10, documento="bases.pdf", sufijo=""):
+    return {"redis_key": f"doc_raw_page:84_126_{documento}:p{pagina}{sufijo}", "texto": "x" * largo}
+
+
+def _rangos(shards):
+    return [(sh["documento"], sh["pagina_inicio"], sh["pagina_fin"], len(sh["chunks"])) for sh in shards]
+
+
+def test_shards_por_documento_y_limite_de_caracteres():
+    chunks = [_chunk(1, 40), _chunk(2, 40), _chunk(3, 40), _chunk(1, 10, documento="anexo.pdf")]
+
+    shards = items_subgraph._construir_shards(chunks, [], max_chars=100)
+
+    assert _rangos(shards) == [("bases.pdf", 1, 2, 2), ("bases.pdf", 3, 3, 1), ("anexo.pdf", 1, 1, 1)]
+
+
+def test_shards_no_separan_chunks_de_una_misma_pagina():
+    chunks = [_chunk(1, 60), _chunk(2, 50, sufijo="_full"), _chunk(2, 50, sufijo="_e1"), _chunk(3, 10)]
+
+    shards = items_subgraph._construir_shards(chunks, [], max_chars=80)
+
+    assert _rangos(shards) == [("bases.pdf", 1, 1, 1), ("bases.pdf", 2, 2, 2), ("bases.pdf", 3, 3, 1)]
+
+
+def test_items_van_al_shard_de_su_pagina_o_al_mas_cercano():
+    chunks = [_chunk(1, 60), _chunk(2, 60), _chunk(9, 60), _chunk(1, 10, documento="anexo.pdf")]
+    items = [
+        _item("en_rango", pagina=2),
+        _item("cerca_del_final", pagina=8),
+        _item("otro_documento", pagina=5, documento="anexo.pdf"),
+        _item("documento_sin_contexto", pagina=1, documento="ficha.json"),
+        _item("sin_fuentes", fuentes=[]),
+    ]
+
+    shards = items_subgraph._construir_shards(chunks, items, max_chars=100)
+
+    assert [[i["item_key"] for i in sh["items"]] for sh in shards] == [
+        ["documento_sin_contexto", "sin_fuentes"],
+        ["en_rango"],
+        ["cerca_del_final"],
+        ["otro_documento"],
+    ]
+
+
+def test_sin_contexto_un_shard_vacio_recibe_todos_los_items():
+    shards = items_subgraph._construir_shards([], [_item("1"), _item("2")], max_chars=100)
+
+    assert len(shards) == 1
+    assert shards[0]["chunks"] == []
+    assert [i["item_key"] for i in shards[0]["items"]] == ["1", "2"]
+
+
+class _ExtractorFalso:
+    """Extractor que falla en los shards cuyo contexto menciona un documento de `documentos_caidos`."""
+
+    documentos_caidos = ()
+    contextos = []
+
+    def __init__(self, licitacion_id=None):
+        self.modo_prompt = None
+
+    def run(self, context):
+        self.contextos.append(context)
+        if any(d in context for d in self.documentos_caidos):
+            raise RuntimeError("LLM caído")
+        return {
+            "concepto": "ITEMS_LICITACION",
+            "resumen": {"total_items_detectados": 1, "observaciones": "verificado"},
+            "items": [_item("verificado_bases", nombre_item="Guante nitrilo talla M")],
+        }
+
+
+@pytest.fixture
+def verificacion_llm(monkeypatch, umbrales):
+    from src.services.semantic_extraction import registry
+
+    persistidos = []
+    _ExtractorFalso.contextos = []
+    monkeypatch.setattr(_ExtractorFalso, "documentos_caidos", ())
+    monkeypatch.setattr(config, "ITEMS_SHARD_MAX_CHARS", 100)
+    monkeypatch.setattr(registry, "get_extractor", lambda concepto: _ExtractorFalso)
+    monkeypatch.setattr(
+        items_subgraph, "_persistir_resultado_items",
+        lambda lic, chunks, result, fingerprint=None: persistidos.append((result, fingerprint)),
+    )
+    return persistidos
+
+
+def _estado_verificacion():
+    chunks = [_chunk(1, documento="bases.pdf"), _chunk(1, documento="anexo.pdf")]
+    items = [_item("pre_anexo", pagina=1, documento="anexo.pdf", nombre_item="Jeringa desechable 5 ml")]
+    return _estado(semantic_chunks=chunks, pre_extracted_items=items, confianza_formato=0.0)
+
+
+def test_shard_fallido_conserva_sus_items_pre_extraidos(verificacion_llm, monkeypatch):
+    monkeypatch.setattr(_ExtractorFalso, "documentos_caidos", ("anexo.pdf",))
+
+    salida = items_subgraph.node_llm_verification(_estado_verificacion())
+
+    result = salida["final_items_result"]
+    assert [i["item_key"] for i in result["items"]] == ["verificado_bases", "pre_anexo"]
+    assert len(salida["errors"]) == 1 and "anexo.pdf p1-1" in salida["errors"][0]
+    assert result["warnings"] == salida["errors"]
+    assert len(_ExtractorFalso.contextos) == 2
+    assert verificacion_llm == [(result, None)]
+
+
+def test_shard_fallido_sin_items_no_aporta_resultado(verificacion_llm, monkeypatch):
+    monkeypatch.setattr(_ExtractorFalso, "documentos_caidos", ("anexo.pdf",))
+    estado = {**_estado_verificacion(), "pre_extracted_items": []}
+
+    salida = items_subgraph.node_llm_verification(estado)
+
+    assert [i["item_key"] for i in salida["final_items_result"]["items"]] == ["verificado_bases"]
+    assert len(salida["errors"]) == 1
+
+
+def test_todos_los_shards_fallidos_sin_items_no_persiste(verificacion_llm, monkeypatch):
+    monkeypatch.setattr(_ExtractorFalso, "documentos_caidos", ("bases.pdf", "anexo.pdf"))
+    estado = {**_estado_verificacion(), "pre_extracted_items": []}
+
+    salida = items_subgraph.node_llm_verification(estado)
+
+    assert "final_items_result" not in salida
+    assert len(salida["errors"]) == 2
+    assert verificacion_llm == []
+
+
+def test_shards_completos_persisten_con_fingerprint(verificacion_llm):
+    salida = items_subgraph.node_llm_verification(_estado_verificacion())
+
+    assert salida["errors"] == []
+    assert verificacion_llm == [(salida["final_items_result"], "fp-actual")]
+
+
+# --- fingerprint ------------------------------------------------------------------
+
+@pytest.fixture
+def fingerprint_vigente(monkeypatch):
+    """Simula el run vigente de ITEMS_LICITACION; `consultas` registra los fingerprints buscados."""
+    from src.services import llm_service
+    from src.services.semantic_extraction import fingerprint, runner
+
+    vigente = {"fila": None}
+    consultas = []
+
+    class _Conexion:
+        def close(self):
+            pass
+
+    def _buscar(conn, licitacion_id, concepto, fp):
+        consultas.append(fp)
+        return vigente["fila"]
+
+    monkeypatch.setattr(runner, "MODO_DEBUG", False)
+    monkeypatch.setattr(runner, "_get_pg_conn", lambda: _Conexion())
+    monkeypatch.setattr(fingerprint, "buscar_resultado_vigente", _buscar)
+    monkeypatch.setattr(llm_service, "configuracion_llm_por_defecto", lambda: {"engine": "openai", "model": "gpt-4o"})
+    return vigente, consultas
+
+
+def test_fingerprint_coincidente_reutiliza_el_resultado(fingerprint_vigente):
+    vigente, consultas = fingerprint_vigente
+    vigente["fila"] = ("41", {"concepto": "ITEMS_LICITACION", "items": [_item("1")]})
+
+    salida = items_subgraph.node_fingerprint_check(_estado(semantic_chunks=[_chunk(1)]))
+
+    assert salida["fingerprint"] == consultas[0]
+    assert salida["final_items_result"]["semantic_run_id"] == "41"
+    assert salida["final_items_result"]["reutilizado"] is True
+    assert items_subgraph._ruta_fingerprint({**_estado(), **salida}) == "reutilizar"
+
+
+def test_fingerprint_distinto_o_force_extrae(fingerprint_vigente):
+    vigente, consultas = fingerprint_vigente
+
+    salida = items_subgraph.node_fingerprint_check(_estado(semantic_chunks=[_chunk(1)]))
+    assert "final_items_result" not in salida
+    assert items_subgraph._ruta_fingerprint({**_estado(), **salida}) == "extraer"
+
+    vigente["fila"] = ("41", {"items": []})
+    salida = items_subgraph.node_fingerprint_check(_estado(semantic_chunks=[_chunk(1)], force=True))
+    assert salida == {"fingerprint": consultas[0]}
+    assert len(consultas) == 1
+
+
+def test_fingerprint_cambia_con_la_evidencia(fingerprint_vigente):
+    antes = items_subgraph.node_fingerprint_check(_estado(semantic_chunks=[_chunk(1)]))["fingerprint"]
+    despues = items_subgraph.node_fingerprint_check(_estado(semantic_chunks=[_chunk(1, largo=11)]))["fingerprint"]
+
+    assert antes != despues
+
+
+def test_subgrafo_con_fingerprint_vigente_no_extrae(fingerprint_vigente, subgrafo_instrumentado, monkeypatch):
+    vigente, _ = fingerprint_vigente
+    vigente["fila"] = ("41", {"concepto": "ITEMS_LICITACION", "items": [_item("1")]})
+    construir, visitados = subgrafo_instrumentado
+    # Nodo de fingerprint real sobre los chunks que entrega el locator
+    monkeypatch.setattr(items_subgraph, "node_fingerprint_check", _node_fingerprint_check)
+    monkeypatch.setattr(items_subgraph, "node_semantic_locator", lambda state: {"semantic_chunks": [_chunk(1)]})
+
+    resultado = construir([_item("1")], 1.0).invoke(_estado())
+
+    assert visitados == []
+    assert resultado["final_items_result"]["semantic_run_id"] == "41"
+    assert resultado["final_items_result"]["reutilizado"] is True